@@ -0,0 +1,76 @@
+"""
+Batch Caption Script - Beschriftet ein ganzes Bildverzeichnis über LM Studio
+Gleiche Pipeline wie die Node TALMStudioBatchCaption, aber ohne ComfyUI
+
+Die Bilder werden von der Platte gestreamt und im Thread-Pool verkleinert/
+kodiert, höchstens --max-in-flight Requests laufen gleichzeitig. Jede
+Caption landet sofort in der JSONL-Datei; ein erneuter Aufruf setzt dort
+fort, wo der letzte aufgehört hat (--no-resume beginnt neu).
+
+Benötigt PIL und aiohttp sowie ein geladenes Vision-Modell in LM Studio.
+
+Beispiele:
+  python BATCH_CAPTION.py D:/dataset --model qwen2-vl-7b-instruct
+  python BATCH_CAPTION.py "D:/dataset/**/*.jpg" --recursive --max-in-flight 8 --workers 8
+  python BATCH_CAPTION.py D:/frames --output frames.jsonl --max-edge 768 --max-tokens 150
+  python BATCH_CAPTION.py D:/dataset --output-mode tags --max-tokens 200
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+
+PACK_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_MODULE = "ta_nodes_pack"
+
+DEFAULT_PROMPT = "Describe this image in detail."
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant that describes images accurately."
+
+
+def _import_pack():
+    spec = importlib.util.spec_from_file_location(
+        PACK_MODULE, os.path.join(PACK_DIR, "__init__.py"),
+        submodule_search_locations=[PACK_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACK_MODULE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caption an image directory with an LM Studio vision model")
+    parser.add_argument("source", help="Image directory or glob pattern")
+    parser.add_argument("--output", default="", help="JSONL output (default: captions.jsonl next to the images)")
+    parser.add_argument("--model", default="llava-v1.5", help="Model name as LM Studio serves it")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--system-prompt", default=DEFAULT_SYSTEM_PROMPT)
+    parser.add_argument("--server-url", default="http://localhost:1234")
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--max-tokens", type=int, default=500)
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Concurrent requests to LM Studio")
+    parser.add_argument("--workers", type=int, default=4, help="Decode/encode threads")
+    parser.add_argument("--max-edge", type=int, default=1024, help="Downscale longest edge (0 = original)")
+    parser.add_argument("--recursive", action="store_true", help="Include subdirectories / ** in globs")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the JSONL instead of continuing")
+    parser.add_argument("--output-mode", choices=["text", "tags"], default="text",
+                        help="tags: structured tag list, written as comma-separated prompt tags")
+    args = parser.parse_args()
+
+    pack = _import_pack()
+    node = pack.NODE_CLASS_MAPPINGS["TALMStudioBatchCaption"]()
+    output, captioned, skipped, failed = asyncio.run(node.caption_directory(
+        args.source, args.output, args.prompt, args.model, args.temperature, args.max_tokens,
+        args.server_url, args.max_in_flight, args.workers, args.max_edge, args.recursive,
+        not args.no_resume, args.system_prompt, args.output_mode
+    ))
+
+    print(f"Captioned: {captioned}  Skipped: {skipped}  Failed: {failed}")
+    print(f"Output: {output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Benchmark Script - Misst die Import-Zeit des TA Nodes Packs (python -X importtime)
+
+Jeder Lauf importiert das Pack in einem frischen Prozess, so wie ComfyUI es
+beim Start tut. Ausgewertet werden die kumulative Import-Zeit des Packs,
+die langsamsten Module und ob schwere Abhängigkeiten (torch, numpy, PIL,
+requests, comfy.sd, ...) schon beim Registrieren geladen werden.
+
+Exit-Code 1 bei Regression - geeignet als Check vor einem Commit:
+  python BENCH_IMPORT_TIME.py
+  python BENCH_IMPORT_TIME.py --max-ms 80 --repeat 10 --json import_time.json
+  python BENCH_IMPORT_TIME.py --baseline import_time.json --tolerance 20
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+PACK_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_MODULE = "ta_nodes_pack"
+
+# Diese Module dürfen beim Import des Packs nicht geladen werden
+FORBIDDEN_MODULES = [
+    "torch", "numpy", "PIL", "requests", "aiohttp", "transformers",
+    "safetensors", "comfy.sd", "folder_paths",
+]
+
+# Der Pack-Ordner ist kein gültiger Modulname - ein Finder bildet PACK_MODULE darauf ab,
+# damit der Import über das Import-System läuft und von -X importtime erfasst wird
+IMPORT_SNIPPET = """
+import importlib.abc, importlib.util, os, sys
+pack_dir, module, comfyui_dir = sys.argv[1], sys.argv[2], sys.argv[3]
+if comfyui_dir:
+    sys.path.insert(0, comfyui_dir)
+
+class PackFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        if name == module:
+            return importlib.util.spec_from_file_location(
+                name, os.path.join(pack_dir, "__init__.py"), submodule_search_locations=[pack_dir]
+            )
+
+sys.meta_path.insert(0, PackFinder())
+pack = __import__(module)
+print("NODES", len(pack.NODE_CLASS_MAPPINGS))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Zerlegt die -X importtime Ausgabe in (Modul, self_us, cumulative_us, Tiefe)
+    Format: 'import time: self [us] | cumulative | imported package'
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return entries
+
+
+def run_once(comfyui_dir):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET, PACK_DIR, PACK_MODULE, comfyui_dir or ""],
+        capture_output=True, text=True
+    )
+    entries = parse_importtime(result.stderr)
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("Importing the pack failed:\n" + "\n".join(errors[-20:]))
+
+    pack_index = next((i for i, entry in enumerate(entries) if entry[0] == PACK_MODULE), None)
+    if pack_index is None:
+        raise RuntimeError("No import time recorded for the pack")
+    pack_total = entries[pack_index][2]
+
+    # Kinder stehen vor ihrem Eltern-Modul: alles direkt davor mit Tiefe > 0 gehört zum Pack
+    start = pack_index
+    while start > 0 and entries[start - 1][3] > 0:
+        start -= 1
+    inside = [(name, self_us, cum_us) for name, self_us, cum_us, _ in entries[start:pack_index]]
+
+    imported = {name for name, _, _ in inside}
+    forbidden = sorted(
+        m for m in FORBIDDEN_MODULES
+        if m in imported or any(name.startswith(m + ".") for name in imported)
+    )
+
+    return {
+        "pack_ms": pack_total / 1000,
+        # Andere Ausgaben (z.B. vom lms Hintergrund-Thread) ignorieren
+        "node_count": next((int(line.split()[1]) for line in result.stdout.splitlines()
+                            if line.startswith("NODES ")), 0),
+        "modules": [{"module": n, "self_ms": s / 1000, "cumulative_ms": c / 1000} for n, s, c in inside],
+        "forbidden": forbidden,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check for the TA nodes pack")
+    parser.add_argument("--comfyui-dir", default=os.environ.get("COMFYUI_DIR", ""),
+                        help="ComfyUI root (added to sys.path, like inside ComfyUI)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreter runs")
+    parser.add_argument("--max-ms", type=float, default=150.0, help="Fail if the median import time exceeds this")
+    parser.add_argument("--baseline", help="JSON from an earlier run - fail if slower than baseline + tolerance")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="Allowed slowdown vs. baseline in percent")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest modules")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.repeat):
+        try:
+            runs.append(run_once(args.comfyui_dir))
+        except RuntimeError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"  run {i + 1}/{args.repeat}: {runs[-1]['pack_ms']:.1f} ms")
+
+    median_ms = statistics.median(r["pack_ms"] for r in runs)
+    forbidden = sorted({m for r in runs for m in r["forbidden"]})
+
+    # Langsamste Module (Self-Zeit, Median über alle Läufe)
+    per_module = {}
+    for r in runs:
+        for m in r["modules"]:
+            per_module.setdefault(m["module"], []).append(m["self_ms"])
+    slowest = sorted(
+        ((name, statistics.median(times)) for name, times in per_module.items()),
+        key=lambda item: item[1], reverse=True
+    )[:args.top]
+
+    print(f"\nTA nodes pack: {runs[0]['node_count']} nodes, median import {median_ms:.1f} ms "
+          f"(min {min(r['pack_ms'] for r in runs):.1f} ms)")
+    print("Slowest modules (self time):")
+    for name, ms in slowest:
+        print(f"  {ms:8.2f} ms  {name}")
+
+    failures = []
+    if forbidden:
+        failures.append(f"heavy modules imported at registration: {', '.join(forbidden)}")
+    if median_ms > args.max_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds --max-ms {args.max_ms:.0f}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline_ms = json.load(f)["median_ms"]
+        limit = baseline_ms * (1 + args.tolerance / 100)
+        if median_ms > limit:
+            failures.append(f"median import time {median_ms:.1f} ms exceeds baseline "
+                            f"{baseline_ms:.1f} ms + {args.tolerance:.0f}%")
+
+    report = {
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": {"repeat": args.repeat, "max_ms": args.max_ms, "comfyui_dir": args.comfyui_dir or None},
+        "median_ms": round(median_ms, 2),
+        "runs_ms": [round(r["pack_ms"], 2) for r in runs],
+        "slowest_modules": [{"module": n, "self_ms": round(ms, 2)} for n, ms in slowest],
+        "forbidden_imports": forbidden,
+        "failures": failures,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+    print("✓ Import time OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Benchmark Script - Misst die LM Studio Nodes gegen den LM Studio Simulator
+(TAEbuLMStudioVisionRequest, TAEbuLMStudioVisionBatchRequest, TALMStudioLoadOnRun,
+TALMStudioAutoLoad, TAEbuLMStudioLoadModel)
+
+Startet LMSTUDIO_SIMULATOR.py im selben Prozess, legt das 'lms' Shim vorne
+in PATH und ruft die echten Node-Funktionen auf. Ausgegeben werden
+p50/p95/p99 Latenzen, Durchsatz und Fehler pro Szenario als JSON.
+Die Node-Funktionen sind async - jeder Lauf führt sie mit asyncio.run aus.
+
+Benötigt torch, numpy/PIL und aiohttp (wie in ComfyUI), aber weder LM Studio noch GPU.
+
+Beispiele:
+  python BENCH_LMSTUDIO_NODES.py --repeat 20
+  python BENCH_LMSTUDIO_NODES.py --scenarios vision --concurrency 4 --repeat 100
+  python BENCH_LMSTUDIO_NODES.py --scenarios vision_batch --batch-size 16 --batch-concurrency 4
+  python BENCH_LMSTUDIO_NODES.py --set load_seconds=3 --set chat_fail_rate=0.05 --json lms_bench.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+PACK_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_MODULE = "ta_nodes_pack"
+
+sys.path.insert(0, PACK_DIR)
+import LMSTUDIO_SIMULATOR as simulator  # noqa: E402
+
+SCENARIOS = ["vision", "vision_batch", "vision_stream_raw", "load_on_run", "auto_load", "load_model"]
+
+VISION_MODEL = "lmstudio-community/qwen2-vl-7b-instruct"
+
+
+def _import_pack(comfyui_dir):
+    if comfyui_dir and comfyui_dir not in sys.path:
+        sys.path.insert(0, comfyui_dir)
+    spec = importlib.util.spec_from_file_location(
+        PACK_MODULE, os.path.join(PACK_DIR, "__init__.py"),
+        submodule_search_locations=[PACK_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACK_MODULE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, pct):
+    """Nearest-Rank Perzentil"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# ---------------------------------------------------------------------------
+# Szenarien - jede Funktion liefert (prepare, run)
+# prepare() läuft ungemessen vor jedem Lauf, run() gibt True bei Erfolg zurück
+# ---------------------------------------------------------------------------
+
+def _make_image(size, batch=1):
+    import torch
+    return torch.rand(batch, size, size, 3)
+
+
+def scenario_vision(pack, server, args):
+    node = pack.NODE_CLASS_MAPPINGS["TAEbuLMStudioVisionRequest"]()
+    image = _make_image(args.image_size)
+    model = VISION_MODEL.split("/")[-1]
+    simulator.run_lms(server.state, ["load", VISION_MODEL, "-y"])
+
+    def run():
+        (text,) = asyncio.run(node.generate_prompt(image, "Describe this image in detail.", model, 0.7,
+                                                   args.max_tokens, server.url))
+        return not text.startswith(("Error", "[TA-Vision]"))
+
+    return None, run
+
+
+def scenario_vision_batch(pack, server, args):
+    # Ein Lauf = ein ganzer Batch; die Requests laufen per asyncio.gather parallel
+    node = pack.NODE_CLASS_MAPPINGS["TAEbuLMStudioVisionBatchRequest"]()
+    images = _make_image(args.image_size, args.batch_size)
+    model = VISION_MODEL.split("/")[-1]
+    simulator.run_lms(server.state, ["load", VISION_MODEL, "-y"])
+
+    def run():
+        texts, _dedupe_ratio = asyncio.run(node.generate_prompts(
+            images, "Describe this image in detail.", model, 0.7, args.max_tokens, server.url, args.batch_concurrency
+        ))
+        return not any(text.startswith(("Error", "[TA-Vision]")) for text in texts)
+
+    return None, run
+
+
+def scenario_vision_stream_raw(pack, server, args):
+    # Kein Node - misst Time-to-first-Token des Streaming-Endpunkts als Referenz
+    model = VISION_MODEL.split("/")[-1]
+    payload = json.dumps({
+        "model": model, "stream": True, "max_tokens": args.max_tokens,
+        "messages": [{"role": "user", "content": "Describe a forest."}],
+    }).encode("utf-8")
+
+    def run():
+        request = urllib.request.Request(
+            server.url + "/v1/chat/completions", data=payload, headers={"Content-Type": "application/json"}
+        )
+        started = time.perf_counter()
+        first_token = None
+        with urllib.request.urlopen(request, timeout=60) as response:
+            for line in response:
+                if line.startswith(b"data: ") and first_token is None:
+                    first_token = time.perf_counter() - started
+                if line.strip() == b"data: [DONE]":
+                    run.ttft.append(first_token)
+                    return True
+        return False
+
+    simulator.run_lms(server.state, ["load", VISION_MODEL, "-y"])
+    run.ttft = []
+    return None, run
+
+
+def scenario_load_on_run(pack, server, args):
+    node_class = pack.NODE_CLASS_MAPPINGS["TALMStudioLoadOnRun"]
+    models = node_class.get_available_models()
+    model = next((m for m in models if "qwen2-vl" in m), models[0])
+    node = node_class()
+
+    def run():
+        _api_name, status = asyncio.run(node.load_and_return(model, args.context_length, args.wait_time, False))
+        return status.startswith("Loaded")
+
+    return None, run
+
+
+def scenario_auto_load(pack, server, args):
+    # TALMStudioAutoLoad ist nicht registriert - direkt aus dem Pack importieren
+    module = importlib.import_module(f"{PACK_MODULE}.ta_lmstudio_auto_load")
+    node_class = module.TALMStudioAutoLoad
+    models = node_class.get_available_models()
+    model = next((m for m in models if "qwen2-vl" in m), models[0])
+    node = node_class()
+
+    def prepare():
+        # Sonst meldet die Node "Already loaded" und misst nur 'lms ps'
+        simulator.run_lms(server.state, ["unload", "--all"])
+
+    def run():
+        _api_name, status = asyncio.run(node.select_and_load(model, True, args.context_length))
+        return status in ("Loaded", "Already loaded")
+
+    return prepare, run
+
+
+def scenario_load_model(pack, server, args):
+    node = pack.NODE_CLASS_MAPPINGS["TAEbuLMStudioLoadModel"]()
+
+    def run():
+        _output, loaded = asyncio.run(node.load_model("qwen2 vl", args.context_length))
+        return not loaded.startswith("[TA-LMStudio]")
+
+    return None, run
+
+
+SCENARIO_FUNCTIONS = {
+    "vision": scenario_vision,
+    "vision_batch": scenario_vision_batch,
+    "vision_stream_raw": scenario_vision_stream_raw,
+    "load_on_run": scenario_load_on_run,
+    "auto_load": scenario_auto_load,
+    "load_model": scenario_load_model,
+}
+
+# Lade-Szenarien verändern den globalen Modellzustand - nie parallel ausführen
+SERIAL_SCENARIOS = {"load_on_run", "auto_load", "load_model"}
+
+
+def run_scenario(name, pack, server, args):
+    prepare, run = SCENARIO_FUNCTIONS[name](pack, server, args)
+    concurrency = 1 if name in SERIAL_SCENARIOS else args.concurrency
+    latencies = []
+    failures = 0
+    errors = []
+    lock = threading.Lock()
+
+    def timed(_):
+        nonlocal failures
+        if prepare is not None:
+            prepare()
+        start = time.perf_counter()
+        try:
+            ok = run()
+        except Exception as e:
+            ok = False
+            with lock:
+                errors.append(str(e))
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                failures += 1
+
+    for _ in range(args.warmup):
+        timed(None)
+    latencies.clear()
+    failures = 0
+    if hasattr(run, "ttft"):
+        run.ttft.clear()
+
+    wall_start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed, range(args.repeat)))
+    else:
+        for i in range(args.repeat):
+            timed(i)
+    wall = time.perf_counter() - wall_start
+
+    result = {
+        "scenario": name,
+        "runs": len(latencies),
+        "concurrency": concurrency,
+        "failures": failures,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p95_s": round(percentile(latencies, 95), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "mean_s": round(statistics.mean(latencies), 4),
+        "max_s": round(max(latencies), 4),
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall > 0 else None,
+        "wall_s": round(wall, 3),
+    }
+    ttft = [t for t in getattr(run, "ttft", []) if t is not None]
+    if ttft:
+        result["ttft_p50_s"] = round(percentile(ttft, 50), 4)
+        result["ttft_p95_s"] = round(percentile(ttft, 95), 4)
+    if errors:
+        result["errors"] = errors[:5]
+    result["simulator_counters"] = server.state.snapshot()["counters"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the TA LM Studio nodes against the offline simulator")
+    parser.add_argument("--comfyui-dir", default=os.environ.get("COMFYUI_DIR", ""),
+                        help="ComfyUI root (only needed if the pack imports ComfyUI modules)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated: {','.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=10, help="Measured runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel requests for the vision scenarios")
+    parser.add_argument("--image-size", type=int, default=512, help="Edge length of the test image")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per run in the vision_batch scenario")
+    parser.add_argument("--batch-concurrency", type=int, default=4,
+                        help="max_concurrency input of TAEbuLMStudioVisionBatchRequest")
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--context-length", type=int, default=8192)
+    parser.add_argument("--wait-time", type=int, default=1, help="wait_time input of TALMStudioLoadOnRun")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="KEY=VALUE",
+                        help="Simulator latency / failure setting (repeatable)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    config = simulator._parse_settings(args.settings)
+    server = simulator.start_simulator(config=config)
+    shim_dir = tempfile.mkdtemp(prefix="ta_lms_shim_")
+    simulator.write_lms_shim(shim_dir, server.url)
+    os.environ["PATH"] = shim_dir + os.pathsep + os.environ.get("PATH", "")
+    print(f"Simulator on {server.url}, lms shim in {shim_dir}")
+
+    results = []
+    try:
+        pack = _import_pack(args.comfyui_dir)
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in SCENARIO_FUNCTIONS:
+                raise SystemExit(f"Unknown scenario '{name}'. Available: {', '.join(SCENARIOS)}")
+            server.state.reset()
+            print(f"\n▶ {name} ({args.repeat} runs)")
+            r = run_scenario(name, pack, server, args)
+            results.append(r)
+            print(f"  p50 {r['p50_s']:.3f}s  p95 {r['p95_s']:.3f}s  p99 {r['p99_s']:.3f}s  "
+                  f"{r['throughput_per_s']}/s  failures {r['failures']}")
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(shim_dir, ignore_errors=True)
+
+    report = {
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "repeat": args.repeat, "concurrency": args.concurrency, "image_size": args.image_size,
+            "batch_size": args.batch_size, "batch_concurrency": args.batch_concurrency,
+            "max_tokens": args.max_tokens, "context_length": args.context_length,
+            "simulator": dict(simulator.DEFAULT_CONFIG, **config),
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"\nResults written to {args.json_path}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
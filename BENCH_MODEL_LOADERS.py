@@ -0,0 +1,422 @@
+"""
+Benchmark Script - Misst die Ladeleistung der drei TA Model Loader
+(TALoadCheckpointModelWithName, TALoadDiffusionModelWithName, TALoadGGUFModelWithName)
+
+Erzeugt synthetische safetensors- und GGUF-Dateien beliebiger Größe (nur CPU),
+führt jeden Loader kalt (Page-Cache verworfen) und warm aus und gibt
+Wall-Time, MB/s, Peak-RSS und Allokationen als JSON aus.
+
+Jeder Lauf startet in einem eigenen Prozess, damit Peak-RSS pro Lauf stimmt.
+
+Beispiele:
+  python BENCH_MODEL_LOADERS.py --comfyui-dir ~/ComfyUI --size-mb 1024 --repeat 3
+  python BENCH_MODEL_LOADERS.py --comfyui-dir ~/ComfyUI --checkpoint sd_xl_base_1.0.safetensors --json result.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+PACK_DIR = os.path.dirname(os.path.abspath(__file__))
+PACK_MODULE = "ta_nodes_pack"
+
+TENSOR_ROWS = 4096
+TENSOR_COLS = 4096
+GGUF_ALIGNMENT = 32
+GGML_TYPE_F16 = 1
+GGUF_PACKAGE = "ComfyUI-GGUF"
+
+
+# ---------------------------------------------------------------------------
+# Synthetische Dateien
+# ---------------------------------------------------------------------------
+
+def _random_block(size):
+    # Ein zufälliger Block wird wiederverwendet - Kompression spielt keine Rolle
+    return os.urandom(size)
+
+
+def _tensor_count(size_mb):
+    tensor_bytes = TENSOR_ROWS * TENSOR_COLS * 2
+    return max(1, (size_mb * 1024 * 1024) // tensor_bytes)
+
+
+def write_synthetic_safetensors(path, size_mb):
+    """Schreibt eine safetensors-Datei mit F16-Tensoren im UNet-Namensschema"""
+    count = _tensor_count(size_mb)
+    tensor_bytes = TENSOR_ROWS * TENSOR_COLS * 2
+
+    header = {"__metadata__": {"format": "pt", "generator": "BENCH_MODEL_LOADERS"}}
+    for i in range(count):
+        header[f"model.diffusion_model.blocks.{i}.weight"] = {
+            "dtype": "F16",
+            "shape": [TENSOR_ROWS, TENSOR_COLS],
+            "data_offsets": [i * tensor_bytes, (i + 1) * tensor_bytes],
+        }
+    header_bytes = json.dumps(header).encode("utf-8")
+    # Header auf 8 Byte auffüllen (laut Spezifikation mit Leerzeichen)
+    header_bytes += b" " * (-len(header_bytes) % 8)
+
+    block = _random_block(tensor_bytes)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for _ in range(count):
+            f.write(block)
+    return path
+
+
+def _gguf_string(value):
+    data = value.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def write_synthetic_gguf(path, size_mb, architecture="flux"):
+    """Schreibt eine GGUF v3 Datei mit F16-Tensoren (ComfyUI-GGUF kompatibles Layout)"""
+    count = _tensor_count(size_mb)
+    tensor_bytes = TENSOR_ROWS * TENSOR_COLS * 2
+
+    kv = _gguf_string("general.architecture") + struct.pack("<I", 8) + _gguf_string(architecture)
+    kv += _gguf_string("general.alignment") + struct.pack("<I", 4) + struct.pack("<I", GGUF_ALIGNMENT)
+
+    infos = b""
+    for i in range(count):
+        infos += _gguf_string(f"double_blocks.{i}.img_mlp.0.weight")
+        # GGUF speichert Dimensionen in umgekehrter Reihenfolge (ne[0] = innerste)
+        infos += struct.pack("<I", 2) + struct.pack("<2Q", TENSOR_COLS, TENSOR_ROWS)
+        infos += struct.pack("<IQ", GGML_TYPE_F16, i * tensor_bytes)
+
+    header = b"GGUF" + struct.pack("<IQQ", 3, count, 2) + kv + infos
+    header += b"\0" * (-len(header) % GGUF_ALIGNMENT)
+
+    block = _random_block(tensor_bytes)
+    with open(path, "wb") as f:
+        f.write(header)
+        for _ in range(count):
+            f.write(block)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Worker (läuft in eigenem Prozess)
+# ---------------------------------------------------------------------------
+
+def _current_rss_mb():
+    """Aktuelle RSS (nicht der Peak) - None, wenn die Plattform sie nicht liefert"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KB, macOS: Bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def evict_page_cache(path):
+    """Verwirft die Seiten der Datei aus dem Page-Cache (ohne root, nur saubere Seiten)"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def _import_pack(comfyui_dir):
+    if comfyui_dir and comfyui_dir not in sys.path:
+        sys.path.insert(0, comfyui_dir)
+    spec = importlib.util.spec_from_file_location(
+        PACK_MODULE, os.path.join(PACK_DIR, "__init__.py"),
+        submodule_search_locations=[PACK_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACK_MODULE] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _import_gguf_loader():
+    """
+    gguf_sd_loader aus ComfyUI-GGUF - das Paket nutzt relative Imports und muss
+    daher wie von ComfyUI unter seinem Verzeichnisnamen als Paket geladen werden
+    """
+    import importlib
+    import folder_paths
+    gguf_dir = os.path.join(folder_paths.base_path, "custom_nodes", GGUF_PACKAGE)
+    if GGUF_PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            GGUF_PACKAGE, os.path.join(gguf_dir, "__init__.py"),
+            submodule_search_locations=[gguf_dir]
+        )
+        if spec is None:
+            raise ImportError(f"{GGUF_PACKAGE} not found in {os.path.dirname(gguf_dir)}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[GGUF_PACKAGE] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[GGUF_PACKAGE]
+            raise
+    return importlib.import_module(f"{GGUF_PACKAGE}.loader").gguf_sd_loader
+
+
+def _build_runner(case):
+    """
+    Liefert (Funktion, die genau einen Ladevorgang ausführt, gemessene Stufe)
+    """
+    loader, mode, target = case["loader"], case["mode"], case["target"]
+
+    if mode == "node":
+        nodes = sys.modules[PACK_MODULE].NODE_CLASS_MAPPINGS
+        node = nodes[loader]()
+        func = getattr(node, node.FUNCTION)
+        kwargs = dict(case.get("node_args", {}))
+        return (lambda: func(**kwargs)), f"{loader}.{node.FUNCTION}"
+
+    # Synthetische Dateien: comfy.sd kann keine Architektur erkennen,
+    # daher wird die I/O-Stufe gemessen, die der jeweilige Loader nutzt
+    if target.endswith(".gguf"):
+        try:
+            gguf_sd_loader = _import_gguf_loader()
+        except Exception as e:
+            # Ohne ComfyUI-GGUF nur roher Dateidurchsatz - im Ergebnis vermerkt
+            return (lambda: _read_file(target)), f"raw read (ComfyUI-GGUF unavailable: {e})"
+        return (lambda: gguf_sd_loader(target)), "gguf_sd_loader"
+
+    import comfy.utils
+    return (lambda: comfy.utils.load_torch_file(target, safe_load=True)), "comfy.utils.load_torch_file"
+
+
+def _read_file(path):
+    with open(path, "rb", buffering=0) as f:
+        buffer = bytearray(16 * 1024 * 1024)
+        while f.readinto(buffer):
+            pass
+
+
+def run_worker(case, comfyui_dir, trace_alloc):
+    _import_pack(comfyui_dir)
+    runner, stage = _build_runner(case)
+
+    evicted = False
+    if case["phase"] == "cold":
+        evicted = evict_page_cache(case["file"])
+
+    rss_before = _current_rss_mb()
+    if trace_alloc:
+        import tracemalloc
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    result = runner()
+    wall = time.perf_counter() - start
+
+    alloc_blocks = alloc_peak_mb = None
+    if trace_alloc:
+        snapshot = tracemalloc.take_snapshot()
+        alloc_blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+        alloc_peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    del result
+    size_mb = os.path.getsize(case["file"]) / 1024 / 1024
+    peak = _peak_rss_mb()
+
+    return {
+        "loader": case["loader"],
+        "mode": case["mode"],
+        "file": os.path.basename(case["file"]),
+        "phase": case["phase"],
+        "stage": stage,
+        "size_mb": round(size_mb, 1),
+        "wall_s": round(wall, 4),
+        "mb_per_s": round(size_mb / wall, 1) if wall > 0 else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+        # Peak während des Ladens minus RSS direkt davor
+        "rss_delta_mb": round(peak - rss_before, 1) if None not in (peak, rss_before) else None,
+        "alloc_blocks": alloc_blocks,
+        "alloc_peak_mb": round(alloc_peak_mb, 1) if alloc_peak_mb is not None else None,
+        "cache_evicted": evicted,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Steuerung
+# ---------------------------------------------------------------------------
+
+def _run_case_subprocess(case, args):
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--worker", json.dumps(case),
+        "--comfyui-dir", args.comfyui_dir or "",
+    ]
+    if args.trace_alloc:
+        cmd.append("--trace-alloc")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"loader": case["loader"], "phase": case["phase"], "error": result.stderr.strip()[-2000:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _resolve_model(folder, name):
+    import folder_paths
+    path = folder_paths.get_full_path(folder, name)
+    if not path:
+        raise SystemExit(f"Model not found in '{folder}': {name}")
+    return path
+
+
+def build_cases(args, workdir):
+    cases = []
+
+    if args.checkpoint or args.diffusion_model or args.gguf_model:
+        _import_pack(args.comfyui_dir)
+        if args.checkpoint:
+            cases.append({
+                "loader": "TALoadCheckpointModelWithName", "mode": "node",
+                "target": args.checkpoint, "file": _resolve_model("checkpoints", args.checkpoint),
+                "node_args": {"ckpt_name": args.checkpoint},
+            })
+        if args.diffusion_model:
+            cases.append({
+                "loader": "TALoadDiffusionModelWithName", "mode": "node",
+                "target": args.diffusion_model, "file": _resolve_model("diffusion_models", args.diffusion_model),
+                "node_args": {"unet_name": args.diffusion_model, "weight_dtype": args.weight_dtype},
+            })
+        if args.gguf_model:
+            node_class = sys.modules[PACK_MODULE].NODE_CLASS_MAPPINGS["TALoadGGUFModelWithName"]
+            cases.append({
+                "loader": "TALoadGGUFModelWithName", "mode": "node",
+                "target": args.gguf_model, "file": node_class.find_unet_path(args.gguf_model),
+                "node_args": {"unet_name": args.gguf_model},
+            })
+        return cases
+
+    print(f"Generating synthetic files ({args.size_mb} MB each) in {workdir} ...")
+    st_path = write_synthetic_safetensors(os.path.join(workdir, "synthetic.safetensors"), args.size_mb)
+    gguf_path = write_synthetic_gguf(os.path.join(workdir, "synthetic.gguf"), args.size_mb)
+
+    for loader, path in [
+        ("TALoadCheckpointModelWithName", st_path),
+        ("TALoadDiffusionModelWithName", st_path),
+        ("TALoadGGUFModelWithName", gguf_path),
+    ]:
+        cases.append({"loader": loader, "mode": "read_stage", "target": path, "file": path})
+    return cases
+
+
+def summarize(results):
+    summary = {}
+    for r in results:
+        if "error" in r:
+            continue
+        bucket = summary.setdefault(r["loader"], {}).setdefault(r["phase"], [])
+        bucket.append(r)
+
+    table = {}
+    for loader, phases in summary.items():
+        for phase, runs in phases.items():
+            walls = [r["wall_s"] for r in runs]
+            table.setdefault(loader, {})[phase] = {
+                "runs": len(runs),
+                "stages": sorted({r.get("stage") for r in runs if r.get("stage")}),
+                "wall_s_median": round(statistics.median(walls), 4),
+                "wall_s_min": round(min(walls), 4),
+                "mb_per_s_median": round(statistics.median(r["mb_per_s"] for r in runs), 1),
+                "peak_rss_mb_max": max((r["peak_rss_mb"] or 0) for r in runs),
+            }
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-performance benchmark for the TA model loaders")
+    parser.add_argument("--comfyui-dir", default=os.environ.get("COMFYUI_DIR", ""),
+                        help="ComfyUI root (for folder_paths / comfy.sd)")
+    parser.add_argument("--size-mb", type=int, default=512, help="Size of the synthetic files")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per phase")
+    parser.add_argument("--phases", default="cold,warm", help="Comma separated: cold,warm")
+    parser.add_argument("--checkpoint", help="Benchmark the real node with this checkpoint name")
+    parser.add_argument("--diffusion-model", help="Benchmark the real node with this diffusion model name")
+    parser.add_argument("--weight-dtype", default="default", help="weight_dtype for --diffusion-model")
+    parser.add_argument("--gguf-model", help="Benchmark the real node with this GGUF model name")
+    parser.add_argument("--trace-alloc", action="store_true", help="Count Python allocations (tracemalloc, slower)")
+    parser.add_argument("--keep-files", action="store_true", help="Keep the synthetic files")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker), args.comfyui_dir, args.trace_alloc)))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="ta_bench_")
+    try:
+        cases = build_cases(args, workdir)
+        phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+
+        results = []
+        for case in cases:
+            for phase in phases:
+                for i in range(args.repeat):
+                    run = dict(case, phase=phase)
+                    r = _run_case_subprocess(run, args)
+                    r["repeat"] = i
+                    results.append(r)
+                    if "error" in r:
+                        print(f"✗ {case['loader']} [{phase} #{i + 1}] failed:\n{r['error']}")
+                    else:
+                        print(f"✓ {case['loader']} [{phase} #{i + 1}] {r['wall_s']:.3f}s "
+                              f"{r['mb_per_s']} MB/s peak RSS {r['peak_rss_mb']} MB")
+                        if r.get("stage", "").startswith("raw read"):
+                            print(f"  ! measured {r['stage']}")
+    finally:
+        if not args.keep_files:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {"size_mb": args.size_mb, "repeat": args.repeat, "phases": phases},
+        "results": results,
+        "summary": summarize(results),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"\nResults written to {args.json_path}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,544 @@
+"""
+LM Studio Simulator - Lokaler Ersatz für LM Studio (REST Server + lms CLI)
+Zum Testen und Benchmarken der LM Studio Nodes ohne LM Studio und ohne GPU
+
+Stellt bereit:
+  POST /v1/chat/completions   OpenAI-kompatibel, mit und ohne Streaming (SSE)
+  GET  /v1/models             Heruntergeladene Modelle
+  POST /sim/lms               Backend für das erzeugte 'lms' Shim (ls, ps, load, unload)
+  GET  /sim/state             Geladene Modelle, Konfiguration, Zähler
+  POST /sim/config            Konfiguration zur Laufzeit ändern (JSON)
+  POST /sim/reset             Alle Modelle entladen, Zähler zurücksetzen
+
+Latenzen und Fehlerraten sind über DEFAULT_CONFIG / --set key=value einstellbar.
+
+Beispiele:
+  python LMSTUDIO_SIMULATOR.py --port 1234 --shim-dir /tmp/lms-sim
+  python LMSTUDIO_SIMULATOR.py --set load_seconds=5 --set chat_fail_rate=0.1
+  (danach: PATH=/tmp/lms-sim:$PATH, damit die Nodes das Shim als 'lms' finden)
+"""
+
+import argparse
+import json
+import os
+import random
+import shlex
+import stat
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Modelle, die 'lms ls' anzeigt - Pfad -> Vision-fähig
+DEFAULT_MODELS = {
+    "lmstudio-community/qwen2-vl-7b-instruct": True,
+    "lmstudio-community/llava-v1.5-7b": True,
+    "mistralai/pixtral-12b": True,
+    "google/gemma-3-27b": True,
+    "lmstudio-community/mistral-7b-instruct-v0.3": False,
+    "lmstudio-community/qwen2.5-7b-instruct": False,
+}
+
+DEFAULT_CONFIG = {
+    # Chat Completions
+    "ttft_seconds": 0.05,           # Zeit bis zum ersten Token
+    "token_seconds": 0.005,         # pro generiertem Token
+    "image_seconds": 0.03,          # Vorverarbeitung pro Bild
+    "response_tokens": 60,          # Länge der Antwort (begrenzt durch max_tokens)
+    "max_images_per_request": 0,    # Mehr Bilder pro Request -> HTTP 400 (0 = unbegrenzt)
+    "chat_fail_rate": 0.0,          # Anteil Requests mit HTTP 500
+    "chat_drop_rate": 0.0,          # Anteil Requests, deren Verbindung ohne Antwort geschlossen wird
+    "jit_load": False,              # Nicht geladene Modelle automatisch laden (sonst 404)
+    # lms CLI
+    "ls_seconds": 0.05,
+    "ps_seconds": 0.02,
+    "load_seconds": 0.5,            # Basis-Ladezeit
+    "load_seconds_per_1k_ctx": 0.01,
+    "unload_seconds": 0.1,
+    "load_fail_rate": 0.0,          # Anteil 'lms load' Aufrufe mit Exit-Code 1
+    "unload_fail_rate": 0.0,
+    "seed": 0,
+}
+
+FILLER_TEXT = (
+    "a detailed photograph of a young woman with long red hair wearing a green wool coat "
+    "standing in a misty autumn forest with golden leaves soft morning light shallow depth "
+    "of field cinematic composition warm colors high detail sharp focus natural skin texture"
+).split()
+
+
+class SimulatorState:
+    """Geladene Modelle, Konfiguration und Zähler - von allen Request-Threads geteilt"""
+
+    def __init__(self, models=None, config=None):
+        self.models = dict(DEFAULT_MODELS if models is None else models)
+        self.config = dict(DEFAULT_CONFIG)
+        if config:
+            self.config.update(config)
+        self.loaded = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.random = random.Random(self.config["seed"])
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def chance(self, key):
+        rate = self.config.get(key, 0.0)
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def find_model(self, name):
+        """Sucht ein Modell per Pfad, Key (letzter Pfadteil) oder Teilstring"""
+        name = name.strip().lstrip("/")
+        if name in self.models:
+            return name
+        for path in self.models:
+            if path.split("/")[-1] == name:
+                return path
+        matches = [path for path in self.models if name.lower() in path.lower()]
+        return matches[0] if len(matches) == 1 else None
+
+    def find_loaded(self, name):
+        with self.lock:
+            if name in self.loaded:
+                return name
+            for identifier, info in self.loaded.items():
+                if name == info["path"] or name.lstrip("/") == info["path"]:
+                    return identifier
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "models": self.models,
+                "loaded": dict(self.loaded),
+                "config": dict(self.config),
+                "counters": dict(self.counters),
+            }
+
+    def reset(self):
+        with self.lock:
+            self.loaded.clear()
+            self.counters.clear()
+            self.random = random.Random(self.config["seed"])
+
+
+# ---------------------------------------------------------------------------
+# lms CLI
+# ---------------------------------------------------------------------------
+
+def _option(args, name, default=None):
+    for i, arg in enumerate(args):
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+        if arg == name and i + 1 < len(args):
+            return args[i + 1]
+    return default
+
+
+def run_lms(state, args):
+    """Führt ein 'lms' Kommando aus - gibt (returncode, stdout, stderr) zurück"""
+    config = state.config
+    command = args[0] if args else ""
+    state.count(f"lms_{command or 'none'}")
+
+    if command == "ls":
+        time.sleep(config["ls_seconds"])
+        lines = [f"You have {len(state.models)} models, taking up {4.2 * len(state.models):.1f} GB of disk space.", ""]
+        lines.append("LLMs (Large Language Models)                         PARAMS      SIZE")
+        for path, vision in state.models.items():
+            lines.append(f"/{path:<55} 7B      4.20 GB{'   vision' if vision else ''}")
+        return 0, "\n".join(lines) + "\n", ""
+
+    if command == "ps":
+        time.sleep(config["ps_seconds"])
+        with state.lock:
+            loaded = dict(state.loaded)
+        if not loaded:
+            return 0, "No models are currently loaded\n", ""
+        lines = ["LOADED MODELS", ""]
+        for identifier, info in loaded.items():
+            lines.append(f"Identifier: {identifier}")
+            lines.append(f"  • Path: {info['path']}")
+            lines.append(f"  • Context Length: {info['context_length']}")
+        return 0, "\n".join(lines) + "\n", ""
+
+    if command == "load":
+        positional = [a for a in args[1:] if not a.startswith("-")]
+        if not positional:
+            return 1, "", "Error: no model specified\n"
+        path = state.find_model(positional[0])
+        if path is None:
+            return 1, "", f"Error: Cannot find a model matching '{positional[0]}'\n"
+
+        try:
+            context_length = int(_option(args, "--context-length", 4096))
+        except ValueError:
+            return 1, "", "Error: invalid --context-length\n"
+        identifier = _option(args, "--identifier", path.split("/")[-1])
+
+        time.sleep(config["load_seconds"] + config["load_seconds_per_1k_ctx"] * context_length / 1000)
+        if state.chance("load_fail_rate"):
+            state.count("lms_load_failed")
+            return 1, "", f"Error: Failed to load model {path} (injected failure)\n"
+
+        with state.lock:
+            state.loaded[identifier] = {
+                "path": path,
+                "context_length": context_length,
+                "gpu": _option(args, "--gpu", "max"),
+                "vision": state.models[path],
+                "loaded_at": time.time(),
+            }
+        return 0, f"Model loaded successfully in {config['load_seconds']:.2f}s.\n", (
+            f'Loading model "{path}"...\n'
+            f'To use the model in the API/SDK, use the identifier "{identifier}".\n'
+        )
+
+    if command == "unload":
+        time.sleep(config["unload_seconds"])
+        if state.chance("unload_fail_rate"):
+            state.count("lms_unload_failed")
+            return 1, "", "Error: Failed to unload (injected failure)\n"
+        with state.lock:
+            if "--all" in args or "-a" in args:
+                if not state.loaded:
+                    return 0, "No models to unload\n", ""
+                count = len(state.loaded)
+                state.loaded.clear()
+                return 0, f"Unloaded {count} model(s)\n", ""
+            names = [a for a in args[1:] if not a.startswith("-")]
+            if not names or names[0] not in state.loaded:
+                return 1, "", "Error: No loaded model with that identifier\n"
+            del state.loaded[names[0]]
+        return 0, f"Unloaded {names[0]}\n", ""
+
+    return 1, "", f"Error: unknown command '{command}' (simulator supports ls, ps, load, unload)\n"
+
+
+# ---------------------------------------------------------------------------
+# REST Server
+# ---------------------------------------------------------------------------
+
+def _count_images(messages):
+    images = 0
+    text_chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            text_chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    images += 1
+                elif part.get("type") == "text":
+                    text_chars += len(part.get("text", ""))
+    return images, text_chars
+
+
+def _completion_tokens(state, max_tokens):
+    count = min(state.config["response_tokens"], max_tokens or state.config["response_tokens"])
+    return [FILLER_TEXT[i % len(FILLER_TEXT)] for i in range(max(count, 1))]
+
+
+def _fill_schema(schema, words):
+    """Minimaler Wert passend zu einem JSON-Schema (response_format json_schema)"""
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _fill_schema(sub, words) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        count = schema.get("minItems", schema.get("maxItems", 3))
+        return [_fill_schema(schema.get("items", {}), words[i:] + words[:i]) for i in range(count)]
+    if kind == "number":
+        return 1.0
+    if kind == "integer":
+        return 1
+    if kind == "boolean":
+        return True
+    if "enum" in schema:
+        return schema["enum"][0]
+    return " ".join(words[:8])
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    server_version = "LMStudioSimulator/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json(status, {"error": {"message": message, "type": "simulator_error"}})
+
+    def do_GET(self):
+        if self.path == "/v1/models":
+            self.state.count("http_models")
+            data = [{"id": path.split("/")[-1], "object": "model", "owned_by": path.split("/")[0]}
+                    for path in self.state.models]
+            return self._send_json(200, {"object": "list", "data": data})
+        if self.path == "/sim/state":
+            return self._send_json(200, self.state.snapshot())
+        self._send_error(404, f"Unexpected endpoint or method. (GET {self.path})")
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except ValueError:
+            return self._send_error(400, "Invalid JSON body")
+
+        if self.path == "/v1/chat/completions":
+            return self._chat_completions(payload)
+        if self.path == "/sim/lms":
+            code, stdout, stderr = run_lms(self.state, payload.get("args", []))
+            return self._send_json(200, {"returncode": code, "stdout": stdout, "stderr": stderr})
+        if self.path == "/sim/config":
+            with self.state.lock:
+                self.state.config.update(payload)
+            return self._send_json(200, self.state.snapshot()["config"])
+        if self.path == "/sim/reset":
+            self.state.reset()
+            return self._send_json(200, {"ok": True})
+        self._send_error(404, f"Unexpected endpoint or method. (POST {self.path})")
+
+    def _chat_completions(self, payload):
+        state = self.state
+        config = state.config
+        state.count("chat_requests")
+        started = time.perf_counter()
+
+        model = payload.get("model", "")
+        identifier = state.find_loaded(model)
+        if identifier is None and config["jit_load"]:
+            path = state.find_model(model)
+            if path is not None:
+                run_lms(state, ["load", path, "-y"])
+                identifier = state.find_loaded(path.split("/")[-1])
+        if identifier is None:
+            state.count("chat_not_loaded")
+            return self._send_error(404, f"Model '{model}' not found. Please load the model first.")
+
+        with state.lock:
+            vision = state.loaded[identifier]["vision"]
+        images, text_chars = _count_images(payload.get("messages", []))
+        if images and not vision:
+            state.count("chat_rejected_images")
+            return self._send_error(400, f"Model '{identifier}' does not support images.")
+        if images > 1 and 0 < config["max_images_per_request"] < images:
+            state.count("chat_rejected_multi_image")
+            return self._send_error(400, f"Model '{identifier}' supports at most "
+                                         f"{config['max_images_per_request']} image(s) per request.")
+
+        if state.chance("chat_drop_rate"):
+            state.count("chat_dropped")
+            self.close_connection = True
+            self.connection.close()
+            return
+        if state.chance("chat_fail_rate"):
+            state.count("chat_failed")
+            return self._send_error(500, "Internal server error (injected failure)")
+
+        tokens = _completion_tokens(state, payload.get("max_tokens"))
+        prompt_tokens = text_chars // 4 + images * 256
+        time.sleep(config["ttft_seconds"] + images * config["image_seconds"])
+
+        if payload.get("stream"):
+            return self._stream(identifier, tokens, prompt_tokens)
+
+        content = " ".join(tokens)
+        response_format = payload.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            # Structured Output: Antwort passt zum Schema, Dauer wie bei entsprechend vielen Tokens
+            schema = (response_format.get("json_schema") or {}).get("schema", {})
+            content = json.dumps(_fill_schema(schema, tokens))
+            tokens = content.split()
+
+        time.sleep(config["token_seconds"] * len(tokens))
+        state.count("chat_completed")
+        self._send_json(200, {
+            "id": f"chatcmpl-sim-{state.counters.get('chat_requests', 0)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": identifier,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "length" if len(tokens) == payload.get("max_tokens") else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+            },
+            "stats": {"simulated_seconds": round(time.perf_counter() - started, 4)},
+        })
+
+    def _stream(self, identifier, tokens, prompt_tokens):
+        # Server-Sent Events wie bei OpenAI: ein Chunk pro Token, dann [DONE]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(data):
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.state.config["token_seconds"])
+                send(json.dumps({
+                    "object": "chat.completion.chunk",
+                    "model": identifier,
+                    "choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token},
+                                 "finish_reason": None}],
+                }))
+            send(json.dumps({
+                "object": "chat.completion.chunk",
+                "model": identifier,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)},
+            }))
+            send("[DONE]")
+            self.state.count("chat_completed")
+        except (BrokenPipeError, ConnectionResetError):
+            self.state.count("chat_client_disconnected")
+        self.close_connection = True
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state, verbose=False):
+        super().__init__(address, SimulatorHandler)
+        self.state = state
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def write_lms_shim(directory, url):
+    """
+    Erzeugt ein ausführbares 'lms' (plus lms.cmd unter Windows), das alle
+    Aufrufe an den Simulator weiterleitet - directory vorne in PATH setzen
+    """
+    os.makedirs(directory, exist_ok=True)
+    script = os.path.join(directory, "lms_shim.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(
+            "# Erzeugt von LMSTUDIO_SIMULATOR.py - leitet 'lms' Aufrufe an den Simulator weiter\n"
+            "import json, sys, urllib.request\n"
+            f"URL = {url!r}\n"
+            "request = urllib.request.Request(\n"
+            "    URL + '/sim/lms', data=json.dumps({'args': sys.argv[1:]}).encode('utf-8'),\n"
+            "    headers={'Content-Type': 'application/json'}\n"
+            ")\n"
+            "try:\n"
+            "    with urllib.request.urlopen(request, timeout=600) as response:\n"
+            "        result = json.load(response)\n"
+            "except Exception as e:\n"
+            "    sys.stderr.write(f'lms simulator not reachable at {URL}: {e}\\n')\n"
+            "    sys.exit(1)\n"
+            "sys.stdout.write(result['stdout'])\n"
+            "sys.stderr.write(result['stderr'])\n"
+            "sys.exit(result['returncode'])\n"
+        )
+
+    if os.name == "nt":
+        shim = os.path.join(directory, "lms.cmd")
+        with open(shim, "w", encoding="utf-8") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        shim = os.path.join(directory, "lms")
+        with open(shim, "w", encoding="utf-8") as f:
+            f.write(f"#!/bin/sh\nexec {shlex.quote(sys.executable)} {shlex.quote(script)} \"$@\"\n")
+        os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return shim
+
+
+def start_simulator(host="127.0.0.1", port=0, config=None, models=None, verbose=False):
+    """
+    Startet den Simulator in einem Hintergrund-Thread (port=0: freier Port)
+    Gibt den Server zurück - server.url, server.state, server.shutdown()
+    """
+    server = SimulatorServer((host, port), SimulatorState(models, config), verbose)
+    thread = threading.Thread(target=server.serve_forever, name="LMStudioSimulator", daemon=True)
+    thread.start()
+    return server
+
+
+def _parse_settings(pairs):
+    settings = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        if key not in DEFAULT_CONFIG:
+            raise SystemExit(f"Unknown setting '{key}'. Available: {', '.join(DEFAULT_CONFIG)}")
+        default = DEFAULT_CONFIG[key]
+        if isinstance(default, bool):
+            settings[key] = value.lower() in ("1", "true", "yes", "on")
+        else:
+            settings[key] = type(default)(value)
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline LM Studio simulator (REST server + lms CLI shim)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--shim-dir", help="Write an 'lms' shim into this directory")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a latency / failure setting (repeatable)")
+    parser.add_argument("--models", help="JSON file {model_path: is_vision} replacing the default catalog")
+    parser.add_argument("--verbose", action="store_true", help="Log every HTTP request")
+    args = parser.parse_args()
+
+    models = None
+    if args.models:
+        with open(args.models, encoding="utf-8") as f:
+            models = json.load(f)
+
+    server = SimulatorServer((args.host, args.port), SimulatorState(models, _parse_settings(args.settings)),
+                             args.verbose)
+    print(f"LM Studio simulator listening on {server.url}")
+    if args.shim_dir:
+        shim = write_lms_shim(args.shim_dir, server.url)
+        print(f"lms shim: {shim}")
+        print(f"  export PATH={os.path.abspath(args.shim_dir)}{os.pathsep}$PATH")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,45 @@
 """
 Test Script - Testet ob ein Modell geladen werden kann
 Hilft herauszufinden welcher Modellname für 'lms load' funktioniert
+
+Mit mehreren Optionen wird daraus ein Benchmark für Laden/Wechseln von
+LM Studio Modellen. Pro Modell x Kontextlänge x GPU-Einstellung und
+Wiederholung werden gemessen:
+
+    cold    'lms unload --all', dann Laden (optional vorher --drop-caches-cmd)
+    warm    dasselbe Modell entladen und sofort neu laden (Dateien im Page-Cache)
+    switch  Modell A geladen -> entladen -> Modell B laden (wie TALMStudioLoadOnRun)
+
+Jeweils: Unload-Zeit, Load-Zeit und Zeit bis zur ersten erfolgreichen
+Chat-Completion (ab Start des Ladens). Ausgabe als Perzentil-Tabelle und JSON.
+
+Beispiele:
+  python TEST_MODEL_LOAD.py google/gemma-3-27b
+  python TEST_MODEL_LOAD.py qwen2-vl-7b-instruct llava-v1.5-7b --repeat 5 --context-lengths 4096,16384
+  python TEST_MODEL_LOAD.py qwen2-vl-7b-instruct --gpu max,0.5 --json load_bench.json
+  python TEST_MODEL_LOAD.py qwen2-vl-7b-instruct llava-v1.5-7b --simulator --set load_seconds=2
 """
 
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
 import subprocess
 import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+PHASES = ["cold", "warm", "switch"]
+METRICS = ["unload_s", "load_s", "ttfc_s"]
+
+# Feste API-Kennung - die Completion-Prüfung muss den Modellnamen nicht raten
+BENCH_IDENTIFIER = "ta-load-bench"
+
 
 def test_model_load(model_name):
     """Testet ob ein Modell geladen werden kann"""
@@ -84,15 +119,260 @@ def test_model_load(model_name):
     
     print("\n" + "=" * 70)
 
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def percentile(values, pct):
+    """Nearest-Rank Perzentil"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _lms(args, timeout):
+    """Führt 'lms' aus - gibt (ok, Sekunden, Fehlertext) zurück"""
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(['lms'] + args, capture_output=True, text=True, timeout=timeout,
+                                encoding='utf-8', errors='replace')
+    except subprocess.TimeoutExpired:
+        return False, time.perf_counter() - started, f"timeout after {timeout}s"
+    except FileNotFoundError:
+        raise SystemExit("lms CLI not found - install LM Studio or use --simulator")
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        return False, elapsed, (result.stderr or result.stdout).strip()[:300]
+    return True, elapsed, None
+
+
+def _completion_ok(server_url, prompt):
+    payload = json.dumps({
+        "model": BENCH_IDENTIFIER,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 1,
+        "temperature": 0,
+        "stream": False,
+    }).encode("utf-8")
+    request = urllib.request.Request(
+        server_url.rstrip("/") + "/v1/chat/completions", data=payload, headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = json.loads(response.read())
+        return bool(body.get("choices"))
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+
+def _wait_first_completion(server_url, prompt, deadline, poll=0.25):
+    while True:
+        if _completion_ok(server_url, prompt):
+            return True
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(poll)
+
+
+def _load_and_complete(model, context_length, gpu, args):
+    """Lädt ein Modell und wartet auf die erste Completion - (Messwerte, Fehler)"""
+    started = time.perf_counter()
+    ok, load_s, error = _lms(['load', model, '-y', f'--context-length={context_length}', f'--gpu={gpu}',
+                              f'--identifier={BENCH_IDENTIFIER}'], args.load_timeout)
+    if not ok:
+        return {"load_s": load_s}, f"load failed: {error}"
+    if not _wait_first_completion(args.server_url, args.prompt, time.perf_counter() + args.ready_timeout):
+        return {"load_s": load_s}, f"no successful completion within {args.ready_timeout}s"
+    return {"load_s": load_s, "ttfc_s": time.perf_counter() - started}, None
+
+
+def _drop_caches(args):
+    if args.drop_caches_cmd:
+        subprocess.run(args.drop_caches_cmd, shell=True, check=False)
+
+
+def run_phase(phase, model, next_model, context_length, gpu, args):
+    """Eine Messung - das Zielmodell ist danach geladen"""
+    sample = {}
+    if phase == "cold":
+        ok, sample["unload_s"], error = _lms(['unload', '--all', '-y'], args.unload_timeout)
+        _drop_caches(args)
+        target = model
+    elif phase == "warm":
+        # Vorbedingung: Modell geladen (ungemessen), dann entladen + neu laden
+        _lms(['unload', '--all', '-y'], args.unload_timeout)
+        _load_and_complete(model, context_length, gpu, args)
+        ok, sample["unload_s"], error = _lms(['unload', BENCH_IDENTIFIER], args.unload_timeout)
+        target = model
+    else:
+        _lms(['unload', '--all', '-y'], args.unload_timeout)
+        _load_and_complete(model, context_length, gpu, args)
+        ok, sample["unload_s"], error = _lms(['unload', '--all', '-y'], args.unload_timeout)
+        target = next_model
+
+    if not ok:
+        return sample, f"unload failed: {error}"
+    measured, error = _load_and_complete(target, context_length, gpu, args)
+    sample.update(measured)
+    return sample, error
+
+
+def summarize(samples):
+    summary = {}
+    for metric in METRICS:
+        values = [s[metric] for s in samples if s.get(metric) is not None]
+        if not values:
+            continue
+        summary[metric] = {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 4),
+            "p90": round(percentile(values, 90), 4),
+            "p99": round(percentile(values, 99), 4),
+            "mean": round(statistics.mean(values), 4),
+            "max": round(max(values), 4),
+        }
+    return summary
+
+
+def run_benchmark(args):
+    context_lengths = [int(c) for c in args.context_lengths.split(",") if c.strip()]
+    gpus = [g.strip() for g in args.gpu.split(",") if g.strip()]
+    phases = [p.strip() for p in args.phases.split(",") if p.strip()]
+    for phase in phases:
+        if phase not in PHASES:
+            raise SystemExit(f"Unknown phase '{phase}'. Available: {', '.join(PHASES)}")
+    if "switch" in phases and len(args.models) < 2:
+        print("⚠ 'switch' needs at least two models - skipping it")
+        phases = [p for p in phases if p != "switch"]
+
+    results = []
+    for context_length in context_lengths:
+        for gpu in gpus:
+            for phase in phases:
+                for index, model in enumerate(args.models):
+                    next_model = args.models[(index + 1) % len(args.models)]
+                    label = f"{model} -> {next_model}" if phase == "switch" else model
+                    samples, errors = [], []
+                    print(f"\n▶ {phase:<6} {label}  ctx={context_length} gpu={gpu}")
+                    for rep in range(args.repeat):
+                        sample, error = run_phase(phase, model, next_model, context_length, gpu, args)
+                        samples.append(sample)
+                        if error:
+                            errors.append(error)
+                        shown = "  ".join(f"{k} {v:.2f}s" for k, v in sample.items())
+                        print(f"  #{rep + 1}  {shown}" + (f"  ✗ {error}" if error else ""))
+                    results.append({
+                        "phase": phase,
+                        "model": model,
+                        "target": next_model if phase == "switch" else model,
+                        "context_length": context_length,
+                        "gpu": gpu,
+                        "runs": len(samples),
+                        "failures": len(errors),
+                        "summary": summarize(samples),
+                        "samples": samples,
+                        "errors": errors[:5],
+                    })
+    _lms(['unload', '--all', '-y'], args.unload_timeout)
+    return results
+
+
+def print_table(results):
+    header = f"{'phase':<7} {'model':<45} {'ctx':>6} {'gpu':>5} {'metric':<9} {'n':>3} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        label = f"{r['model']} -> {r['target']}" if r["phase"] == "switch" else r["model"]
+        for metric, s in r["summary"].items():
+            print(f"{r['phase']:<7} {label[:45]:<45} {r['context_length']:>6} {r['gpu']:>5} {metric:<9} "
+                  f"{s['n']:>3} {s['p50']:>8.3f} {s['p90']:>8.3f} {s['p99']:>8.3f} {s['max']:>8.3f}")
+        if r["failures"]:
+            print(f"{'':<7} {'':<45} {'':>6} {'':>5} failures {r['failures']}/{r['runs']}")
+
+
+def _start_simulator(settings):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import LMSTUDIO_SIMULATOR as simulator
+
+    server = simulator.start_simulator(config=simulator._parse_settings(settings))
+    shim_dir = tempfile.mkdtemp(prefix="ta_lms_shim_")
+    simulator.write_lms_shim(shim_dir, server.url)
+    os.environ["PATH"] = shim_dir + os.pathsep + os.environ.get("PATH", "")
+    print(f"Simulator on {server.url}, lms shim in {shim_dir}")
+    return server, shim_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or benchmark loading and switching LM Studio models")
+    parser.add_argument("models", nargs="+", help="Model paths/names as accepted by 'lms load'")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per phase and setting")
+    parser.add_argument("--phases", default=",".join(PHASES), help=f"Comma separated: {','.join(PHASES)}")
+    parser.add_argument("--context-lengths", default="8192", help="Comma separated, e.g. 4096,16384")
+    parser.add_argument("--gpu", default="1", help="Comma separated --gpu values, e.g. max,1,0.5")
+    parser.add_argument("--server-url", default="http://localhost:1234", help="LM Studio server for the completion check")
+    parser.add_argument("--prompt", default="Say OK.", help="Prompt of the first-completion check")
+    parser.add_argument("--load-timeout", type=int, default=300)
+    parser.add_argument("--unload-timeout", type=int, default=60)
+    parser.add_argument("--ready-timeout", type=int, default=120,
+                        help="Max. seconds from load until a completion succeeds")
+    parser.add_argument("--drop-caches-cmd", default="",
+                        help="Shell command run before each cold load, e.g. \"sync; echo 3 | sudo tee /proc/sys/vm/drop_caches\"")
+    parser.add_argument("--simulator", action="store_true", help="Run against LMSTUDIO_SIMULATOR.py instead of LM Studio")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="KEY=VALUE",
+                        help="Simulator setting (repeatable, with --simulator)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    server = shim_dir = None
+    if args.simulator:
+        server, shim_dir = _start_simulator(args.settings)
+        args.server_url = server.url
+
+    try:
+        results = run_benchmark(args)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            shutil.rmtree(shim_dir, ignore_errors=True)
+
+    print_table(results)
+
+    report = {
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "models": args.models, "repeat": args.repeat, "phases": args.phases,
+            "context_lengths": args.context_lengths, "gpu": args.gpu,
+            "simulator": args.simulator, "simulator_settings": args.settings,
+            "drop_caches_cmd": args.drop_caches_cmd or None,
+        },
+        "results": results,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        model_name = sys.argv[1]
+    # Alte Nutzung: python TEST_MODEL_LOAD.py <model-name> - nur die Lade-Prüfung
+    if len(sys.argv) == 2 and not sys.argv[1].startswith("-"):
+        test_model_load(sys.argv[1])
+    elif len(sys.argv) > 1:
+        main()
     else:
         print("Usage: python TEST_MODEL_LOAD.py <model-name>")
+        print("       python TEST_MODEL_LOAD.py <model> [<model> ...] --repeat N [options]   (benchmark)")
         print("\nExample:")
         print("  python TEST_MODEL_LOAD.py google/gemma-3-27b")
         print("  python TEST_MODEL_LOAD.py llava-v1.5-7b")
+        print("  python TEST_MODEL_LOAD.py qwen2-vl-7b-instruct llava-v1.5-7b --simulator")
         print("\nOr run 'lms ls --detailed' to see available models")
         sys.exit(1)
-    
-    test_model_load(model_name)
@@ -3,56 +3,57 @@ TA Nodes Pack - Custom Nodes für ComfyUI
 Enthält Nodes zum Laden verschiedener Modelltypen mit Namen und Text-Processing
 Plus LM Studio Vision Integration für Image-to-Prompt
 Plus LM Studio Load On Run für kontrolliertes Laden von Modellen
+
+Die Node-Module importieren torch, comfy, numpy, PIL und requests erst bei
+der Ausführung - das Registrieren hier bleibt dadurch schnell.
+Import-Zeit messen: python BENCH_IMPORT_TIME.py
+Performance-Metriken (Prometheus): GET /ta_nodes/metrics am ComfyUI Server
+Profiling pro Node: TA_NODES_PROFILE=cprofile|sample (siehe ta_profiling.py)
+Zeitleiste für Perfetto: TA_NODES_TRACE=trace.json (siehe ta_tracing.py)
 """
 
-from .ta_load_checkpoint_model_with_name import TALoadCheckpointModelWithName
-from .ta_load_diffusion_model_with_name import TALoadDiffusionModelWithName
-from .ta_load_gguf_model_with_name import TALoadGGUFModelWithName
-from .ta_clear_prompt import TAClearPrompt
-from .ta_description_to_prompt import TADescriptionToPrompt, TAPromptEnhancer
-
-# Importiere LM Studio Vision Nodes
-from .ta_ebu_lmstudio_vision_node import (
-    NODE_CLASS_MAPPINGS as LMSTUDIO_VISION_MAPPINGS,
-    NODE_DISPLAY_NAME_MAPPINGS as LMSTUDIO_VISION_DISPLAY
-)
-
-# Importiere LM Studio Load On Run Node
-from .ta_lmstudio_load_on_run import (
-    NODE_CLASS_MAPPINGS as LOAD_ON_RUN_MAPPINGS,
-    NODE_DISPLAY_NAME_MAPPINGS as LOAD_ON_RUN_DISPLAY
-)
-
-# Node-Klassen-Mappings
-NODE_CLASS_MAPPINGS = {
-    "TALoadCheckpointModelWithName": TALoadCheckpointModelWithName,
-    "TALoadDiffusionModelWithName": TALoadDiffusionModelWithName,
-    "TALoadGGUFModelWithName": TALoadGGUFModelWithName,
-    "TAClearPrompt": TAClearPrompt,
-    "TADescriptionToPrompt": TADescriptionToPrompt,
-    "TAPromptEnhancer": TAPromptEnhancer,
-}
-
-# Füge LM Studio Vision Nodes hinzu
-NODE_CLASS_MAPPINGS.update(LMSTUDIO_VISION_MAPPINGS)
-
-# Füge LM Studio Load On Run Node hinzu
-NODE_CLASS_MAPPINGS.update(LOAD_ON_RUN_MAPPINGS)
-
-# Display-Namen für die UI
-NODE_DISPLAY_NAME_MAPPINGS = {
-    "TALoadCheckpointModelWithName": "TA Load Checkpoint Model (with Name)",
-    "TALoadDiffusionModelWithName": "TA Load Diffusion Model (with Name)",
-    "TALoadGGUFModelWithName": "TA Load GGUF Model (with Name)",
-    "TAClearPrompt": "TA Clear Prompt",
-    "TADescriptionToPrompt": "TA Description to Prompt",
-    "TAPromptEnhancer": "TA Prompt Enhancer",
-}
-
-# Füge LM Studio Vision Display Names hinzu
-NODE_DISPLAY_NAME_MAPPINGS.update(LMSTUDIO_VISION_DISPLAY)
-
-# Füge LM Studio Load On Run Display Names hinzu
-NODE_DISPLAY_NAME_MAPPINGS.update(LOAD_ON_RUN_DISPLAY)
+import importlib
+
+from .ta_logging import get_logger
+from .ta_metrics import register_route
+from .ta_profiling import register_route as register_profiling_route
+
+
+# Node-Module in Menü-Reihenfolge - jedes liefert NODE_CLASS_MAPPINGS und NODE_DISPLAY_NAME_MAPPINGS
+NODE_MODULES = [
+    "ta_load_checkpoint_model_with_name",
+    "ta_load_diffusion_model_with_name",
+    "ta_load_gguf_model_with_name",
+    "ta_clear_prompt",
+    "ta_description_to_prompt",
+    "ta_model_inspector",
+    # LM Studio Vision Nodes
+    "ta_ebu_lmstudio_vision_node",
+    "ta_lmstudio_batch_caption",
+    # LM Studio Load On Run Node
+    "ta_lmstudio_load_on_run",
+]
+
+NODE_CLASS_MAPPINGS = {}
+NODE_DISPLAY_NAME_MAPPINGS = {}
+
+_log = get_logger("Nodes")
+
+for _module_name in NODE_MODULES:
+    # Ein fehlerhaftes Modul soll nicht das ganze Pack verhindern
+    try:
+        _module = importlib.import_module(f".{_module_name}", __name__)
+    except Exception as e:
+        _log.error("Could not load %s: %s", _module_name, e)
+        continue
+    NODE_CLASS_MAPPINGS.update(_module.NODE_CLASS_MAPPINGS)
+    NODE_DISPLAY_NAME_MAPPINGS.update(getattr(_module, "NODE_DISPLAY_NAME_MAPPINGS", {}))
+
+# /ta_nodes/metrics und /ta_nodes/profiling - nur wenn der PromptServer schon läuft (also in ComfyUI)
+for _register in (register_route, register_profiling_route):
+    try:
+        _register()
+    except Exception as e:
+        _log.warning("Could not register route: %s", e)
 
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS']
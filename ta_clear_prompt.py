@@ -2,6 +2,9 @@
 TA Conditional Prompt Node - Wechselt zwischen manuellem Prompt und Image2Prompt Output
 """
 
+from .ta_profiling import profile_node
+
+
 class TAClearPrompt:
     """
     Custom Node zum Wechseln zwischen manuellem Prompt und Image2Prompt
@@ -20,14 +23,20 @@ class TAClearPrompt:
                 "manual_prompt": ("STRING", {
                     "multiline": True,
                     "default": "",
-                    "forceInput": False
+                    "forceInput": False,
+                    "lazy": True
                 }),
                 "image2prompt_output": ("STRING", {
                     "multiline": True,
                     "default": "",
-                    "forceInput": True
+                    "forceInput": True,
+                    "lazy": True
                 }),
             },
+            "hidden": {
+                "dynprompt": "DYNPROMPT",
+                "unique_id": "UNIQUE_ID",
+            },
         }
     
     RETURN_TYPES = ("STRING",)
@@ -35,7 +44,42 @@ class TAClearPrompt:
     FUNCTION = "select_prompt"
     CATEGORY = "TA Nodes"
     
-    def select_prompt(self, mode, manual_prompt="", image2prompt_output=""):
+    @staticmethod
+    def is_linked(dynprompt, unique_id, name):
+        """
+        Ist der Input mit einer anderen Node verbunden?
+        Ein unverbundener Lazy-Input darf nicht angefordert werden (NodeInputError)
+        Ohne DYNPROMPT (ältere ComfyUI Versionen) wird eine Verbindung angenommen
+        """
+        if dynprompt is None or unique_id is None:
+            return True
+        try:
+            node = dynprompt.get_node(unique_id)
+        except Exception:
+            return True
+        # Links sind [node_id, output_index], Widget-Werte Konstanten
+        return isinstance(node.get("inputs", {}).get(name), list)
+    
+    def check_lazy_status(self, mode, manual_prompt=None, image2prompt_output=None,
+                          dynprompt=None, unique_id=None):
+        """
+        Fordert nur den Input des gewählten Modus an
+        Der andere Zweig (z.B. LM Studio Load + Vision Request) wird nicht ausgeführt
+        
+        Returns:
+            list: Namen der Inputs, die noch ausgewertet werden müssen
+        """
+        if mode == "image2prompt":
+            name, value = "image2prompt_output", image2prompt_output
+        else:
+            name, value = "manual_prompt", manual_prompt
+        if value is None and self.is_linked(dynprompt, unique_id, name):
+            return [name]
+        return []
+    
+    @profile_node
+    def select_prompt(self, mode, manual_prompt="", image2prompt_output="",
+                      dynprompt=None, unique_id=None):
         """
         Wählt zwischen manuellem Prompt und Image2Prompt Output
         
@@ -51,5 +95,14 @@ class TAClearPrompt:
             # Wenn Image2Prompt aktiviert ist, verwende dessen Output
             return (image2prompt_output if image2prompt_output else "",)
         else:
-            # Sonst verwende den manuellen Prompt
-            return (manual_prompt,)
\ No newline at end of file
+            # Sonst verwende den manuellen Prompt (nicht ausgewertete/unverbundene Inputs sind None)
+            return (manual_prompt if manual_prompt is not None else "",)
+
+
+NODE_CLASS_MAPPINGS = {
+    "TAClearPrompt": TAClearPrompt
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "TAClearPrompt": "TA Clear Prompt"
+}
@@ -0,0 +1,142 @@
+"""
+TA CLIP Tokenizer - Gecachter CLIP Tokenizer für Token-Budget-Berechnungen
+Teil des ComfyUI-TA-Nodes-Pack
+
+Der Tokenizer wird erst bei der ersten Verwendung geladen (ComfyUI sd1_tokenizer).
+Ist er nicht verfügbar, wird eine Näherung verwendet.
+"""
+
+import functools
+import os
+import re
+import threading
+
+from .ta_logging import get_logger
+
+log = get_logger("Tokenizer")
+
+
+# ComfyUI teilt Prompts in Chunks zu 77 Tokens: BOS + 75 Inhalt + EOS
+CHUNK_CONTENT_TOKENS = 75
+# Längere Wörter teilt ComfyUI an der Chunk-Grenze (SDTokenizer.max_word_length)
+MAX_WORD_TOKENS = 8
+
+# Budget (UI-Wert) -> Anzahl Chunks
+TOKEN_BUDGETS = {
+    "77": 1,
+    "154": 2,
+    "225": 3,
+}
+
+# Näherung an den CLIP Pre-Tokenizer (Wörter, einzelne Ziffern, Satzzeichen)
+_APPROX_PIECE_RE = re.compile(r"[^\W\d_]+|\d|[^\w\s]+")
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def get_clip_tokenizer():
+    """
+    Lädt den CLIP Tokenizer von ComfyUI einmalig (thread-safe)
+    Gibt None zurück wenn transformers oder die Tokenizer-Dateien fehlen
+    """
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            try:
+                import comfy
+                from transformers import CLIPTokenizer
+                tokenizer_path = os.path.join(os.path.dirname(comfy.__file__), "sd1_tokenizer")
+                _tokenizer = CLIPTokenizer.from_pretrained(tokenizer_path)
+            except Exception as e:
+                log.warning("CLIP tokenizer unavailable, using approximation: %s", e)
+                _tokenizer = None
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def _approximate_tokens(word):
+    # Kurze Wortteile sind meist ein Token, längere ~4 Zeichen pro Token
+    count = 0
+    for piece in _APPROX_PIECE_RE.findall(word):
+        count += max(1, (len(piece) + 3) // 4) if len(piece) > 5 else 1
+    return count
+
+
+@functools.lru_cache(maxsize=65536)
+def count_word_tokens(word):
+    """
+    Anzahl CLIP Tokens eines einzelnen (whitespace-freien) Wortes ohne BOS/EOS
+    """
+    tokenizer = get_clip_tokenizer()
+    if tokenizer is None:
+        return _approximate_tokens(word)
+    return len(tokenizer(word, add_special_tokens=False)["input_ids"])
+
+
+class TokenPacker:
+    """
+    Simuliert das Chunking von ComfyUI: ein Wort, das nicht mehr in den
+    aktuellen Chunk passt, wird komplett in den nächsten Chunk verschoben -
+    außer es hat mehr als MAX_WORD_TOKENS Tokens, dann füllt es den
+    aktuellen Chunk auf und läuft im nächsten weiter
+    """
+
+    def __init__(self, max_chunks, chunk_tokens=CHUNK_CONTENT_TOKENS):
+        self.max_chunks = max_chunks
+        self.chunk_tokens = chunk_tokens
+        self.chunks = 1
+        self.used = 0
+
+    def _advance(self, chunks, used, text):
+        for word in text.split():
+            tokens = count_word_tokens(word)
+            if used + tokens > self.chunk_tokens:
+                if tokens > MAX_WORD_TOKENS:
+                    tokens -= self.chunk_tokens - used
+                chunks += 1
+                used = 0
+                while tokens > self.chunk_tokens:
+                    chunks += 1
+                    tokens -= self.chunk_tokens
+            used += tokens
+        return chunks, used
+
+    def fits(self, *texts):
+        chunks, used = self.chunks, self.used
+        for text in texts:
+            chunks, used = self._advance(chunks, used, text)
+        return chunks <= self.max_chunks
+
+    def add(self, text):
+        self.chunks, self.used = self._advance(self.chunks, self.used, text)
+
+
+def pack_tags(keywords, reserved, token_budget):
+    """
+    Nimmt Keywords (in Prioritätsreihenfolge) nur so lange auf, wie danach
+    noch alle reservierten Tags (Style, Quality, Suffix) in das Budget passen
+    Gibt die Liste der aufgenommenen Keywords zurück
+    """
+    max_chunks = TOKEN_BUDGETS.get(str(token_budget))
+    if not max_chunks:
+        return list(keywords)
+
+    packer = TokenPacker(max_chunks)
+    # Reservierter Teil, wie er im Prompt nach den Keywords steht
+    reserved_text = ", ".join(reserved)
+
+    packed = []
+    for keyword in keywords:
+        # Das Komma gehört (wie im fertigen Prompt) zum Wort davor - ohne reservierte Tags
+        # steht hinter dem letzten Keyword keins. Folgt ein weiteres, ist es dann eingerechnet
+        separator = "," if reserved_text else ""
+        if not packer.fits(keyword + separator, reserved_text):
+            continue
+        packer.add(keyword + ",")
+        packed.append(keyword)
+    return packed
@@ -3,8 +3,368 @@ TA Description to Prompt - Custom Node für ComfyUI
 Converts image descriptions into structured prompts for image generation
 """
 
+import functools
+import heapq
+import json
+import os
 import re
 
+from . import ta_metrics as metrics
+from .ta_clip_tokenizer import TOKEN_BUDGETS, pack_tags
+from .ta_logging import get_logger
+from .ta_profiling import profile_node
+
+log = get_logger("Prompt")
+
+
+# Stoppwörter und Tag-Tabellen liegen in data/ und werden erst bei Bedarf geladen
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+STOP_WORDS_DIR = os.path.join(DATA_DIR, "stopwords")
+TAGS_FILE = os.path.join(DATA_DIR, "tags.json")
+WORDS_FILE = os.path.join(DATA_DIR, "words.json")
+
+# "en+de": die frühere eingebaute Liste (Englisch + Deutsch) - Standard, Ergebnisse bleiben gleich
+COMBINED_LANGUAGE = "en+de"
+LANGUAGES = [COMBINED_LANGUAGE, "auto", "en", "de", "fr", "es", "it"]
+# Bei Gleichstand und ohne Treffer wählt "auto" diese Sprache
+DEFAULT_LANGUAGE = "en"
+
+# Anzahl Wörter, die für die Spracherkennung betrachtet werden
+LANGUAGE_SAMPLE_WORDS = 200
+
+
+@functools.lru_cache(maxsize=None)
+def load_stop_words(language):
+    """
+    Lädt die Stoppwörter einer Sprache (data/stopwords/<language>.txt) einmalig als frozenset
+    """
+    path = os.path.join(STOP_WORDS_DIR, f"{language}.txt")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return frozenset(
+                line.strip().lower() for line in f
+                if line.strip() and not line.startswith("#")
+            )
+    except OSError:
+        log.warning("No stop words for language '%s'", language)
+        return frozenset()
+
+
+@functools.lru_cache(maxsize=None)
+def available_languages():
+    try:
+        # Kombinierte Tabellen (en+de) sind keine eigene Sprache für die Erkennung
+        return tuple(sorted(
+            os.path.splitext(name)[0] for name in os.listdir(STOP_WORDS_DIR)
+            if name.endswith(".txt") and "+" not in name
+        ))
+    except OSError:
+        return (DEFAULT_LANGUAGE,)
+
+
+def detect_language(text):
+    """
+    Wählt die Sprache, deren Stoppwörter in den ersten Wörtern am häufigsten vorkommen
+    """
+    hits = dict.fromkeys(available_languages(), 0)
+    for i, word in enumerate(iter_words(text)):
+        if i >= LANGUAGE_SAMPLE_WORDS:
+            break
+        for language in hits:
+            if word in load_stop_words(language):
+                hits[language] += 1
+    
+    # Gleichstand: DEFAULT_LANGUAGE gewinnt, nicht die alphabetisch erste Sprache
+    best = max(hits, key=lambda language: (hits[language], language == DEFAULT_LANGUAGE),
+               default=DEFAULT_LANGUAGE)
+    return best if hits.get(best) else DEFAULT_LANGUAGE
+
+
+def get_stop_words(text, language=COMBINED_LANGUAGE):
+    if language == "auto":
+        language = detect_language(text)
+    return load_stop_words(language)
+
+
+@functools.lru_cache(maxsize=None)
+def load_tag_tables():
+    """
+    Lädt Quality-, Style-, Emphasis- und Negative-Tags (data/tags.json) einmalig
+    Listen werden zu Tupeln, damit die gecachten Tabellen unveränderlich sind
+    """
+    with open(TAGS_FILE, encoding="utf-8") as f:
+        tables = json.load(f)
+    return {
+        "quality": tuple(tables["quality"]),
+        "style": {name: tuple(tags) for name, tags in tables["style"].items()},
+        "emphasis": {level: tuple(tags) for level, tags in tables["emphasis"].items()},
+        "negative_defaults": tuple(tables["negative_defaults"]),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def load_word_tables():
+    """
+    Lädt die Wort-Tabellen der Ranked Extraktion (data/words.json) einmalig:
+    filler   Füllwörter typischer VLM-Beschreibungen - tragen nichts zum Bild bei
+    modifier Farben, Materialien und Beschreibungen (Größe, Textur, Licht, Stimmung)
+    """
+    with open(WORDS_FILE, encoding="utf-8") as f:
+        tables = json.load(f)
+    return {
+        "filler": frozenset(tables["filler"]),
+        "modifier": frozenset(tables["color"]) | frozenset(tables["material"]) | frozenset(tables["descriptor"]),
+    }
+
+
+# Größe der LRU-Caches (Einträge) für Prompt-Erzeugung und Keyword-Extraktion
+PROMPT_CACHE_SIZE = 512
+KEYWORD_CACHE_SIZE = 512
+
+# Wörter = alles zwischen Whitespace und Satzzeichen
+WORD_RE = re.compile(r'[^\s.!?,;:]+')
+
+# Ranked Extraktion: Wörter (inkl. Bindestrich/Apostroph) oder Phrasengrenzen
+PHRASE_TOKEN_RE = re.compile(r"[^\W_][\w'-]*|[.!?,;:()]")
+PHRASE_BREAKS = frozenset('.!?,;:()')
+
+# Adjektiv-Endungen, die als Modifier einer Nominalphrase gelten
+MODIFIER_SUFFIX_RE = re.compile(r'(?:ful|ous|ive|ic|ish|less|ant|ent)$')
+
+# Maximale Länge einer Nominalphrase (Modifier + Kopfwort)
+MAX_PHRASE_WORDS = 3
+
+# Ranked Modus: Scan endet nach max_keywords * Faktor Kandidaten-Vorkommen
+RANKED_SCAN_FACTOR = 8
+
+# Gewichte für das Ranking
+FREQUENCY_WEIGHT = 1.0
+POSITION_WEIGHT = 1.5
+PHRASE_WEIGHT = 0.5
+
+
+def normalize_description(description):
+    """
+    Liefert den Text einer Beschreibung
+    Unterstützt PredictionResult Objekte von YANC_lmstudio
+    """
+    if hasattr(description, 'text'):
+        return description.text
+    elif hasattr(description, '__str__'):
+        return str(description)
+    return description
+
+
+def iter_words(text):
+    """
+    Liefert die Wörter des Textes inkrementell (lower-case)
+    Der Text wird nur so weit gescannt, wie der Aufrufer Wörter abholt
+    """
+    for match in WORD_RE.finditer(text):
+        yield match.group().lower()
+
+
+def extract_keywords(text, max_keywords, stop_words):
+    """
+    Extrahiert Keywords in einem Durchlauf: filtern, deduplizieren, begrenzen
+    Bricht ab, sobald max_keywords erreicht ist - Aufwand hängt von der Ausgabe ab, nicht vom Input
+    """
+    keywords = []
+    seen = set()
+    for word in iter_words(str(text)):
+        # Filtere Stoppwörter, zu kurze Wörter und Duplikate
+        if len(word) > 2 and word not in stop_words and word not in seen:
+            seen.add(word)
+            keywords.append(word)
+            if len(keywords) >= max_keywords:
+                break
+    
+    return keywords
+
+
+def _is_modifier(word, modifier_words):
+    return word in modifier_words or (len(word) > 5 and MODIFIER_SUFFIX_RE.search(word) is not None)
+
+
+def extract_ranked_keywords(text, max_keywords, stop_words):
+    """
+    Ranked Extraktion in linearer Zeit:
+    Modifier-Ketten + Kopfwort werden zu Nominalphrasen ("red dress"),
+    Kandidaten werden nach Häufigkeit, Position und Phrasenlänge bewertet
+    und per Heap die Top-k ausgewählt (Ergebnis nach Rang sortiert)
+    Der Scan endet nach max_keywords * RANKED_SCAN_FACTOR Vorkommen
+    """
+    word_tables = load_word_tables()
+    filler_words = word_tables["filler"]
+    modifier_words = word_tables["modifier"]
+    candidates = {}
+    modifiers = []
+    position = 0
+    scan_limit = max_keywords * RANKED_SCAN_FACTOR
+    
+    def add(phrase, words):
+        nonlocal position
+        entry = candidates.get(phrase)
+        if entry is None:
+            candidates[phrase] = [1, position, words]
+        else:
+            entry[0] += 1
+        position += 1
+    
+    def flush():
+        # Modifier ohne Kopfwort zählen als einzelne Keywords
+        for modifier in modifiers:
+            add(modifier, 1)
+        modifiers.clear()
+    
+    for match in PHRASE_TOKEN_RE.finditer(str(text)):
+        if position >= scan_limit:
+            break
+        word = match.group().lower()
+        
+        if word in PHRASE_BREAKS or len(word) <= 2 or word in stop_words or word in filler_words:
+            flush()
+            continue
+        
+        if _is_modifier(word, modifier_words):
+            modifiers.append(word)
+            if len(modifiers) >= MAX_PHRASE_WORDS:
+                add(modifiers.pop(0), 1)
+            continue
+        
+        if modifiers:
+            add(" ".join(modifiers) + " " + word, len(modifiers) + 1)
+            modifiers.clear()
+        else:
+            add(word, 1)
+    flush()
+    
+    if not candidates:
+        return []
+    
+    total = float(position)
+    
+    def score(item):
+        count, first, words = item[1]
+        return (
+            FREQUENCY_WEIGHT * count
+            + POSITION_WEIGHT * (1.0 - first / total)
+            + PHRASE_WEIGHT * (words - 1),
+            -first
+        )
+    
+    return [phrase for phrase, _ in heapq.nlargest(max_keywords, candidates.items(), key=score)]
+
+
+def description_to_prompt(description, add_quality_tags=True, style="default", max_keywords=50, custom_suffix="",
+                          token_budget="off", extraction="simple", language=COMBINED_LANGUAGE):
+    """
+    Konvertiert eine einzelne Beschreibung in einen Prompt-String
+    Mit token_budget werden Keywords so gepackt, dass Style-, Quality-Tags und Suffix immer passen
+    """
+    text = normalize_description(description)
+    
+    # Check if empty (isspace statt strip - keine Kopie des ganzen Textes)
+    if not text or (hasattr(text, 'isspace') and text.isspace()):
+        return ""
+    
+    return _build_prompt(str(text), add_quality_tags, style, max_keywords, custom_suffix, token_budget, extraction,
+                         language)
+
+
+@functools.lru_cache(maxsize=KEYWORD_CACHE_SIZE)
+def _cached_keywords(text, max_keywords, extraction, language):
+    # Eigener Cache für die Extraktion: ändert sich nur style/suffix, wird nicht neu extrahiert
+    stop_words = get_stop_words(text, language)
+    if extraction == "ranked":
+        return tuple(extract_ranked_keywords(text, max_keywords, stop_words))
+    return tuple(extract_keywords(text, max_keywords, stop_words))
+
+
+@functools.lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _build_prompt(text, add_quality_tags, style, max_keywords, custom_suffix, token_budget, extraction, language):
+    keywords = list(_cached_keywords(text, max_keywords, extraction, language))
+    tables = load_tag_tables()
+    
+    # Style-spezifische Tags, Quality Tags und Custom Suffix haben Vorrang
+    reserved = list(tables["style"].get(style, ()))
+    if add_quality_tags:
+        reserved.extend(tables["quality"])
+    if custom_suffix and custom_suffix.strip():
+        reserved.append(custom_suffix.strip())
+    
+    if token_budget in TOKEN_BUDGETS:
+        keywords = pack_tags(keywords, reserved, token_budget)
+    
+    # Erstelle finalen Prompt
+    return ', '.join(keywords + reserved)
+
+
+@functools.lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def enhance_prompt(prompt, emphasis_level="medium", negative_prompt="", add_negative_defaults=True):
+    """
+    Ergänzt einen Prompt um Emphasis-Tags und Standard-Negatives
+    Reine Funktion der Inputs - Ergebnisse werden im LRU-Cache gehalten
+    """
+    tables = load_tag_tables()
+    enhanced = prompt
+    
+    # Füge Emphasis hinzu
+    if emphasis_level in tables["emphasis"]:
+        enhanced += ", " + ", ".join(tables["emphasis"][emphasis_level])
+    
+    # Standard Negative Prompt
+    neg_prompt = negative_prompt
+    if add_negative_defaults:
+        if neg_prompt:
+            neg_prompt += ", " + ", ".join(tables["negative_defaults"])
+        else:
+            neg_prompt = ", ".join(tables["negative_defaults"])
+    
+    return enhanced, neg_prompt
+
+
+def get_cache_stats():
+    """
+    Hit/Miss-Statistik der Text-Caches
+    """
+    stats = {}
+    for name, func in (("prompt", _build_prompt), ("keywords", _cached_keywords), ("enhance", enhance_prompt)):
+        info = func.cache_info()
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+        }
+    return stats
+
+
+def _cache_metric_samples():
+    for name, stats in get_cache_stats().items():
+        yield {"cache": name, "result": "hit"}, stats["hits"]
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+
+
+metrics.CACHE_REQUESTS.add_callback(_cache_metric_samples)
+
+
+def clear_caches():
+    _build_prompt.cache_clear()
+    _cached_keywords.cache_clear()
+    enhance_prompt.cache_clear()
+
+
+def _list_item(values, index, default=None):
+    """
+    Wert für Element index aus einem INPUT_IS_LIST Input
+    Kürzere Listen wiederholen ihr letztes Element (wie ComfyUI selbst)
+    """
+    if not values:
+        return default
+    return values[index] if index < len(values) else values[-1]
+
+
 class TADescriptionToPrompt:
     """
     Converts descriptive text into comma-separated prompt format suitable for image generation
@@ -39,6 +399,19 @@ class TADescriptionToPrompt:
                     "multiline": False,
                     "default": ""
                 }),
+                "language": (LANGUAGES, {
+                    "default": COMBINED_LANGUAGE,
+                    "tooltip": "Stop-word table - en+de: combined English/German list (previous behaviour), "
+                               "auto: detect the language from the first words"
+                }),
+                "extraction": (["simple", "ranked"], {
+                    "default": "simple",
+                    "tooltip": "simple: unique words in order | ranked: noun phrases (e.g. 'red dress') scored by frequency and position, filler words dropped"
+                }),
+                "token_budget": (["off", "77", "154", "225"], {
+                    "default": "off",
+                    "tooltip": "Pack keywords into 1/2/3 CLIP chunks (75 content tokens each) - style and quality tags always fit"
+                }),
             }
         }
     
@@ -47,105 +420,58 @@ class TADescriptionToPrompt:
     FUNCTION = "convert"
     CATEGORY = "text/processing"
     
-    def convert(self, description, add_quality_tags=True, style="default", max_keywords=50, custom_suffix=""):
+    @profile_node
+    def convert(self, description, add_quality_tags=True, style="default", max_keywords=50, custom_suffix="",
+                extraction="simple", token_budget="off", language=COMBINED_LANGUAGE):
         """
         Convert description to prompt
         """
-        # Handle PredictionResult objects from YANC_lmstudio
-        if hasattr(description, 'text'):
-            text = description.text
-        elif hasattr(description, '__str__'):
-            text = str(description)
-        else:
-            text = description
-        
-        # Check if empty
-        if not text or (hasattr(text, 'strip') and text.strip() == ""):
-            return ("",)
-        
-        # Bereinige den Text
-        text = str(text).lower().strip()
-        
-        # Entferne Satzzeichen am Ende von Wörtern
-        text = re.sub(r'[.!?,;:]', ' ', text)
-        
-        # Mehrfache Leerzeichen reduzieren
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Deutsche und englische Stoppwörter
-        stop_words = {
-            'the', 'a', 'an', 'is', 'are', 'was', 'were', 'been', 'being',
-            'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'from',
-            'this', 'that', 'these', 'those', 'it', 'its', 'their',
-            'has', 'have', 'had', 'does', 'do', 'did', 'will', 'would',
-            'can', 'could', 'should', 'may', 'might', 'must',
-            'and', 'or', 'but', 'if', 'as', 'than', 'then',
-            'there', 'here', 'where', 'when', 'what', 'which', 'who',
-            'der', 'die', 'das', 'ein', 'eine', 'ist', 'sind', 'war',
-            'mit', 'auf', 'in', 'von', 'zu', 'den', 'dem', 'des'
-        }
-        
-        # Extrahiere Wörter
-        words = text.split()
-        
-        # Filtere Stoppwörter und zu kurze Wörter
-        keywords = []
-        for word in words:
-            word = word.strip()
-            if len(word) > 2 and word not in stop_words:
-                keywords.append(word)
-        
-        # Entferne Duplikate, behalte Reihenfolge
-        seen = set()
-        unique_keywords = []
-        for keyword in keywords:
-            if keyword not in seen:
-                seen.add(keyword)
-                unique_keywords.append(keyword)
-        
-        # Begrenze Keywords
-        unique_keywords = unique_keywords[:max_keywords]
-        
-        # Füge Style-spezifische Tags hinzu
-        style_tags = self._get_style_tags(style)
-        if style_tags:
-            unique_keywords.extend(style_tags)
-        
-        # Füge Quality Tags hinzu
-        if add_quality_tags:
-            quality_tags = [
-                'highly detailed',
-                'professional',
-                'high quality',
-                '8k',
-                'sharp focus',
-                'masterpiece'
-            ]
-            unique_keywords.extend(quality_tags)
-        
-        # Füge Custom Suffix hinzu
-        if custom_suffix and custom_suffix.strip():
-            unique_keywords.append(custom_suffix.strip())
-        
-        # Erstelle finalen Prompt
-        prompt = ', '.join(unique_keywords)
-        
-        return (prompt,)
+        return (description_to_prompt(description, add_quality_tags, style, max_keywords, custom_suffix,
+                                      token_budget, extraction, language),)
     
     def _get_style_tags(self, style):
         """
         Returns style-specific tags
         """
-        style_mappings = {
-            "photography": ["photography", "photorealistic", "detailed", "bokeh"],
-            "digital_art": ["digital art", "digital painting", "concept art", "trending on artstation"],
-            "painting": ["oil painting", "artistic", "painted", "canvas"],
-            "anime": ["anime", "anime style", "manga", "cel shaded"],
-            "cinematic": ["cinematic", "dramatic lighting", "film grain", "movie scene"],
-            "default": []
-        }
-        
-        return style_mappings.get(style, [])
+        return list(load_tag_tables()["style"].get(style, ()))
+
+
+class TADescriptionToPromptBatch:
+    """
+    List-Variante von TADescriptionToPrompt
+    Verarbeitet N Beschreibungen (z.B. aus Batch-Captioning) in einem Aufruf
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return TADescriptionToPrompt.INPUT_TYPES()
+    
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("prompts",)
+    OUTPUT_IS_LIST = (True,)
+    FUNCTION = "convert_batch"
+    CATEGORY = "text/processing"
+    
+    @profile_node
+    def convert_batch(self, description, add_quality_tags=None, style=None, max_keywords=None, custom_suffix=None,
+                      extraction=None, token_budget=None, language=None):
+        """
+        Convert a list of descriptions to a list of prompts
+        """
+        prompts = []
+        for i, item in enumerate(description):
+            prompts.append(description_to_prompt(
+                item,
+                _list_item(add_quality_tags, i, True),
+                _list_item(style, i, "default"),
+                _list_item(max_keywords, i, 50),
+                _list_item(custom_suffix, i, ""),
+                _list_item(token_budget, i, "off"),
+                _list_item(extraction, i, "simple"),
+                _list_item(language, i, COMBINED_LANGUAGE)
+            ))
+        return (prompts,)
 
 
 class TAPromptEnhancer:
@@ -181,45 +507,60 @@ class TAPromptEnhancer:
     FUNCTION = "enhance"
     CATEGORY = "text/processing"
     
+    @profile_node
     def enhance(self, prompt, emphasis_level="medium", negative_prompt="", add_negative_defaults=True):
         """
         Enhance prompt with emphasis and negative prompt defaults
         """
-        enhanced = prompt
-        
-        # Füge Emphasis hinzu
-        if emphasis_level != "none":
-            emphasis_tags = {
-                "light": ["detailed", "clear"],
-                "medium": ["highly detailed", "intricate", "best quality"],
-                "strong": ["extremely detailed", "ultra detailed", "masterpiece", "best quality", "award winning"]
-            }
-            
-            if emphasis_level in emphasis_tags:
-                enhanced += ", " + ", ".join(emphasis_tags[emphasis_level])
-        
-        # Standard Negative Prompt
-        neg_prompt = negative_prompt
-        if add_negative_defaults:
-            default_negatives = [
-                "blurry", "bad quality", "low quality", "ugly", "deformed",
-                "disfigured", "bad anatomy", "watermark", "text", "signature"
-            ]
-            if neg_prompt:
-                neg_prompt += ", " + ", ".join(default_negatives)
-            else:
-                neg_prompt = ", ".join(default_negatives)
-        
-        return (enhanced, neg_prompt)
+        return enhance_prompt(prompt, emphasis_level, negative_prompt, add_negative_defaults)
+
+
+class TAPromptEnhancerBatch:
+    """
+    List-Variante von TAPromptEnhancer für N Prompts in einem Aufruf
+    """
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        return TAPromptEnhancer.INPUT_TYPES()
+    
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("enhanced_prompts", "negative_prompts")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "enhance_batch"
+    CATEGORY = "text/processing"
+    
+    @profile_node
+    def enhance_batch(self, prompt, emphasis_level=None, negative_prompt=None, add_negative_defaults=None):
+        """
+        Enhance a list of prompts
+        """
+        enhanced_prompts = []
+        negative_prompts = []
+        for i, item in enumerate(prompt):
+            enhanced, neg_prompt = enhance_prompt(
+                item,
+                _list_item(emphasis_level, i, "medium"),
+                _list_item(negative_prompt, i, ""),
+                _list_item(add_negative_defaults, i, True)
+            )
+            enhanced_prompts.append(enhanced)
+            negative_prompts.append(neg_prompt)
+        return (enhanced_prompts, negative_prompts)
 
 
 # Node Registration
 NODE_CLASS_MAPPINGS = {
     "TADescriptionToPrompt": TADescriptionToPrompt,
-    "TAPromptEnhancer": TAPromptEnhancer
+    "TAPromptEnhancer": TAPromptEnhancer,
+    "TADescriptionToPromptBatch": TADescriptionToPromptBatch,
+    "TAPromptEnhancerBatch": TAPromptEnhancerBatch
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "TADescriptionToPrompt": "TA Description to Prompt",
-    "TAPromptEnhancer": "TA Prompt Enhancer"
+    "TAPromptEnhancer": "TA Prompt Enhancer",
+    "TADescriptionToPromptBatch": "TA Description to Prompt (Batch)",
+    "TAPromptEnhancerBatch": "TA Prompt Enhancer (Batch)"
 }
\ No newline at end of file
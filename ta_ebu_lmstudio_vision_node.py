@@ -4,14 +4,131 @@ Teil des ComfyUI-TA-Nodes-Pack
 Erweitert LM Studio um Vision Language Model Support für Image-to-Prompt
 """
 
-import torch
-import numpy as np
-from PIL import Image
+import asyncio
 import io
 import base64
-import requests
+import json
+import re
 import time
-import sys
+
+from .ta_frame_dedupe import group_near_duplicates
+from .ta_logging import get_logger, fields
+from . import ta_lmstudio_context as context
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+# numpy, PIL und aiohttp werden erst bei der Ausführung importiert,
+# damit das Laden des Packs den ComfyUI-Start nicht verlangsamt
+
+log = get_logger("Vision")
+lms_log = get_logger("LMStudio")
+
+REQUEST_TIMEOUT = 120
+
+OUTPUT_MODES = ["text", "tags"]
+MAX_TAGS = 40
+# Gewichte außerhalb werden begrenzt, nahe 1.0 entfällt die Klammer
+TAG_WEIGHT_RANGE = (0.5, 1.5)
+TAG_WEIGHT_NEUTRAL = 0.05
+
+TAGS_INSTRUCTION = (
+    "Describe the image only as tags for an image generation prompt: short phrases of 1-3 words, "
+    "most important first. Use weight 1.0 for normal tags and 1.1-1.5 only for dominant elements."
+)
+
+TAGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tags": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "tag": {"type": "string"},
+                    "weight": {"type": "number"},
+                },
+                "required": ["tag"],
+            },
+            "maxItems": MAX_TAGS,
+        },
+    },
+    "required": ["tags"],
+}
+
+
+# 400-Antworten, die sagen, dass das Modell nicht mehrere Bilder pro Request annimmt
+MULTI_IMAGE_REJECTED_RE = re.compile(
+    r"at most \d+ images?|only (?:one|a single|1) image|(?:multiple|more than one) images?"
+    r"|too many images|images? per (?:request|message)",
+    re.IGNORECASE
+)
+
+
+def is_error(text):
+    """request_completion liefert Fehler als Text - daran erkennbar"""
+    return text.startswith(("Error ", "[TA-Vision]"))
+
+
+def rejects_multiple_images(text):
+    """Ist text ein HTTP 400, weil das Modell nur ein Bild pro Request verarbeitet?"""
+    return text.startswith("Error 400") and MULTI_IMAGE_REJECTED_RE.search(text) is not None
+
+
+def _clean_tag(tag):
+    # Klammern, Doppelpunkte und Kommas würden die Prompt-Gewichtung zerlegen
+    for char in "()[]{}:,":
+        tag = tag.replace(char, " ")
+    return " ".join(tag.split())
+
+
+def format_tags(tags):
+    """
+    [{"tag": ..., "weight": ...}] oder ["tag", ...] -> "tag, (tag:1.2), ..."
+    Leere und doppelte Tags fallen weg, Gewichte werden auf TAG_WEIGHT_RANGE begrenzt
+    """
+    low, high = TAG_WEIGHT_RANGE
+    parts = []
+    seen = set()
+    for item in tags:
+        if isinstance(item, dict):
+            tag, weight = item.get("tag"), item.get("weight", 1.0)
+        else:
+            tag, weight = item, 1.0
+        if not isinstance(tag, str):
+            continue
+        tag = _clean_tag(tag)
+        if not tag or tag.lower() in seen:
+            continue
+        seen.add(tag.lower())
+        try:
+            weight = min(high, max(low, float(weight)))
+        except (TypeError, ValueError):
+            weight = 1.0
+        if abs(weight - 1.0) < TAG_WEIGHT_NEUTRAL:
+            parts.append(tag)
+        else:
+            parts.append(f"({tag}:{round(weight, 2):g})")
+    return ", ".join(parts[:MAX_TAGS])
+
+
+def parse_tags_response(value):
+    """
+    Antwort im tags-Modus (JSON-Text oder bereits dekodiertes Objekt) -> Tag-String
+    Hält sich das Modell nicht an das Schema, wird der Text an Kommas/Zeilen geteilt
+    """
+    data = value
+    if isinstance(value, str):
+        try:
+            data = json.loads(value)
+        except ValueError:
+            log.warning("Response is not valid JSON - splitting it into tags")
+            return format_tags(value.replace("\n", ",").split(","))
+    tags = data.get("tags") if isinstance(data, dict) else data
+    if not isinstance(tags, list):
+        log.warning("Response has no tag list - using it as text")
+        return value if isinstance(value, str) else json.dumps(value)
+    return format_tags(tags)
 
 
 class TAEbuLMStudioVisionRequest:
@@ -54,6 +171,11 @@ class TAEbuLMStudioVisionRequest:
                     "default": "You are a helpful AI assistant that describes images accurately.",
                     "multiline": True
                 }),
+                "output_mode": (OUTPUT_MODES, {
+                    "default": "text",
+                    "tooltip": "tags: structured JSON output (tag list with weights), returned as "
+                               "comma-separated prompt tags - far fewer generated tokens than prose"
+                }),
             }
         }
 
@@ -66,117 +188,381 @@ class TAEbuLMStudioVisionRequest:
         """
         Konvertiert ComfyUI Image Tensor zu Base64 String
         ComfyUI Format: [batch, height, width, channels] mit Werten 0-1
+        Läuft per asyncio.to_thread - das PNG-Encoding blockiert nicht den Event-Loop
         """
-        # Nehme das erste Bild aus dem Batch
-        if len(image_tensor.shape) == 4:
-            image_tensor = image_tensor[0]
-        
-        # Konvertiere von [H, W, C] zu numpy array
-        image_np = image_tensor.cpu().numpy()
+        import numpy as np
+        from PIL import Image
         
-        # Konvertiere von 0-1 zu 0-255
-        image_np = (image_np * 255).astype(np.uint8)
-        
-        # Erstelle PIL Image
-        pil_image = Image.fromarray(image_np)
-        
-        # Konvertiere zu Base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format="PNG")
-        img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        with tracing.span("encode png+base64", cat="encode"):
+            # Nehme das erste Bild aus dem Batch
+            if len(image_tensor.shape) == 4:
+                image_tensor = image_tensor[0]
+            
+            # Konvertiere von [H, W, C] zu numpy array
+            image_np = image_tensor.cpu().numpy()
+            
+            # Konvertiere von 0-1 zu 0-255
+            image_np = (image_np * 255).astype(np.uint8)
+            
+            # Erstelle PIL Image
+            pil_image = Image.fromarray(image_np)
+            
+            # Konvertiere zu Base64
+            buffer = io.BytesIO()
+            pil_image.save(buffer, format="PNG")
+            img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
         
         return img_base64
 
-    def generate_prompt(self, image, prompt, model_name, temperature, max_tokens, 
-                       server_url, system_prompt=None):
+    def build_payload(self, image_base64, prompt, model_name, temperature, max_tokens, system_prompt=None,
+                      image_mime="image/png", output_mode="text"):
         """
-        Sendet Bild und Prompt an LM Studio Vision Model
-        Nutzt OpenAI-kompatible API mit Base64-kodierten Bildern
+        Chat-Completion Request im OpenAI-kompatiblen Format mit base64 image_url
+        output_mode="tags" verlangt per json_schema eine Tag-Liste statt Fließtext
         """
-        try:
-            start_time = time.time()
-            
-            print(f"[TA-Vision] Converting image to base64...")
-            image_base64 = self.tensor_to_base64(image)
-            
-            # Baue die API Request nach OpenAI-kompatiblem Format
-            url = f"{server_url}/v1/chat/completions"
-            
-            messages = []
-            
-            # Optional: System Prompt hinzufügen
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            # User Message mit Bild
-            # Format: OpenAI-kompatibel mit base64 image_url
+        if output_mode == "tags":
+            prompt = f"{prompt}\n\n{TAGS_INSTRUCTION}"
+        messages = []
+        
+        # Optional: System Prompt hinzufügen
+        if system_prompt:
             messages.append({
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}"
-                        }
-                    }
-                ]
+                "role": "system",
+                "content": system_prompt
             })
-            
-            payload = {
-                "model": model_name,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": False
+        
+        # User Message mit Bild
+        messages.append({
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:{image_mime};base64,{image_base64}"
+                    }
+                }
+            ]
+        })
+        
+        payload = {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": False
+        }
+        if output_mode == "tags":
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "tags", "strict": True, "schema": TAGS_SCHEMA},
             }
+        return payload
+
+    def format_output(self, text, output_mode):
+        """Antwort je nach output_mode aufbereiten - Fehlermeldungen bleiben unverändert"""
+        if output_mode != "tags" or is_error(text):
+            return text
+        return parse_tags_response(text)
+
+    @staticmethod
+    def client_session():
+        import aiohttp
+        return aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT))
+
+    async def request_completion(self, session, payload, server_url, start_time):
+        """
+        Sendet eine Chat-Completion an LM Studio
+        Liefert den generierten Text oder eine Fehlermeldung als String (der Workflow läuft weiter)
+        """
+        import aiohttp
+        
+        model_name = payload["model"]
+        url = f"{server_url}/v1/chat/completions"
+        
+        try:
+            log.debug("Sending request to LM Studio", extra=fields(model=model_name))
             
-            print(f"[TA-Vision] Sending request to LM Studio ({model_name})...")
-            print(f"[TA-Vision] Prompt: {prompt}")
-            
-            # Sende Request
-            response = requests.post(url, json=payload, timeout=120)
+            with tracing.span("POST /v1/chat/completions", cat="http", model=model_name) as http_span:
+                async with session.post(url, json=payload) as response:
+                    status = response.status
+                    body = await response.read()
+                http_span.set(status=status, bytes=len(body))
             
-            if response.status_code == 200:
-                result = response.json()
+            if status == 200:
+                with tracing.span("json decode", cat="decode"):
+                    result = json.loads(body)
                 generated_text = result['choices'][0]['message']['content']
                 
-                end_time = time.time()
-                elapsed_time = end_time - start_time
+                elapsed_time = time.time() - start_time
+                
+                metrics.VISION_REQUESTS.inc(model=model_name, result="ok")
+                metrics.VISION_SECONDS.observe(elapsed_time, model=model_name)
+                completion_tokens = (result.get('usage') or {}).get('completion_tokens')
+                if completion_tokens:
+                    metrics.VISION_COMPLETION_TOKENS.inc(completion_tokens, model=model_name)
+                    if elapsed_time > 0:
+                        metrics.VISION_TOKENS_PER_SECOND.observe(completion_tokens / elapsed_time, model=model_name)
                 
-                print(f"\n{'='*60}")
-                print(f"[TA-Vision] Generated Prompt:")
-                print(f"{generated_text}")
-                print(f"{'='*60}")
-                print(f"[TA-Vision] Generation time: {elapsed_time:.2f} seconds\n")
+                log.info("Generated prompt", extra=fields(model=model_name, seconds=round(elapsed_time, 2),
+                                                          chars=len(generated_text)))
+                log.debug("Generated prompt text: %s", generated_text)
                 
-                return (generated_text,)
+                return generated_text
             else:
-                error_message = f"Error {response.status_code}: {response.text}"
-                print(f"[TA-Vision] {error_message}", file=sys.stderr)
+                text = body.decode('utf-8', errors='replace')
+                error_message = f"Error {status}: {text}"
+                log.error(error_message)
+                metrics.VISION_REQUESTS.inc(model=model_name, result="http_error")
                 
                 # Hilfreiche Fehlermeldungen
-                if response.status_code == 404:
+                if status == 404:
                     error_message += "\n\n[TA-Vision] HINT: Ist das Vision-Modell in LM Studio geladen?"
-                elif "does not support images" in response.text:
+                elif "does not support images" in text:
                     error_message += "\n\n[TA-Vision] HINT: Das geladene Modell unterstützt keine Bilder. Bitte ein Vision-Modell laden (z.B. llava-v1.5, qwen2-vl, pixtral)."
                 
-                return (error_message,)
+                return error_message
                 
-        except requests.exceptions.ConnectionError:
+        except (asyncio.TimeoutError, aiohttp.ServerTimeoutError):
+            # Vor ClientConnectionError: ServerTimeoutError ist auch ein Verbindungsfehler,
+            # das Modell rechnet aber meist noch (langsames Vision-Modell, große Bilder)
+            log.error("Request timed out after %ss", REQUEST_TIMEOUT, extra=fields(model=model_name))
+            metrics.VISION_REQUESTS.inc(model=model_name, result="timeout")
+            return (f"[TA-Vision] Error: Timeout nach {REQUEST_TIMEOUT}s - LM Studio hat nicht rechtzeitig "
+                    f"geantwortet (Modell evtl. noch beschäftigt)")
+        except aiohttp.ClientConnectionError:
             error_message = "[TA-Vision] Connection Error: LM Studio Server nicht erreichbar. Ist LM Studio gestartet und der Server aktiv?"
-            print(error_message, file=sys.stderr)
-            return (error_message,)
+            log.error("Connection Error: LM Studio server not reachable", extra=fields(url=server_url))
+            metrics.VISION_REQUESTS.inc(model=model_name, result="connection_error")
+            return error_message
         except Exception as e:
             error_message = f"[TA-Vision] Error: {str(e)}"
-            print(error_message, file=sys.stderr)
-            return (error_message,)
+            log.error("Error: %s", e)
+            metrics.VISION_REQUESTS.inc(model=model_name, result="error")
+            return error_message
+
+    @profile_node
+    async def generate_prompt(self, image, prompt, model_name, temperature, max_tokens, 
+                              server_url, system_prompt=None, output_mode="text"):
+        """
+        Sendet Bild und Prompt an LM Studio Vision Model
+        Async - ComfyUI kann während der Antwortzeit andere Nodes ausführen
+        """
+        start_time = time.time()
+        try:
+            log.debug("Converting image to base64...")
+            image_base64 = await asyncio.to_thread(self.tensor_to_base64, image)
+        except Exception as e:
+            log.error("Error: %s", e)
+            metrics.VISION_REQUESTS.inc(model=model_name, result="error")
+            return (f"[TA-Vision] Error: {str(e)}",)
+        
+        payload = self.build_payload(image_base64, prompt, model_name, temperature, max_tokens, system_prompt,
+                                     output_mode=output_mode)
+        async with self.client_session() as session:
+            generated_text = await self.request_completion(session, payload, server_url, start_time)
+        return (self.format_output(generated_text, output_mode),)
+
+
+class TAEbuLMStudioVisionBatchRequest(TAEbuLMStudioVisionRequest):
+    """
+    Image-to-Prompt für jedes Bild eines Batches
+    Bis zu max_concurrency Requests laufen gleichzeitig (asyncio.gather + Semaphore)
+    Optional werden fast identische Video-Frames nur einmal beschriftet (ta_frame_dedupe)
+    
+    images_per_request > 1 packt mehrere Bilder in eine Chat-Nachricht - System-
+    Prompt und Anweisung werden nur einmal verarbeitet. Die Antwort ist per
+    json_schema auf {"captions": [...]} festgelegt. Lehnt ein Modell mehrere
+    Bilder ab, wird einzeln nachgefragt und das Modell für den Rest der Sitzung gemerkt.
+    """
+    
+    # Modelle, die mehrere Bilder pro Request abgelehnt haben
+    _single_image_models = set()
+    
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        inputs["required"]["max_concurrency"] = ("INT", {
+            "default": 2,
+            "min": 1,
+            "max": 16,
+            "tooltip": "Parallel requests - LM Studio processes them concurrently when parallel slots are available"
+        })
+        inputs["optional"]["dedupe_threshold"] = ("FLOAT", {
+            "default": 0.0,
+            "min": 0.0,
+            "max": 0.5,
+            "step": 0.005,
+            "tooltip": "Caption only one frame per group of near-identical consecutive frames and reuse its "
+                       "caption (mean abs. difference of 32x32 grayscale thumbnails, 0 = off, ~0.02 for video)"
+        })
+        inputs["optional"]["images_per_request"] = ("INT", {
+            "default": 1,
+            "min": 1,
+            "max": 16,
+            "tooltip": "Pack several images into one request (shared prompt prefill); "
+                       "falls back to one image per request if the model rejects it"
+        })
+        return inputs
+
+    RETURN_TYPES = ("STRING", "FLOAT")
+    RETURN_NAMES = ("generated_prompts", "dedupe_ratio")
+    OUTPUT_IS_LIST = (True, False)
+    FUNCTION = "generate_prompts"
+    CATEGORY = "TA-Nodes/LMStudio"
+
+    def build_packed_payload(self, images_base64, prompt, model_name, temperature, max_tokens, system_prompt=None,
+                             output_mode="text"):
+        """
+        Ein Request mit mehreren Bildern, Antwort als {"captions": [eine pro Bild]}
+        Im tags-Modus ist jeder Eintrag ein Objekt nach TAGS_SCHEMA
+        """
+        count = len(images_base64)
+        if output_mode == "tags":
+            prompt = f"{prompt}\n\n{TAGS_INSTRUCTION}"
+            item_schema = TAGS_SCHEMA
+            entries = "tag objects"
+        else:
+            item_schema = {"type": "string"}
+            entries = "strings"
+        content = [{
+            "type": "text",
+            "text": f"{prompt}\n\nYou receive {count} images. Answer for each image separately and in order. "
+                    f"Reply as JSON {{\"captions\": [...]}} with exactly {count} {entries}, one per image."
+        }]
+        for number, image_base64 in enumerate(images_base64, 1):
+            content.append({"type": "text", "text": f"Image {number}:"})
+            content.append({"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}})
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": content})
+        
+        return {
+            "model": model_name,
+            "messages": messages,
+            "temperature": temperature,
+            # Budget pro Bild wie bei Einzel-Requests
+            "max_tokens": max_tokens * count,
+            "stream": False,
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "captions",
+                    "strict": True,
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "captions": {
+                                "type": "array",
+                                "items": item_schema,
+                                "minItems": count,
+                                "maxItems": count,
+                            },
+                        },
+                        "required": ["captions"],
+                    },
+                },
+            },
+        }
+
+    @staticmethod
+    def parse_packed_response(text, count, output_mode="text"):
+        """Liste mit count Captions - None, wenn die Antwort nicht passt"""
+        try:
+            captions = json.loads(text).get("captions")
+        except (ValueError, AttributeError):
+            return None
+        if not isinstance(captions, list) or len(captions) != count:
+            return None
+        if output_mode == "tags":
+            if not all(isinstance(caption, (dict, list)) for caption in captions):
+                return None
+            return [parse_tags_response(caption) for caption in captions]
+        if not all(isinstance(caption, str) for caption in captions):
+            return None
+        return [caption.strip() for caption in captions]
+
+    @profile_node
+    async def generate_prompts(self, image, prompt, model_name, temperature, max_tokens,
+                               server_url, max_concurrency, system_prompt=None, output_mode="text",
+                               dedupe_threshold=0.0, images_per_request=1):
+        batch_start = time.time()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # Gruppen fast identischer Frames - nur der Repräsentant geht an LM Studio
+        owner, representatives = await asyncio.to_thread(group_near_duplicates, image, dedupe_threshold)
+        frames = len(owner)
+        dedupe_ratio = 1.0 - len(representatives) / frames if frames else 0.0
+        if len(representatives) < frames:
+            metrics.VISION_DEDUPED_FRAMES.inc(frames - len(representatives), model=model_name)
+        
+        if model_name in self._single_image_models:
+            images_per_request = 1
+        packs = [representatives[i:i + images_per_request]
+                 for i in range(0, len(representatives), images_per_request)]
+        
+        async def caption_pack(session, indices):
+            # Encoding ebenfalls im Semaphore - begrenzt Threads und Speicher für die PNGs
+            async with semaphore:
+                start_time = time.time()
+                try:
+                    encoded = await asyncio.gather(*(asyncio.to_thread(self.tensor_to_base64, image[i])
+                                                     for i in indices))
+                except Exception as e:
+                    log.error("Error encoding images %s: %s", indices, e)
+                    metrics.VISION_REQUESTS.inc(model=model_name, result="error")
+                    return [f"[TA-Vision] Error: {str(e)}"] * len(indices)
+                
+                if len(indices) > 1 and model_name not in self._single_image_models:
+                    payload = self.build_packed_payload(encoded, prompt, model_name, temperature, max_tokens,
+                                                        system_prompt, output_mode)
+                    text = await self.request_completion(session, payload, server_url, start_time)
+                    captions = self.parse_packed_response(text, len(indices), output_mode)
+                    if captions is not None:
+                        metrics.VISION_PACKED_REQUESTS.inc(model=model_name, result="ok")
+                        return captions
+                    if rejects_multiple_images(text):
+                        # Modell akzeptiert nur ein Bild pro Nachricht - nicht erneut versuchen
+                        self._single_image_models.add(model_name)
+                        metrics.VISION_PACKED_REQUESTS.inc(model=model_name, result="rejected")
+                        log.warning("Model rejected %d images per request - using single-image requests",
+                                    len(indices), extra=fields(model=model_name))
+                    elif is_error(text):
+                        # Anderer Fehler (z.B. Kontext zu klein) - nur dieser Pack einzeln, Modell nicht markieren
+                        metrics.VISION_PACKED_REQUESTS.inc(model=model_name, result="error")
+                        log.warning("Packed request failed - retrying this pack per image: %s",
+                                    text.splitlines()[0], extra=fields(model=model_name))
+                    else:
+                        metrics.VISION_PACKED_REQUESTS.inc(model=model_name, result="unparsable")
+                        log.warning("Packed response could not be parsed - retrying per image",
+                                    extra=fields(model=model_name))
+                
+                captions = []
+                for image_base64 in encoded:
+                    payload = self.build_payload(image_base64, prompt, model_name, temperature, max_tokens,
+                                                 system_prompt, output_mode=output_mode)
+                    text = await self.request_completion(session, payload, server_url, time.time())
+                    captions.append(self.format_output(text, output_mode))
+                return captions
+        
+        async with self.client_session() as session:
+            results = await asyncio.gather(*(caption_pack(session, pack) for pack in packs))
+        by_index = {}
+        for pack, pack_captions in zip(packs, results):
+            by_index.update(zip(pack, pack_captions))
+        captions = [by_index[owner[i]] for i in range(frames)]
+        
+        log.info("Batch captioned", extra=fields(model=model_name, images=frames, packs=len(packs),
+                                                 images_per_request=images_per_request,
+                                                 dedupe_ratio=round(dedupe_ratio, 3),
+                                                 concurrency=max_concurrency,
+                                                 seconds=round(time.time() - batch_start, 2)))
+        return (captions, dedupe_ratio)
 
 
 class TAEbuLMStudioLoadModel:
@@ -204,6 +590,7 @@ class TAEbuLMStudioLoadModel:
                     "default": "",
                     "multiline": False
                 }),
+                **context.context_inputs(),
             }
         }
 
@@ -212,18 +599,19 @@ class TAEbuLMStudioLoadModel:
     FUNCTION = "load_model"
     CATEGORY = "TA-Nodes/LMStudio"
 
-    def load_model(self, model_search_string, context_length, input_string=""):
+    @profile_node
+    async def load_model(self, model_search_string, context_length, input_string="", context_mode="manual",
+                         system_prompt="", prompt="", max_tokens=500, images_per_request=1):
         """
         Lädt ein Modell in LM Studio via lms CLI
         """
+        load_started = None
         try:
-            import subprocess
-            
-            print(f"[TA-LMStudio] Searching for model: {model_search_string}")
+            lms_log.debug("Searching for model: %s", model_search_string)
             
             # Suche nach Modell
             search_cmd = ['lms', 'ls', '--detailed']
-            result = subprocess.run(search_cmd, capture_output=True, text=True, check=True)
+            result = await tracing.run_command_async(search_cmd, check=True)
             
             # Finde passendes Modell
             search_parts = model_search_string.lower().split()
@@ -241,27 +629,42 @@ class TAEbuLMStudioLoadModel:
             
             if not matched_models:
                 error_msg = f"[TA-LMStudio] No models found matching '{model_search_string}'"
-                print(error_msg)
+                lms_log.warning("No models found matching '%s'", model_search_string)
                 return (input_string, error_msg)
             
             model_path = matched_models[0]
-            print(f"[TA-LMStudio] Loading model: {model_path}")
+            context_length, reuse = await context.resolve_context_length(
+                model_path, context_mode, context_length, system_prompt, prompt, max_tokens, images_per_request
+            )
+            if reuse:
+                lms_log.info("Model already loaded with sufficient context: %s", model_path)
+                return (input_string, model_path)
+            lms_log.info("Loading model: %s", model_path)
             
             # Lade Modell
             load_cmd = ['lms', 'load', model_path, '-y', f'--context-length={context_length}', '--gpu=1']
-            load_result = subprocess.run(load_cmd, capture_output=True, text=True, check=True)
+            load_started = time.perf_counter()
+            load_result = await tracing.run_command_async(load_cmd, check=True)
+            load_seconds = time.perf_counter() - load_started
+            metrics.LM_LOAD_SECONDS.observe(load_seconds, node="TAEbuLMStudioLoadModel")
             
             if load_result.returncode == 0:
-                print(f"[TA-LMStudio] Model loaded successfully: {model_path}")
+                lms_log.info("Model loaded successfully: %s", model_path)
+                metrics.LM_LOADS.inc(node="TAEbuLMStudioLoadModel", result="ok")
+                # lms load kehrt erst zurück, wenn das Modell bereit ist
+                metrics.LM_TIME_TO_READY.observe(load_seconds, node="TAEbuLMStudioLoadModel")
+                metrics.set_lmstudio_resident(model_path)
                 return (input_string, model_path)
             else:
                 error_msg = f"[TA-LMStudio] Failed to load model: {model_path}"
-                print(error_msg)
+                lms_log.error("Failed to load model: %s", model_path)
                 return (input_string, error_msg)
                 
         except Exception as e:
             error_msg = f"[TA-LMStudio] Error: {str(e)}"
-            print(error_msg, file=sys.stderr)
+            lms_log.error("Error: %s", e)
+            if load_started is not None:
+                metrics.LM_LOADS.inc(node="TAEbuLMStudioLoadModel", result="error")
             return (input_string, error_msg)
 
 
@@ -287,41 +690,46 @@ class TAEbuLMStudioUnload:
     FUNCTION = "unload_models"
     CATEGORY = "TA-Nodes/LMStudio"
 
-    def unload_models(self, input_string=""):
+    @profile_node
+    async def unload_models(self, input_string=""):
         """
         Entlädt alle geladenen Modelle in LM Studio
         """
         try:
-            import subprocess
-            
-            print(f"[TA-LMStudio] Unloading all models...")
+            lms_log.debug("Unloading all models...")
             
             unload_cmd = ['lms', 'unload', '--all', '-y']
-            result = subprocess.run(unload_cmd, capture_output=True, text=True, check=True)
+            with metrics.LM_UNLOAD_SECONDS.time(node="TAEbuLMStudioUnload"):
+                result = await tracing.run_command_async(unload_cmd, check=True)
             
             if result.returncode == 0:
-                print(f"[TA-LMStudio] All models unloaded successfully")
+                lms_log.info("All models unloaded successfully")
+                metrics.LM_UNLOADS.inc(node="TAEbuLMStudioUnload", result="ok")
+                metrics.clear_lmstudio_resident()
                 return (input_string,)
             else:
                 error_msg = "[TA-LMStudio] Failed to unload models"
-                print(error_msg)
+                lms_log.error("Failed to unload models")
                 return (error_msg,)
                 
         except Exception as e:
             error_msg = f"[TA-LMStudio] Error: {str(e)}"
-            print(error_msg, file=sys.stderr)
+            lms_log.error("Error: %s", e)
+            metrics.LM_UNLOADS.inc(node="TAEbuLMStudioUnload", result="error")
             return (error_msg,)
 
 
 # Node Registration
 NODE_CLASS_MAPPINGS = {
     "TAEbuLMStudioVisionRequest": TAEbuLMStudioVisionRequest,
+    "TAEbuLMStudioVisionBatchRequest": TAEbuLMStudioVisionBatchRequest,
     "TAEbuLMStudioLoadModel": TAEbuLMStudioLoadModel,
     "TAEbuLMStudioUnload": TAEbuLMStudioUnload,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "TAEbuLMStudioVisionRequest": "TA LMStudio Vision (Image-to-Prompt)",
+    "TAEbuLMStudioVisionBatchRequest": "TA LMStudio Vision Batch (Image-to-Prompt)",
     "TAEbuLMStudioLoadModel": "TA LMStudio Load Model",
     "TAEbuLMStudioUnload": "TA LMStudio Unload All",
 }
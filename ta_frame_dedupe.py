@@ -0,0 +1,60 @@
+"""
+TA Frame Dedupe - Fast identische Frames eines Batches gruppieren
+Teil des ComfyUI-TA-Nodes-Pack
+
+Bei Video-Frames unterscheiden sich aufeinanderfolgende Bilder oft kaum,
+trotzdem kostet jedes einen VLM-Aufruf. Der ganze Batch wird in einem
+Schritt (Torch, ohne Python-Schleife über Pixel) auf kleine Graustufen-
+Thumbnails reduziert. Ein Frame gehört zur Gruppe des letzten Repräsentanten,
+solange die mittlere absolute Differenz der Thumbnails unter dem Schwellwert
+liegt - sonst beginnt er eine neue Gruppe.
+"""
+
+THUMBNAIL_SIZE = 32
+# Frames pro Schritt - begrenzt den Zwischenspeicher bei großen Batches
+CHUNK_SIZE = 64
+
+# ITU-R BT.601 Luma
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+def thumbnails(images, size=THUMBNAIL_SIZE):
+    """
+    ComfyUI IMAGE [B, H, W, C] (0-1) -> numpy [B, size*size] Graustufen
+    """
+    import torch
+    import torch.nn.functional as F
+
+    results = []
+    for start in range(0, images.shape[0], CHUNK_SIZE):
+        chunk = images[start:start + CHUNK_SIZE, ..., :3].float()
+        weights = torch.tensor(LUMA_WEIGHTS[:chunk.shape[-1]], dtype=chunk.dtype, device=chunk.device)
+        luma = (chunk * weights).sum(dim=-1, keepdim=True).movedim(-1, 1)
+        pooled = F.adaptive_avg_pool2d(luma, size)
+        results.append(pooled.flatten(1).cpu())
+    return torch.cat(results).numpy()
+
+
+def group_near_duplicates(images, threshold):
+    """
+    Liefert (owner, representatives):
+        owner[i]         Index des Frames, dessen Caption Frame i bekommt
+        representatives  Indizes der Frames, die wirklich beschriftet werden
+    threshold: mittlere absolute Differenz (0-1) der Thumbnails, 0 = aus
+    """
+    count = images.shape[0]
+    if threshold <= 0 or count < 2:
+        return list(range(count)), list(range(count))
+
+    thumbs = thumbnails(images)
+    owner = [0]
+    representatives = [0]
+    for index in range(1, count):
+        current = representatives[-1]
+        # Gegen den Repräsentanten, nicht den Vorgänger - langsame Kamerafahrten driften sonst weg
+        if abs(thumbs[index] - thumbs[current]).mean() < threshold:
+            owner.append(current)
+        else:
+            owner.append(index)
+            representatives.append(index)
+    return owner, representatives
@@ -4,10 +4,16 @@ Behebt UnicodeDecodeError auf Windows beim Lesen von lms Output
 """
 
 import subprocess
-import time
 import re
 import sys
 
+from .ta_logging import get_logger, fields
+from . import ta_lmstudio_context as context
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+log = get_logger("AutoLoad")
+
 
 class TALMStudioAutoLoad:
     """
@@ -38,6 +44,7 @@ class TALMStudioAutoLoad:
                     "step": 512
                 }),
             },
+            "optional": context.context_inputs(),
         }
 
     RETURN_TYPES = ("STRING", "STRING")
@@ -52,7 +59,7 @@ class TALMStudioAutoLoad:
         
         try:
             # Windows: Nutze UTF-8 encoding explizit
-            result = subprocess.run(
+            result = tracing.run_command(
                 ['lms', 'ls', '--detailed'],
                 capture_output=True,
                 text=True,
@@ -93,21 +100,21 @@ class TALMStudioAutoLoad:
                     cls._model_paths[display_name] = full_path
                     models.append(display_name)
                     
-                    print(f"[TA-AutoLoad] Mapped: '{display_name}' -> '{full_path}'")
+                    log.debug("Mapped: '%s' -> '%s'", display_name, full_path)
                 
                 if models:
-                    print(f"[TA-AutoLoad] Total found: {len(models)} models")
+                    log.debug("Total found: %d models", len(models))
                     models.sort()
                     return models
                 else:
-                    print("[TA-AutoLoad] No models found, using defaults")
+                    log.warning("No models found, using defaults")
                     return cls.get_default_models()
             else:
-                print(f"[TA-AutoLoad] lms command failed")
+                log.warning("lms command failed")
                 return cls.get_default_models()
                 
         except Exception as e:
-            print(f"[TA-AutoLoad] Error listing models: {e}")
+            log.warning("Error listing models: %s", e)
             return cls.get_default_models()
     
     @classmethod
@@ -125,17 +132,10 @@ class TALMStudioAutoLoad:
                 cls._model_paths[model] = model
         return defaults
 
-    def is_model_loaded(self, model_name):
+    async def is_model_loaded(self, model_name):
         """Prüft ob Modell bereits geladen ist"""
         try:
-            result = subprocess.run(
-                ['lms', 'ps'],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                encoding='utf-8',
-                errors='replace'
-            )
+            result = await tracing.run_command_async(['lms', 'ps'], timeout=5)
             
             if result.returncode == 0:
                 output = result.stdout
@@ -151,39 +151,31 @@ class TALMStudioAutoLoad:
                 name_parts = model_name.replace('/', ' ').split()
                 for part in name_parts:
                     if len(part) > 4 and part in output:
-                        print(f"[TA-AutoLoad] Model seems loaded (matched: {part})")
+                        log.debug("Model seems loaded (matched: %s)", part)
                         return True
                 
                 return False
             return False
         except Exception as e:
-            print(f"[TA-AutoLoad] Error checking loaded models: {e}")
+            log.warning("Error checking loaded models: %s", e)
             return False
 
-    def load_model(self, display_name, context_length):
+    async def load_model(self, display_name, context_length):
         """
         Lädt das Modell - Windows UTF-8 safe
         """
         full_path = self._model_paths.get(display_name, display_name)
         
-        print(f"[TA-AutoLoad] Loading model...")
-        print(f"[TA-AutoLoad]   Display name: {display_name}")
-        print(f"[TA-AutoLoad]   Full path: {full_path}")
+        log.info("Loading model", extra=fields(display=display_name, path=full_path))
         
         try:
             # Unload vorherige Modelle
-            print("[TA-AutoLoad] Unloading previous models...")
+            log.debug("Unloading previous models...")
             try:
-                subprocess.run(
-                    ['lms', 'unload', '--all', '-y'],
-                    capture_output=True,
-                    timeout=10,
-                    encoding='utf-8',
-                    errors='replace'
-                )
-                time.sleep(2)
+                await tracing.run_command_async(['lms', 'unload', '--all', '-y'], timeout=10)
+                await tracing.sleep_async(2, "sleep after unload")
             except Exception as e:
-                print(f"[TA-AutoLoad] Warning during unload: {e}")
+                log.warning("Warning during unload: %s", e)
             
             # Lade neues Modell
             load_cmd = [
@@ -192,46 +184,41 @@ class TALMStudioAutoLoad:
                 '--gpu=1'
             ]
             
-            print(f"[TA-AutoLoad] Running: {' '.join(load_cmd)}")
+            log.debug("Running: %s", ' '.join(load_cmd))
             
             # WICHTIG: Nutze encoding='utf-8' und errors='replace' für Windows
-            result = subprocess.run(
-                load_cmd,
-                capture_output=True,
-                text=True,
-                timeout=120,
-                encoding='utf-8',
-                errors='replace'  # Ignoriere Encoding-Fehler
-            )
+            result = await tracing.run_command_async(load_cmd, timeout=120)
             
-            print(f"[TA-AutoLoad] Return code: {result.returncode}")
+            log.debug("Return code: %d", result.returncode)
             
             # Zeige Output nur wenn interessant
             if result.returncode == 0:
-                print(f"[TA-AutoLoad] ✓ Model loaded successfully!")
+                log.info("Model loaded successfully", extra=fields(model=display_name))
                 # Extrahiere API identifier aus Output falls vorhanden
                 if 'identifier' in result.stderr.lower():
                     for line in result.stderr.split('\n'):
                         if 'identifier' in line.lower() and '"' in line:
-                            print(f"[TA-AutoLoad]   {line.strip()}")
-                time.sleep(3)
+                            log.debug("%s", line.strip())
+                await tracing.sleep_async(3, "sleep after load")
                 return True, "Loaded"
             else:
                 # Bei Fehler zeige Details
                 if result.stdout:
-                    print(f"[TA-AutoLoad] stdout: {result.stdout[:300]}")
+                    log.error("stdout: %s", result.stdout[:300])
                 if result.stderr:
-                    print(f"[TA-AutoLoad] stderr: {result.stderr[:300]}")
+                    log.error("stderr: %s", result.stderr[:300])
                 return False, f"Load failed (code {result.returncode})"
                 
         except subprocess.TimeoutExpired:
-            print("[TA-AutoLoad] ✗ Timeout loading model")
+            log.error("Timeout loading model")
             return False, "Timeout (>120s)"
         except Exception as e:
-            print(f"[TA-AutoLoad] ✗ Error: {str(e)}")
+            log.error("Error: %s", e)
             return False, f"Error: {str(e)}"
 
-    def select_and_load(self, model, auto_load, context_length):
+    @profile_node
+    async def select_and_load(self, model, auto_load, context_length, context_mode="manual", system_prompt="",
+                              prompt="", max_tokens=500, images_per_request=1):
         """Wählt Modell aus und lädt es automatisch"""
         
         # API-Name ist der letzte Teil
@@ -240,23 +227,29 @@ class TALMStudioAutoLoad:
         else:
             api_name = model
         
-        print(f"[TA-AutoLoad] ===== NEW REQUEST =====")
-        print(f"[TA-AutoLoad] Selected: {model}")
-        print(f"[TA-AutoLoad] API name: {api_name}")
-        print(f"[TA-AutoLoad] Auto-load: {auto_load}")
+        log.debug("New request", extra=fields(model=model, api_name=api_name, auto_load=auto_load))
         
         if not auto_load:
-            print(f"[TA-AutoLoad] Auto-load disabled")
+            log.debug("Auto-load disabled")
             return (api_name, "Manual mode")
         
+        if context_mode == "auto":
+            # Geladen mit zu kleinem Kontext -> neu laden mit dem geschätzten Bucket
+            full_path = self._model_paths.get(model, model)
+            context_length, reuse = await context.resolve_context_length(
+                full_path, context_mode, context_length, system_prompt, prompt, max_tokens, images_per_request
+            )
+            if reuse:
+                log.debug("Model already loaded with sufficient context")
+                return (api_name, context.reuse_status(context_length))
         # Prüfe ob bereits geladen
-        if self.is_model_loaded(model):
-            print(f"[TA-AutoLoad] Model already loaded")
+        elif await self.is_model_loaded(model):
+            log.debug("Model already loaded")
             return (api_name, "Already loaded")
         
         # Lade Modell
-        print(f"[TA-AutoLoad] Model not loaded, loading now...")
-        success, status = self.load_model(model, context_length)
+        log.debug("Model not loaded, loading now...")
+        success, status = await self.load_model(model, context_length)
         
         return (api_name, status)
 
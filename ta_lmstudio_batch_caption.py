@@ -0,0 +1,286 @@
+"""
+TA LMStudio Batch Caption - Bildbeschriftung für ganze Verzeichnisse
+Teil des ComfyUI-TA-Nodes-Pack
+
+Liest Bilder direkt von der Platte (Verzeichnis oder Glob) statt aus einem
+IMAGE Tensor. Dekodieren, Verkleinern und JPEG-Encoding laufen in einem
+Thread-Pool (PIL gibt dabei den GIL frei), höchstens max_in_flight Requests
+sind gleichzeitig bei LM Studio. Jedes Ergebnis wird sofort als eine Zeile
+an die JSONL-Datei gehängt:
+
+    {"file": "...", "caption": "...", "model": "...", "seconds": 1.23}
+    {"file": "...", "error": "..."}
+
+Ein erneuter Lauf überspringt Dateien, die schon eine Caption haben -
+fehlgeschlagene werden wiederholt. Dateien werden über ihren absoluten Pfad
+erkannt, ein Lauf mit relativem Pfad setzt also auch fort.
+Ohne ComfyUI: python BATCH_CAPTION.py
+"""
+
+import asyncio
+import base64
+import glob
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .ta_ebu_lmstudio_vision_node import TAEbuLMStudioVisionRequest, is_error
+from .ta_logging import get_logger, fields
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+log = get_logger("BatchCaption")
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+DEFAULT_OUTPUT_NAME = "captions.jsonl"
+JPEG_QUALITY = 90
+PROGRESS_EVERY = 100
+
+
+def iter_image_files(source, recursive=False):
+    """
+    Bilddateien aus einem Verzeichnis oder Glob-Muster, sortiert
+    Nur die Pfade werden gesammelt - die Bilder selbst liest erst der Worker
+    """
+    if os.path.isdir(source):
+        if recursive:
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            for name in sorted(os.listdir(source)):
+                path = os.path.join(source, name)
+                if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+                    yield path
+        return
+
+    for path in sorted(glob.iglob(source, recursive=recursive)):
+        if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path):
+            yield path
+
+
+def default_output_path(source):
+    if os.path.isdir(source):
+        return os.path.join(source, DEFAULT_OUTPUT_NAME)
+    # Glob: Verzeichnis vor dem ersten Platzhalter
+    prefix = source
+    for wildcard in "*?[":
+        prefix = prefix.split(wildcard)[0]
+    return os.path.join(os.path.dirname(prefix) or ".", DEFAULT_OUTPUT_NAME)
+
+
+def file_key(path):
+    """Vergleichbarer Schlüssel einer Datei - gleich für relative und absolute Angaben"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def read_done(output_path):
+    """
+    Dateien mit nicht-leerer Caption aus einer früheren (evtl. abgebrochenen) JSONL
+    Leere oder fehlgeschlagene Einträge werden beim nächsten Lauf wiederholt
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Abgeschnittene letzte Zeile nach Abbruch
+                continue
+            if not isinstance(record, dict) or record.get("error") or not record.get("file"):
+                continue
+            caption = record.get("caption")
+            if isinstance(caption, str) and caption.strip():
+                done.add(file_key(record["file"]))
+    return done
+
+
+def encode_file(path, max_edge=0):
+    """Datei -> verkleinertes RGB-JPEG als base64 (läuft im Thread-Pool)"""
+    from PIL import Image, ImageOps
+
+    with tracing.span("decode+encode jpeg", cat="encode", file=os.path.basename(path)):
+        with Image.open(path) as image:
+            if max_edge:
+                # JPEG: direkt in reduzierter Auflösung dekodieren
+                image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+        if max_edge:
+            image.thumbnail((max_edge, max_edge))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+class TALMStudioBatchCaption(TAEbuLMStudioVisionRequest):
+    """
+    Image-to-Prompt für alle Bilder eines Verzeichnisses mit fortsetzbarer JSONL-Ausgabe
+    Nutzt build_payload/request_completion der Vision Node
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = super().INPUT_TYPES()
+        required = inputs["required"]
+        del required["image"]
+        inputs["required"] = {
+            "source": ("STRING", {
+                "default": "",
+                "multiline": False,
+                "tooltip": "Image directory or glob pattern (e.g. D:/dataset/**/*.jpg)"
+            }),
+            "output_jsonl": ("STRING", {
+                "default": "",
+                "multiline": False,
+                "tooltip": f"JSONL output - empty: {DEFAULT_OUTPUT_NAME} next to the images"
+            }),
+            **required,
+            "max_in_flight": ("INT", {
+                "default": 4,
+                "min": 1,
+                "max": 64,
+                "tooltip": "Requests sent to LM Studio at the same time"
+            }),
+            "workers": ("INT", {
+                "default": 4,
+                "min": 1,
+                "max": 32,
+                "tooltip": "Threads for decoding/resizing/encoding - images are prepared ahead of the requests"
+            }),
+            "max_edge": ("INT", {
+                "default": 1024,
+                "min": 0,
+                "max": 8192,
+                "step": 64,
+                "tooltip": "Downscale the longest edge before sending (0 = original size)"
+            }),
+            "recursive": ("BOOLEAN", {
+                "default": False,
+            }),
+            "resume": ("BOOLEAN", {
+                "default": True,
+                "label_on": "Skip captioned",
+                "label_off": "Start over",
+                "tooltip": "Skip files that already have a caption in the JSONL"
+            }),
+        }
+        return inputs
+
+    RETURN_TYPES = ("STRING", "INT", "INT", "INT")
+    RETURN_NAMES = ("jsonl_path", "captioned", "skipped", "failed")
+    FUNCTION = "caption_directory"
+    CATEGORY = "TA-Nodes/LMStudio"
+    # Schreibt die JSONL als Seiteneffekt - läuft auch ohne verbundene Outputs
+    OUTPUT_NODE = True
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # Verzeichnis und JSONL können sich jederzeit ändern - immer ausführen,
+        # bereits beschriftete Dateien überspringt resume ohnehin
+        return float("nan")
+
+    @profile_node
+    async def caption_directory(self, source, output_jsonl, prompt, model_name, temperature, max_tokens,
+                                server_url, max_in_flight, workers, max_edge, recursive, resume,
+                                system_prompt=None, output_mode="text"):
+        output_path = output_jsonl or default_output_path(source)
+        done = read_done(output_path) if resume else set()
+        mode = "a" if resume else "w"
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        if mode == "a" and os.path.exists(output_path) and os.path.getsize(output_path):
+            # Abgeschnittene letzte Zeile abschließen, sonst klebt der nächste Eintrag daran
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        else:
+            needs_newline = False
+
+        counts = {"captioned": 0, "skipped": 0, "failed": 0}
+        batch_start = time.time()
+        # Requests begrenzt durch den Semaphore, vorbereitete Bilder durch die Anzahl offener Tasks
+        request_slots = asyncio.Semaphore(max_in_flight)
+        pending = set()
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="TA-Caption")
+
+        with open(output_path, mode, encoding="utf-8") as out:
+            if needs_newline:
+                out.write("\n")
+
+            def write(record):
+                # Läuft im Event-Loop-Thread - keine Sperre nötig
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+            async def caption(session, path):
+                start_time = time.time()
+                try:
+                    image_base64 = await loop.run_in_executor(executor, encode_file, path, max_edge)
+                except Exception as e:
+                    log.error("Could not read %s: %s", path, e)
+                    counts["failed"] += 1
+                    write({"file": file_key(path), "error": f"read: {e}"})
+                    return
+                payload = self.build_payload(image_base64, prompt, model_name, temperature, max_tokens,
+                                             system_prompt, image_mime="image/jpeg", output_mode=output_mode)
+                del image_base64
+                async with request_slots:
+                    text = await self.request_completion(session, payload, server_url, start_time)
+                text = self.format_output(text, output_mode)
+                if is_error(text):
+                    counts["failed"] += 1
+                    write({"file": file_key(path), "error": text})
+                else:
+                    counts["captioned"] += 1
+                    write({"file": file_key(path), "caption": text, "model": model_name,
+                           "seconds": round(time.time() - start_time, 3)})
+
+                finished = counts["captioned"] + counts["failed"]
+                if finished % PROGRESS_EVERY == 0:
+                    elapsed = time.time() - batch_start
+                    log.info("Progress", extra=fields(done=finished, failed=counts["failed"],
+                                                      images_per_second=round(finished / elapsed, 2)))
+
+            try:
+                async with self.client_session() as session:
+                    for path in iter_image_files(source, recursive):
+                        if file_key(path) in done:
+                            counts["skipped"] += 1
+                            continue
+                        if len(pending) >= max_in_flight + workers:
+                            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                            for task in finished:
+                                task.result()
+                        pending.add(asyncio.create_task(caption(session, path)))
+                    while pending:
+                        finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in finished:
+                            task.result()
+            finally:
+                # Abbruch (ComfyUI Interrupt): offene Requests verwerfen, bereits Geschriebenes bleibt
+                for task in pending:
+                    task.cancel()
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        elapsed = time.time() - batch_start
+        log.info("Batch caption finished", extra=fields(model=model_name, output=output_path,
+                                                        seconds=round(elapsed, 2), **counts))
+        return (output_path, counts["captioned"], counts["skipped"], counts["failed"])
+
+
+# Node Registration
+NODE_CLASS_MAPPINGS = {
+    "TALMStudioBatchCaption": TALMStudioBatchCaption,
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "TALMStudioBatchCaption": "TA LMStudio Batch Caption (Directory)",
+}
@@ -0,0 +1,138 @@
+"""
+TA LMStudio CLI - Gecachte Modell-Liste von `lms ls`
+Teil des ComfyUI-TA-Nodes-Pack
+
+ComfyUI ruft INPUT_TYPES bei jedem /object_info Request auf. Statt dort
+jedes Mal synchron `lms ls` zu starten (bis zu 10s), wird die Liste im
+Hintergrund geholt und gecached. Ist sie älter als die TTL, wird weiterhin
+die alte Liste geliefert und parallel eine neue geholt (stale-while-revalidate).
+Der erste Abruf startet erst mit dem ersten INPUT_TYPES - nicht schon beim
+Import des Packs (Skripte wie BATCH_CAPTION.py brauchen die Liste nicht).
+
+Umgebungsvariablen:
+    TA_LMS_LIST_TTL=60      Sekunden, nach denen die Liste neu geholt wird
+    TA_LMS_LIST_WAIT=3      Max. Wartezeit, wenn noch keine Liste vorliegt
+"""
+
+import os
+import subprocess
+import threading
+import time
+
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_logging import get_logger
+
+log = get_logger("LMS")
+
+LIST_COMMAND = ['lms', 'ls', '--detailed']
+LIST_TIMEOUT = 10
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+LIST_TTL = _env_float("TA_LMS_LIST_TTL", 60)
+LIST_WAIT = _env_float("TA_LMS_LIST_WAIT", 3)
+
+
+class CachedCommand:
+    """
+    Führt ein CLI-Kommando im Hintergrund aus und cached dessen stdout
+    Fehlgeschlagene Aufrufe überschreiben keine gültige, ältere Ausgabe
+    """
+
+    def __init__(self, command, ttl=LIST_TTL, timeout=LIST_TIMEOUT, metrics_name="lms"):
+        self.command = command
+        self.metrics_name = metrics_name
+        self.ttl = ttl
+        self.timeout = timeout
+        self._stdout = None
+        self._fetched_at = None
+        self._worker = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def _run(self):
+        stdout = None
+        try:
+            result = tracing.run_command(
+                self.command,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout,
+                encoding='utf-8',
+                errors='replace'
+            )
+            if result.returncode == 0:
+                stdout = result.stdout
+            else:
+                log.warning("'%s' returned code %d", ' '.join(self.command), result.returncode)
+        except FileNotFoundError:
+            log.warning("lms CLI not found")
+        except subprocess.TimeoutExpired:
+            log.warning("'%s' timed out after %ss", ' '.join(self.command), self.timeout)
+        except Exception as e:
+            log.warning("Error running '%s': %s", ' '.join(self.command), e)
+
+        with self._lock:
+            if stdout is not None:
+                self._stdout = stdout
+            # Auch Fehlschläge zählen als Abruf - sonst startet jedes INPUT_TYPES einen neuen Versuch
+            self._fetched_at = time.monotonic()
+            self._worker = None
+        self._ready.set()
+
+    def refresh(self):
+        """Startet einen Abruf im Hintergrund (nicht-blockierend, höchstens einer gleichzeitig)"""
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(
+                target=self._run,
+                name=f"TA-LMS:{' '.join(self.command[1:])}",
+                daemon=True
+            )
+            self._worker.start()
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None if self._stdout is None else 0.0
+
+    def get(self, wait=LIST_WAIT):
+        """
+        Liefert die gecachte Ausgabe (oder None)
+        Nur beim allerersten Aufruf wird bis zu `wait` Sekunden auf den Abruf gewartet
+        """
+        with self._lock:
+            fetched_at = self._fetched_at
+
+        if fetched_at is None:
+            metrics.CACHE_REQUESTS.inc(cache=self.metrics_name, result="miss")
+            self.refresh()
+            self._ready.wait(wait)
+        elif time.monotonic() - fetched_at > self.ttl:
+            metrics.CACHE_REQUESTS.inc(cache=self.metrics_name, result="stale")
+            self.refresh()
+        else:
+            metrics.CACHE_REQUESTS.inc(cache=self.metrics_name, result="hit")
+
+        with self._lock:
+            return self._stdout
+
+
+_model_list = CachedCommand(LIST_COMMAND, metrics_name="lms_list")
+
+
+def list_models_output(wait=LIST_WAIT):
+    """stdout von `lms ls --detailed` aus dem Cache - None, wenn lms nicht verfügbar ist"""
+    return _model_list.get(wait)
+
+
+def invalidate_model_list():
+    """Erzwingt beim nächsten Zugriff einen neuen Abruf (z.B. nach einem Download)"""
+    _model_list.invalidate()
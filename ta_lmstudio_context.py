@@ -0,0 +1,225 @@
+"""
+TA LMStudio Context - Minimale context_length für LM Studio Loads schätzen
+Teil des ComfyUI-TA-Nodes-Pack
+
+KV-Cache Speicher und Ladezeit wachsen mit context_length. Im "auto" Modus
+schätzen die Load-Nodes den Bedarf aus System-Prompt, Prompt, Bild-Tokens
+des Vision-Encoders und max_tokens, runden auf einen Bucket auf und
+verwenden ein bereits geladenes Modell weiter, wenn dessen Kontext reicht.
+"""
+
+import json
+import math
+import re
+
+from . import ta_tracing as tracing
+from .ta_logging import get_logger, fields
+
+log = get_logger("Context")
+
+CONTEXT_MODES = ["auto", "manual"]
+
+# Gerundet wird auf diese Stufen - weniger verschiedene Loads, KV-Cache bleibt klein
+CONTEXT_BUCKETS = (2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+# Vorsichtige Schätzung ohne Tokenizer des Modells (Deutsch/Code liegen unter 4 Zeichen/Token)
+CHARS_PER_TOKEN = 3.0
+# Chat-Template, Rollen-Tags, BOS/EOS
+TEMPLATE_OVERHEAD_TOKENS = 64
+SAFETY_MARGIN = 1.15
+
+DEFAULT_IMAGE_EDGE = 1024
+
+# Bild-Tokens pro Vision-Encoder - (Keywords, feste Tokens oder (Patch-Größe, max Tokens))
+# Dynamische Encoder skalieren mit der Bildgröße, feste liefern immer gleich viele Tokens
+IMAGE_TOKEN_TABLE = [
+    (("qwen2-vl", "qwen2.5-vl", "qwen3-vl", "qwen-vl", "qwq-vl"), (28, 16384)),
+    (("pixtral",), (16, 4096)),
+    (("llava-v1.6", "llava-1.6", "llava-next"), 2880),
+    (("llava",), 576),
+    (("gemma-3", "paligemma"), 256),
+    (("internvl",), 1792),
+    (("minicpm-v",), 640),
+    (("phi-3-vision", "phi-3.5-vision"), 1921),
+    (("molmo",), 1152),
+    (("idefics",), 320),
+    # Llama 3.2 Vision nutzt Cross-Attention - Bilder belegen kaum Kontext
+    (("llama-3.2", "llama3.2"), 8),
+]
+DEFAULT_IMAGE_TOKENS = 1024
+
+
+def estimate_text_tokens(text):
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def image_tokens(model_name, image_edge=DEFAULT_IMAGE_EDGE):
+    """Geschätzte Tokens pro Bild für den Vision-Encoder des Modells"""
+    name = (model_name or "").lower()
+    for keywords, cost in IMAGE_TOKEN_TABLE:
+        if any(keyword in name for keyword in keywords):
+            if isinstance(cost, tuple):
+                patch, limit = cost
+                return min(limit, math.ceil(image_edge / patch) ** 2)
+            return cost
+    return DEFAULT_IMAGE_TOKENS
+
+
+def round_to_bucket(tokens):
+    for bucket in CONTEXT_BUCKETS:
+        if tokens <= bucket:
+            return bucket
+    return CONTEXT_BUCKETS[-1]
+
+
+def estimate_context_length(model_name, system_prompt="", prompt="", max_tokens=500, images=1,
+                            image_edge=DEFAULT_IMAGE_EDGE):
+    """
+    Benötigte context_length (Bucket) für einen Request - gibt (Bucket, Token-Schätzung) zurück
+    """
+    needed = (TEMPLATE_OVERHEAD_TOKENS
+              + estimate_text_tokens(system_prompt)
+              + estimate_text_tokens(prompt)
+              + images * image_tokens(model_name, image_edge)
+              + max_tokens)
+    needed = math.ceil(needed * SAFETY_MARGIN)
+    return round_to_bucket(needed), needed
+
+
+def _context_from_entry(entry):
+    for key in ("contextLength", "context_length", "loadedContextLength", "maxContextLength"):
+        if isinstance(entry.get(key), int):
+            return entry[key]
+    return None
+
+
+def parse_loaded_models(output):
+    """
+    Ausgabe von 'lms ps --json' (oder der Text-Ausgabe älterer lms Versionen)
+    -> Liste von {"identifier", "path", "model_key", "context_length"}
+    """
+    try:
+        data = json.loads(output)
+    except ValueError:
+        data = None
+
+    if isinstance(data, list):
+        return [{
+            "identifier": entry.get("identifier") or entry.get("modelKey") or "",
+            "path": entry.get("path") or entry.get("modelKey") or "",
+            "model_key": entry.get("modelKey") or "",
+            "context_length": _context_from_entry(entry),
+        } for entry in data if isinstance(entry, dict)]
+
+    models = []
+    for line in output.splitlines():
+        line = line.strip().lstrip("•").strip()
+        if line.startswith("Identifier:"):
+            models.append({"identifier": line.split(":", 1)[1].strip(), "path": "", "model_key": "",
+                           "context_length": None})
+        elif models and line.startswith("Path:"):
+            models[-1]["path"] = line.split(":", 1)[1].strip()
+        elif models and re.match(r"context length:", line, re.IGNORECASE):
+            digits = re.sub(r"\D", "", line.split(":", 1)[1])
+            models[-1]["context_length"] = int(digits) if digits else None
+    return models
+
+
+def _model_key(value):
+    return (value or "").strip().strip("/").lower()
+
+
+def _matches(model_path, loaded):
+    """
+    Ganze Schlüssel vergleichen, keine Teilstrings - sonst passt "gemma-3-27b" auch auf
+    "gemma-3-27b-it-qat". Pfade dürfen sich nur um ganze Komponenten unterscheiden
+    ("publisher/repo" aus lms ls gegen "publisher/repo/datei.gguf" aus lms ps)
+    """
+    wanted = _model_key(model_path)
+    if not wanted:
+        return False
+    path = _model_key(loaded.get("path"))
+    if path and (path == wanted or path.startswith(wanted + "/") or wanted.startswith(path + "/")):
+        return True
+    name = wanted.split("/")[-1]
+    return name in (_model_key(loaded.get("identifier")), _model_key(loaded.get("model_key")))
+
+
+async def loaded_context_length(model_path):
+    """
+    context_length, mit der model_path gerade geladen ist - None, wenn nicht geladen
+    0, wenn geladen, aber lms die Kontextlänge nicht angibt
+    """
+    try:
+        result = await tracing.run_command_async(['lms', 'ps', '--json'], timeout=10)
+    except Exception as e:
+        log.debug("lms ps failed: %s", e)
+        return None
+    if result.returncode != 0:
+        return None
+    for loaded in parse_loaded_models(result.stdout):
+        if _matches(model_path, loaded):
+            return loaded["context_length"] or 0
+    return None
+
+
+def context_inputs():
+    """Gemeinsame optionale Inputs der Load-Nodes für context_mode="auto" """
+    return {
+        "context_mode": (CONTEXT_MODES, {
+            "default": "manual",
+            "tooltip": "auto: estimate the smallest sufficient context from the inputs below and reuse an "
+                       "already loaded model whose context is large enough; manual: use context_length"
+        }),
+        "system_prompt": ("STRING", {
+            "default": "",
+            "multiline": True,
+            "tooltip": "auto mode: system prompt of the following requests"
+        }),
+        "prompt": ("STRING", {
+            "default": "",
+            "multiline": True,
+            "tooltip": "auto mode: user prompt of the following requests"
+        }),
+        "max_tokens": ("INT", {
+            "default": 500,
+            "min": 1,
+            "max": 32768,
+            "tooltip": "auto mode: max_tokens of the following requests"
+        }),
+        "images_per_request": ("INT", {
+            "default": 1,
+            "min": 0,
+            "max": 16,
+            "tooltip": "auto mode: images sent with each request"
+        }),
+    }
+
+
+async def resolve_context_length(model_path, context_mode, context_length, system_prompt="", prompt="",
+                                 max_tokens=500, images_per_request=1):
+    """
+    Für die Load-Nodes: gibt (context_length, reuse) zurück
+    reuse=True heißt: Modell ist bereits mit ausreichendem Kontext geladen - nicht neu laden
+    (context_length ist dann die geladene)
+    """
+    if context_mode != "auto":
+        return context_length, False
+
+    bucket, needed = estimate_context_length(model_path, system_prompt, prompt, max_tokens, images_per_request)
+    loaded = await loaded_context_length(model_path)
+    log.info("Estimated context", extra=fields(model=model_path, tokens=needed, bucket=bucket,
+                                               loaded_context=loaded))
+    if loaded == 0:
+        # Geladen, aber lms nennt keine Kontextlänge - ob sie reicht, ist unbekannt: neu laden
+        log.debug("Loaded context length unknown - reloading %s", model_path)
+        return bucket, False
+    if loaded is not None and loaded >= needed:
+        return loaded, True
+    return bucket, False
+
+
+def reuse_status(context_length):
+    return f"Already loaded (context {context_length})"
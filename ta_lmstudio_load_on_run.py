@@ -1,12 +1,26 @@
 """
 TA LMStudio Load On Run Node - With Vision Model Marking
 Kennzeichnet Vision-Modelle mit (V) im Dropdown
+
+Die Ausführung ist async ('lms' als asyncio Subprozess, asyncio.sleep) -
+ComfyUI kann währenddessen andere Nodes ausführen und die UI bedienen.
 """
 
 import subprocess
 import time
 import re
 
+from .ta_lmstudio_cli import list_models_output
+from .ta_logging import get_logger, fields
+from . import ta_lmstudio_context as context
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+log = get_logger("LoadOnRun")
+
+METRICS_NODE = "TALMStudioLoadOnRun"
+
 
 class TALMStudioLoadOnRun:
     """
@@ -59,6 +73,7 @@ class TALMStudioLoadOnRun:
                     "tooltip": "Skip unload if it keeps failing"
                 }),
             },
+            "optional": context.context_inputs(),
         }
 
     RETURN_TYPES = ("STRING", "STRING")
@@ -112,18 +127,12 @@ class TALMStudioLoadOnRun:
         cls._model_paths = {}
         
         try:
-            result = subprocess.run(
-                ['lms', 'ls', '--detailed'],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                encoding='utf-8',
-                errors='replace'
-            )
+            # Gecachte Ausgabe von 'lms ls' - INPUT_TYPES blockiert nicht bei jedem Aufruf
+            stdout = list_models_output()
             
-            if result.returncode == 0:
+            if stdout is not None:
                 models = []
-                lines = result.stdout.split('\n')
+                lines = stdout.split('\n')
                 
                 for line in lines:
                     line = line.strip()
@@ -182,7 +191,7 @@ class TALMStudioLoadOnRun:
                 return cls.get_default_models()
                 
         except Exception as e:
-            print(f"[TA-LoadOnRun] Error listing models: {e}")
+            log.warning("Error listing models: %s", e)
             return cls.get_default_models()
     
     @classmethod
@@ -201,51 +210,46 @@ class TALMStudioLoadOnRun:
                 cls._model_paths[model] = model_path
         return defaults
 
-    def try_unload(self):
+    async def try_unload(self):
         """Versucht zu entladen, toleriert Fehler"""
-        print("[TA-LoadOnRun] Attempting to unload models...")
+        log.debug("Attempting to unload models...")
         
+        started = time.perf_counter()
         try:
-            result = subprocess.run(
-                ['lms', 'unload', '--all', '-y'],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                encoding='utf-8',
-                errors='replace'
-            )
+            result = await tracing.run_command_async(['lms', 'unload', '--all', '-y'], timeout=10)
+            metrics.LM_UNLOAD_SECONDS.observe(time.perf_counter() - started, node=METRICS_NODE)
             
             output = (result.stdout + result.stderr).lower()
             
             if 'no models to unload' in output or 'no models loaded' in output:
-                print(f"[TA-LoadOnRun] ✓ Already unloaded")
+                log.debug("Already unloaded")
+                metrics.LM_UNLOADS.inc(node=METRICS_NODE, result="noop")
+                metrics.clear_lmstudio_resident()
                 return True
             elif result.returncode == 0:
-                print(f"[TA-LoadOnRun] ✓ Unload successful")
-                time.sleep(2)
+                log.info("Unload successful")
+                metrics.LM_UNLOADS.inc(node=METRICS_NODE, result="ok")
+                metrics.clear_lmstudio_resident()
+                await tracing.sleep_async(2, "sleep after unload")
                 return True
             else:
-                print(f"[TA-LoadOnRun] ⚠ Unload returned code {result.returncode}")
+                log.warning("Unload returned code %d", result.returncode)
+                metrics.LM_UNLOADS.inc(node=METRICS_NODE, result="error")
                 return False
                 
         except subprocess.TimeoutExpired:
-            print(f"[TA-LoadOnRun] ⚠ Unload timeout - continuing anyway")
+            log.warning("Unload timeout - continuing anyway")
+            metrics.LM_UNLOADS.inc(node=METRICS_NODE, result="timeout")
             return False
         except Exception as e:
-            print(f"[TA-LoadOnRun] ⚠ Unload error: {e} - continuing anyway")
+            log.warning("Unload error: %s - continuing anyway", e)
+            metrics.LM_UNLOADS.inc(node=METRICS_NODE, result="error")
             return False
 
-    def is_model_loaded(self, model_name):
+    async def is_model_loaded(self, model_name):
         """Prüft ob Modell geladen ist"""
         try:
-            result = subprocess.run(
-                ['lms', 'ps'],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                encoding='utf-8',
-                errors='replace'
-            )
+            result = await tracing.run_command_async(['lms', 'ps'], timeout=5)
             
             if result.returncode == 0:
                 output = result.stdout
@@ -263,48 +267,45 @@ class TALMStudioLoadOnRun:
                 
                 return False
             return False
-        except:
+        except Exception:
             return False
 
-    def wait_for_model_ready(self, model_name, max_wait=20):
+    async def wait_for_model_ready(self, model_name, max_wait=20):
         """Wartet bis Modell bereit ist"""
-        print(f"[TA-LoadOnRun] Verifying model is ready...")
+        log.debug("Verifying model is ready...")
         
         for i in range(max_wait):
-            if self.is_model_loaded(model_name):
-                print(f"[TA-LoadOnRun] ✓ Model verified after {i+1}s")
+            if await self.is_model_loaded(model_name):
+                log.debug("Model verified after %ds", i + 1)
                 return True
             
             if i == 0 or (i+1) % 5 == 0:
-                print(f"[TA-LoadOnRun]   Checking... ({i+1}/{max_wait}s)")
+                log.debug("Checking... (%d/%ds)", i + 1, max_wait)
             
-            time.sleep(1)
+            await tracing.sleep_async(1, "sleep before lms ps retry")
         
-        print(f"[TA-LoadOnRun] ⚠ Could not verify model after {max_wait}s")
+        log.warning("Could not verify model after %ds", max_wait)
         return False
 
-    def load_model(self, display_name, context_length, wait_time, skip_unload):
+    async def load_model(self, display_name, context_length, wait_time, skip_unload):
         """Lädt das Modell"""
         # Entferne (V) für den tatsächlichen Load-Befehl
         clean_name = display_name.replace(" (V)", "")
         full_path = self._model_paths.get(display_name, clean_name)
         
-        print(f"[TA-LoadOnRun] === LOADING MODEL ===")
-        print(f"[TA-LoadOnRun] Display: {display_name}")
-        print(f"[TA-LoadOnRun] Path: {full_path}")
-        print(f"[TA-LoadOnRun] Wait time: {wait_time}s")
+        log.info("Loading model", extra=fields(display=display_name, path=full_path, wait_time=wait_time))
         
         try:
             # Versuche zu entladen (optional)
             if not skip_unload:
-                unload_ok = self.try_unload()
+                unload_ok = await self.try_unload()
                 if unload_ok:
-                    time.sleep(2)
+                    await tracing.sleep_async(2, "sleep after unload")
                 else:
-                    print(f"[TA-LoadOnRun] Continuing despite unload issues...")
-                    time.sleep(1)
+                    log.debug("Continuing despite unload issues...")
+                    await tracing.sleep_async(1, "sleep after failed unload")
             else:
-                print(f"[TA-LoadOnRun] Skipping unload (skip_unload=True)")
+                log.debug("Skipping unload (skip_unload=True)")
             
             # Lade Modell
             load_cmd = [
@@ -313,62 +314,53 @@ class TALMStudioLoadOnRun:
                 '--gpu=1'
             ]
             
-            print(f"[TA-LoadOnRun] Loading: {' '.join(load_cmd)}")
+            log.debug("Loading: %s", ' '.join(load_cmd))
             
-            result = subprocess.run(
-                load_cmd,
-                capture_output=True,
-                text=True,
-                timeout=120,
-                encoding='utf-8',
-                errors='replace'
-            )
+            started = time.perf_counter()
+            result = await tracing.run_command_async(load_cmd, timeout=120)
             
-            print(f"[TA-LoadOnRun] Return code: {result.returncode}")
+            log.debug("Return code: %d", result.returncode)
+            metrics.LM_LOAD_SECONDS.observe(time.perf_counter() - started, node=METRICS_NODE)
             
             if result.returncode == 0:
-                print(f"[TA-LoadOnRun] ✓ Load command completed")
-                
-                # Warnung bei zu kurzem wait_time
-                if wait_time < 3:
-                    print(f"[TA-LoadOnRun] ⚠ WARNING: wait_time={wait_time}s is too short!")
-                    print(f"[TA-LoadOnRun] ⚠ Recommended: 8-10s for reliable loading")
+                log.debug("Load command completed")
+                metrics.LM_LOADS.inc(node=METRICS_NODE, result="ok")
+                metrics.set_lmstudio_resident(full_path)
                 
-                print(f"[TA-LoadOnRun] Waiting {wait_time}s for initialization...")
-                time.sleep(wait_time)
+                log.debug("Waiting %ds for initialization...", wait_time)
+                await tracing.sleep_async(wait_time, "sleep wait_time")
                 
                 # Verifiziere
-                if self.wait_for_model_ready(display_name, max_wait=15):
-                    print(f"[TA-LoadOnRun] ✓✓✓ MODEL READY! ✓✓✓")
+                if await self.wait_for_model_ready(display_name, max_wait=15):
+                    metrics.LM_TIME_TO_READY.observe(time.perf_counter() - started, node=METRICS_NODE)
+                    log.info("Model ready", extra=fields(model=display_name))
                     return True, "Loaded and ready"
                 else:
-                    print(f"[TA-LoadOnRun] ⚠ Load completed but verification failed")
-                    print(f"[TA-LoadOnRun] ⚠ Model might still work, trying anyway...")
+                    log.warning("Load completed but verification failed - trying anyway", extra=fields(model=display_name))
                     return True, "Loaded (not verified)"
             else:
-                print(f"[TA-LoadOnRun] ✗ Load failed with code {result.returncode}")
+                log.error("Load failed with code %d", result.returncode)
+                metrics.LM_LOADS.inc(node=METRICS_NODE, result="error")
                 if result.stderr:
-                    print(f"[TA-LoadOnRun] Error: {result.stderr[:300]}")
+                    log.error("Error: %s", result.stderr[:300])
                 return False, f"Load failed (code {result.returncode})"
                 
         except subprocess.TimeoutExpired:
-            print("[TA-LoadOnRun] ✗ Load timeout (>120s)")
+            log.error("Load timeout (>120s)")
+            metrics.LM_LOADS.inc(node=METRICS_NODE, result="timeout")
             return False, "Timeout"
         except Exception as e:
-            print(f"[TA-LoadOnRun] ✗ Error: {e}")
+            log.error("Error: %s", e)
             return False, f"Error: {str(e)}"
 
-    def load_and_return(self, model, context_length, wait_time, skip_unload):
+    @profile_node
+    async def load_and_return(self, model, context_length, wait_time, skip_unload, context_mode="manual",
+                              system_prompt="", prompt="", max_tokens=500, images_per_request=1):
         """Wird beim RUN ausgeführt"""
         
         # Warnung bei zu kurzem wait_time
         if wait_time < 3:
-            print(f"\n{'!'*60}")
-            print(f"[TA-LoadOnRun] ⚠⚠⚠ WARNING ⚠⚠⚠")
-            print(f"[TA-LoadOnRun] wait_time={wait_time}s is TOO SHORT!")
-            print(f"[TA-LoadOnRun] This may cause 'Model not loaded' errors!")
-            print(f"[TA-LoadOnRun] RECOMMENDED: Set wait_time to 8-10s")
-            print(f"{'!'*60}\n")
+            log.warning("wait_time=%ds is too short and may cause 'Model not loaded' errors - 8-10s recommended", wait_time)
         
         # API-Name (entferne (V))
         clean_model = model.replace(" (V)", "")
@@ -377,20 +369,24 @@ class TALMStudioLoadOnRun:
         else:
             api_name = clean_model
         
-        print(f"\n{'='*60}")
-        print(f"[TA-LoadOnRun] ===== WORKFLOW EXECUTION =====")
-        print(f"[TA-LoadOnRun] Model: {model}")
-        print(f"[TA-LoadOnRun] Wait time: {wait_time}s")
-        print(f"[TA-LoadOnRun] Skip unload: {skip_unload}")
-        print(f"{'='*60}\n")
+        log.debug("Workflow execution", extra=fields(model=model, wait_time=wait_time, skip_unload=skip_unload))
+        
+        # auto: kleinsten passenden Kontext wählen, geladenes Modell mit genug Kontext weiterverwenden
+        full_path = self._model_paths.get(model, clean_model)
+        context_length, reuse = await context.resolve_context_length(
+            full_path, context_mode, context_length, system_prompt, prompt, max_tokens, images_per_request
+        )
+        if reuse:
+            log.info("Model already loaded with sufficient context", extra=fields(model=model, context=context_length))
+            return (api_name, context.reuse_status(context_length))
         
         # Lade Modell
-        success, status = self.load_model(model, context_length, wait_time, skip_unload)
+        success, status = await self.load_model(model, context_length, wait_time, skip_unload)
         
         if success:
-            print(f"\n[TA-LoadOnRun] ✓ READY FOR VISION NODE\n")
+            log.debug("Ready for vision node")
         else:
-            print(f"\n[TA-LoadOnRun] ✗ LOAD FAILED\n")
+            log.error("Load failed", extra=fields(model=model, status=status))
         
         return (api_name, status)
 
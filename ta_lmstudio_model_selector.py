@@ -3,7 +3,12 @@ TA LMStudio Model Selector Node
 Zeigt verfügbare LM Studio Modelle in einem Dropdown zur Auswahl
 """
 
-import subprocess
+from .ta_logging import get_logger
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+log = get_logger("ModelSelector")
+loaded_log = get_logger("LoadedModels")
 
 
 class TALMStudioModelSelector:
@@ -40,7 +45,7 @@ class TALMStudioModelSelector:
         Holt Liste aller verfügbaren LM Studio Modelle
         """
         try:
-            result = subprocess.run(
+            result = tracing.run_command(
                 ['lms', 'ls', '--detailed'],
                 capture_output=True,
                 text=True,
@@ -57,20 +62,20 @@ class TALMStudioModelSelector:
                         models.append(model_name)
                 
                 if models:
-                    print(f"[TA-ModelSelector] Found {len(models)} models")
+                    log.debug("Found %d models", len(models))
                     return models
                 else:
-                    print("[TA-ModelSelector] No models found, using defaults")
+                    log.warning("No models found, using defaults")
                     return cls.get_default_models()
             else:
-                print("[TA-ModelSelector] lms command failed, using defaults")
+                log.warning("lms command failed, using defaults")
                 return cls.get_default_models()
                 
         except FileNotFoundError:
-            print("[TA-ModelSelector] lms CLI not found, using defaults")
+            log.warning("lms CLI not found, using defaults")
             return cls.get_default_models()
         except Exception as e:
-            print(f"[TA-ModelSelector] Error: {e}, using defaults")
+            log.warning("Error: %s, using defaults", e)
             return cls.get_default_models()
     
     @classmethod
@@ -92,8 +97,9 @@ class TALMStudioModelSelector:
             return float("nan")
         return model
 
+    @profile_node
     def select_model(self, model, refresh=False):
-        print(f"[TA-ModelSelector] Selected model: {model}")
+        log.debug("Selected model: %s", model)
         return (model,)
 
 
@@ -130,7 +136,7 @@ class TALMStudioLoadedModels:
         Holt Liste der AKTUELL GELADENEN Modelle
         """
         try:
-            result = subprocess.run(
+            result = tracing.run_command(
                 ['lms', 'ps'],
                 capture_output=True,
                 text=True,
@@ -152,7 +158,7 @@ class TALMStudioLoadedModels:
                         models.append(model_name)
                 
                 if models:
-                    print(f"[TA-LoadedModels] Currently loaded: {', '.join(models)}")
+                    loaded_log.debug("Currently loaded: %s", ', '.join(models))
                     return models
                 else:
                     return ["no-model-loaded"]
@@ -160,7 +166,7 @@ class TALMStudioLoadedModels:
                 return ["lms-error"]
                 
         except Exception as e:
-            print(f"[TA-LoadedModels] Error: {e}")
+            loaded_log.warning("Error: %s", e)
             return ["error-checking-models"]
 
     @classmethod
@@ -169,11 +175,12 @@ class TALMStudioLoadedModels:
             return float("nan")
         return model
 
+    @profile_node
     def select_model(self, model, refresh=False):
         if model == "no-model-loaded":
-            print("[TA-LoadedModels] WARNING: No model is currently loaded in LM Studio!")
+            loaded_log.warning("No model is currently loaded in LM Studio!")
         else:
-            print(f"[TA-LoadedModels] Using loaded model: {model}")
+            loaded_log.debug("Using loaded model: %s", model)
         return (model,)
 
 
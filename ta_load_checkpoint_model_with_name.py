@@ -1,7 +1,46 @@
-import folder_paths
-import comfy.sd
 import os
-import torch
+import time
+
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_model_prefetch import prefetch_file, cancel_prefetch
+from .ta_model_inspector import check_model_header
+from .ta_profiling import profile_node
+
+# State-Dict Präfixe der Text-Encoder und des VAE in Checkpoints
+CLIP_PREFIXES = ("cond_stage_model.", "conditioner.", "text_encoders.")
+VAE_PREFIXES = ("first_stage_model.",)
+SAFETENSORS_EXTENSIONS = (".safetensors", ".sft")
+
+
+def skipped_prefixes(load_clip, load_vae):
+    prefixes = ()
+    if not load_clip:
+        prefixes += CLIP_PREFIXES
+    if not load_vae:
+        prefixes += VAE_PREFIXES
+    return prefixes
+
+
+def read_state_dict(path, skip_prefixes):
+    """
+    Liest eine .safetensors Datei ohne die Tensoren unter skip_prefixes
+    Gibt (state_dict, metadata, gelesene Bytes) zurück
+    """
+    from safetensors import safe_open
+    
+    sd = {}
+    bytes_read = 0
+    with safe_open(path, framework="pt", device="cpu") as f:
+        metadata = f.metadata()
+        for key in f.keys():
+            if key.startswith(skip_prefixes):
+                continue
+            tensor = f.get_tensor(key)
+            bytes_read += tensor.numel() * tensor.element_size()
+            sd[key] = tensor
+    return sd, metadata, bytes_read
+
 
 class TALoadCheckpointModelWithName:
     """
@@ -11,9 +50,24 @@ class TALoadCheckpointModelWithName:
     
     @classmethod
     def INPUT_TYPES(cls):
+        import folder_paths
         return {
             "required": {
                 "ckpt_name": (folder_paths.get_filename_list("checkpoints"),),
+            },
+            "optional": {
+                "load_clip": ("BOOLEAN", {
+                    "default": True,
+                    "label_on": "Load CLIP",
+                    "label_off": "Skip CLIP",
+                    "tooltip": "Disable when an external text encoder is used - the CLIP model is not built and, for .safetensors checkpoints, its weights are not read"
+                }),
+                "load_vae": ("BOOLEAN", {
+                    "default": True,
+                    "label_on": "Load VAE",
+                    "label_off": "Skip VAE",
+                    "tooltip": "Disable when an external VAE is used - the VAE is not built and, for .safetensors checkpoints, its weights are not read"
+                }),
             }
         }
     
@@ -22,24 +76,70 @@ class TALoadCheckpointModelWithName:
     FUNCTION = "load_checkpoint"
     CATEGORY = "TA Nodes/loaders"
     
-    def load_checkpoint(self, ckpt_name):
+    @classmethod
+    def VALIDATE_INPUTS(cls, ckpt_name):
+        # Wird beim Queuen des Prompts aufgerufen - startet den Prefetch in den Page-Cache
+        import folder_paths
+        if ckpt_name not in folder_paths.get_filename_list("checkpoints"):
+            return f"Checkpoint not found: {ckpt_name}"
+        path = folder_paths.get_full_path("checkpoints", ckpt_name)
+        header_error = check_model_header(path)
+        if header_error:
+            return header_error
+        prefetch_file(path)
+        return True
+    
+    @profile_node
+    def load_checkpoint(self, ckpt_name, load_clip=True, load_vae=True):
+        # torch/comfy erst beim Laden importieren - hält den Import des Packs schlank
+        import comfy.sd
+        import folder_paths
+        import torch
+        
+        started = time.perf_counter()
+        
         # Lade das Checkpoint
         ckpt_path = folder_paths.get_full_path("checkpoints", ckpt_name)
+        cancel_prefetch(ckpt_path)
         
         # PyTorch 2.8+ kompatibles Laden mit Kontext-Manager
-        with torch.inference_mode():
-            out = comfy.sd.load_checkpoint_guess_config(
-                ckpt_path,
-                output_vae=True,
-                output_clip=True,
-                embedding_directory=folder_paths.get_folder_paths("embeddings")
-            )
+        # Nicht benötigte Komponenten (CLIP/VAE) werden gar nicht erst erzeugt. Bei .safetensors
+        # werden ihre Tensoren auch nicht gelesen - andere Formate lädt comfy nur als Ganzes
+        skip = skipped_prefixes(load_clip, load_vae)
+        bytes_read = None
+        if skip and ckpt_path.lower().endswith(SAFETENSORS_EXTENSIONS):
+            with torch.inference_mode():
+                with tracing.span("read state dict", cat="io", file=ckpt_name, clip=load_clip, vae=load_vae):
+                    sd, metadata, bytes_read = read_state_dict(ckpt_path, skip)
+                with tracing.span("comfy.sd.load_state_dict_guess_config", cat="compute", file=ckpt_name):
+                    out = comfy.sd.load_state_dict_guess_config(
+                        sd,
+                        output_vae=load_vae,
+                        output_clip=load_clip,
+                        embedding_directory=folder_paths.get_folder_paths("embeddings"),
+                        metadata=metadata
+                    )
+            del sd
+            if out is None:
+                raise RuntimeError(f"Could not detect model type of: {ckpt_path}")
+        else:
+            with torch.inference_mode(), tracing.span("comfy.sd.load_checkpoint_guess_config", cat="io",
+                                                      file=ckpt_name, clip=load_clip, vae=load_vae):
+                out = comfy.sd.load_checkpoint_guess_config(
+                    ckpt_path,
+                    output_vae=load_vae,
+                    output_clip=load_clip,
+                    embedding_directory=folder_paths.get_folder_paths("embeddings")
+                )
         
-        # Extrahiere Model, CLIP und VAE
+        # Extrahiere Model, CLIP und VAE (None wenn deaktiviert)
         model = out[0]
         clip = out[1]
         vae = out[2]
         
+        metrics.record_model_load("TALoadCheckpointModelWithName", ckpt_path, time.perf_counter() - started,
+                                  bytes_read)
+        
         # Extrahiere nur den Dateinamen ohne Pfad und Erweiterung
         model_name_only = os.path.splitext(os.path.basename(ckpt_name))[0]
         
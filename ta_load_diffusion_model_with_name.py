@@ -1,7 +1,29 @@
-import folder_paths
-import comfy.sd
 import os
-import torch
+import time
+
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_model_prefetch import prefetch_file, cancel_prefetch
+from .ta_model_inspector import ModelHeaderError, check_model_header, inspect_model
+from .ta_logging import get_logger, fields
+from .ta_profiling import profile_node
+
+log = get_logger("Loader")
+
+MB = 1024 * 1024
+# Gespeicherte Dtypes, die schon so klein sind wie fp8 - kein zusätzlicher Cast-Puffer
+ONE_BYTE_DTYPES = ("F8_E4M3", "F8_E5M2", "I8", "U8")
+
+
+def estimate_default_peak(info, weight_dtype):
+    """
+    Peak des normalen comfy-Ladewegs aus dem Header: voller State Dict
+    plus (bei fp8 weight_dtype) die gecastete Kopie mit 1 Byte pro Parameter
+    """
+    peak = info["data_bytes"]
+    if weight_dtype != "default" and info["dtype"] not in ONE_BYTE_DTYPES:
+        peak += info["parameters"]
+    return peak
 
 class TALoadDiffusionModelWithName:
     """
@@ -11,10 +33,24 @@ class TALoadDiffusionModelWithName:
     
     @classmethod
     def INPUT_TYPES(cls):
+        import folder_paths
         return {
             "required": {
                 "unet_name": (folder_paths.get_filename_list("diffusion_models"),),
                 "weight_dtype": (["default", "fp8_e4m3fn", "fp8_e5m2"], {"default": "default"}),
+            },
+            "optional": {
+                "load_mode": (["default", "streaming"], {
+                    "default": "default",
+                    "tooltip": "streaming: read, cast and place tensors one at a time (safetensors only) - the full-precision state dict never sits in RAM"
+                }),
+                "peak_memory_limit_mb": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 1048576,
+                    "step": 1024,
+                    "tooltip": "Streaming: abort before/while loading if the peak would exceed this many MB. Default: switch to streaming when the header-based estimate exceeds it (0 = no limit)"
+                }),
             }
         }
     
@@ -23,9 +59,32 @@ class TALoadDiffusionModelWithName:
     FUNCTION = "load_unet"
     CATEGORY = "TA Nodes/loaders"
     
-    def load_unet(self, unet_name, weight_dtype):
+    @classmethod
+    def VALIDATE_INPUTS(cls, unet_name):
+        # Wird beim Queuen des Prompts aufgerufen - startet den Prefetch in den Page-Cache
+        import folder_paths
+        if unet_name not in folder_paths.get_filename_list("diffusion_models"):
+            return f"Diffusion model not found: {unet_name}"
+        path = folder_paths.get_full_path("diffusion_models", unet_name)
+        header_error = check_model_header(path)
+        if header_error:
+            return header_error
+        prefetch_file(path)
+        return True
+    
+    @profile_node
+    def load_unet(self, unet_name, weight_dtype, load_mode="default", peak_memory_limit_mb=0):
+        # torch/comfy erst beim Laden importieren - hält den Import des Packs schlank
+        import comfy.sd
+        import folder_paths
+        import torch
+        
+        started = time.perf_counter()
+        bytes_read = None
+        
         # Lade das Diffusion Model (UNet)
         unet_path = folder_paths.get_full_path("diffusion_models", unet_name)
+        cancel_prefetch(unet_path)
         
         # Bestimme die model_options basierend auf weight_dtype
         model_options = {}
@@ -35,18 +94,86 @@ class TALoadDiffusionModelWithName:
             model_options["weight_dtype"] = torch.float8_e5m2
         # "default" bedeutet keine speziellen Optionen
         
+        is_safetensors = unet_path.lower().endswith((".safetensors", ".sft"))
+        if load_mode == "default" and peak_memory_limit_mb and is_safetensors:
+            load_mode = self.choose_load_mode(unet_path, weight_dtype, peak_memory_limit_mb)
+        
+        if load_mode == "streaming" and not is_safetensors:
+            log.warning("Streaming requires safetensors, using default load for %s", unet_name)
+            load_mode = "default"
+        
         # PyTorch 2.8+ kompatibles Laden mit Kontext-Manager
-        with torch.inference_mode():
-            if model_options:
+        with torch.inference_mode(), tracing.span("load diffusion model", cat="io", file=unet_name, mode=load_mode):
+            if load_mode == "streaming":
+                model, bytes_read = self.load_streaming(unet_path, model_options, peak_memory_limit_mb)
+            elif model_options:
                 model = comfy.sd.load_diffusion_model(unet_path, model_options=model_options)
             else:
                 model = comfy.sd.load_diffusion_model(unet_path)
         
+        metrics.record_model_load("TALoadDiffusionModelWithName", unet_path, time.perf_counter() - started, bytes_read)
+        
         # Extrahiere nur den Dateinamen ohne Pfad und Erweiterung
         model_name_only = os.path.splitext(os.path.basename(unet_name))[0]
         
         # Gebe Model und bereinigten Namen zurück
         return (model, model_name_only)
+    
+    def choose_load_mode(self, unet_path, weight_dtype, peak_memory_limit_mb):
+        """
+        Schätzt den Peak des normalen Ladens aus dem (gecachten) Header, bevor
+        etwas gelesen wird - liegt er über dem Limit, wird gestreamt
+        """
+        try:
+            info = inspect_model(unet_path)
+        except (ModelHeaderError, OSError) as e:
+            log.debug("No header estimate for %s: %s", unet_path, e)
+            return "default"
+        
+        estimated = estimate_default_peak(info, weight_dtype)
+        if estimated <= peak_memory_limit_mb * MB:
+            return "default"
+        log.info("Default load would exceed the peak memory limit - streaming instead", extra=fields(
+            estimated_peak_mb=round(estimated / MB), limit_mb=peak_memory_limit_mb, dtype=info["dtype"],
+        ))
+        return "streaming"
+    
+    def load_streaming(self, unet_path, model_options, peak_memory_limit_mb):
+        """
+        Liest, castet und platziert Tensor für Tensor - Peak = gecasteter State Dict + Modell
+        statt vollem fp16 State Dict + fp8 Kopie
+        Gibt (model, gelesene Bytes) zurück
+        """
+        import comfy.sd
+        from .ta_streaming_loader import stream_load_state_dict, reset_peak_rss, read_peak_rss
+        
+        peak_tracked = reset_peak_rss()
+        
+        sd, stats = stream_load_state_dict(
+            unet_path,
+            weight_dtype=model_options.get("weight_dtype"),
+            peak_limit_mb=peak_memory_limit_mb
+        )
+        with tracing.span("comfy.sd.load_diffusion_model_state_dict", cat="compute"):
+            model = comfy.sd.load_diffusion_model_state_dict(sd, model_options=model_options)
+        del sd
+        
+        if model is None:
+            raise RuntimeError(f"Could not detect model type of {unet_path}")
+        
+        streaming_peak = stats["observed_peak_bytes"]
+        process_peak = read_peak_rss() if peak_tracked else None
+        log.info("Streaming load finished", extra=fields(
+            tensors=stats["tensors"],
+            casted=stats["casted"],
+            read_mb=round(stats["bytes_read"] / 1024 ** 2),
+            seconds=round(stats["seconds"], 1),
+            streaming_peak_mb=round((streaming_peak or 0) / 1024 ** 2),
+            process_peak_mb=round(process_peak / 1024 ** 2) if process_peak else None,
+            estimated_peak_mb=round(stats["estimated_peak_bytes"] / 1024 ** 2),
+            limit_mb=peak_memory_limit_mb or None,
+        ))
+        return model, stats["bytes_read"]
 
 
 NODE_CLASS_MAPPINGS = {
@@ -1,12 +1,17 @@
-import folder_paths
-import comfy.sd
 import os
 import logging
 import sys
 import traceback
 import io
+import time
 from contextlib import redirect_stderr, redirect_stdout
 
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_model_prefetch import prefetch_file, cancel_prefetch
+from .ta_model_inspector import check_model_header
+from .ta_profiling import profile_node
+
 class TALoadGGUFModelWithName:
     """
     Lädt ein GGUF-Modell und gibt zusätzlich den Modellnamen aus
@@ -15,6 +20,8 @@ class TALoadGGUFModelWithName:
     
     @classmethod
     def INPUT_TYPES(cls):
+        import folder_paths
+        
         # Suche GGUF-Dateien in verschiedenen Verzeichnissen
         unet_names = []
         
@@ -52,21 +59,51 @@ class TALoadGGUFModelWithName:
     CATEGORY = "TA Nodes/loaders"
     TITLE = "TA Load GGUF Model (with Name)"
     
-    def load_unet(self, unet_name):
+    @staticmethod
+    def find_unet_path(unet_name):
+        import folder_paths
+        
         # Versuche die Datei in verschiedenen Verzeichnissen zu finden
-        unet_path = None
         for folder_type in ["unet_gguf", "unet", "diffusion_models"]:
             try:
                 potential_path = folder_paths.get_full_path(folder_type, unet_name)
                 if potential_path and os.path.exists(potential_path):
-                    unet_path = potential_path
-                    break
+                    return potential_path
             except:
                 continue
+        return None
+    
+    @classmethod
+    def VALIDATE_INPUTS(cls, unet_name):
+        # Wird beim Queuen des Prompts aufgerufen - startet den Prefetch in den Page-Cache
+        unet_path = cls.find_unet_path(unet_name)
+        if unet_path is None:
+            return f"Could not find {unet_name} in any model directory"
+        header_error = check_model_header(unet_path)
+        if header_error:
+            return header_error
+        prefetch_file(unet_path)
+        return True
+    
+    @profile_node
+    def load_unet(self, unet_name):
+        # comfy erst beim Laden importieren - hält den Import des Packs schlank
+        import comfy.sd
+        import folder_paths
+        
+        started = time.perf_counter()
+        unet_path = self.find_unet_path(unet_name)
         
         if unet_path is None:
             raise FileNotFoundError(f"Could not find {unet_name} in any model directory")
         
+        cancel_prefetch(unet_path)
+        
+        # Header prüfen, bevor die drei Lade-Methoden mehrere GB lesen
+        header_error = check_model_header(unet_path)
+        if header_error:
+            raise RuntimeError(f"Could not load GGUF model: {unet_name}\n\n{header_error}")
+        
         gguf_node_path = os.path.join(folder_paths.base_path, "custom_nodes", "ComfyUI-GGUF")
         model = None
         
@@ -76,7 +113,8 @@ class TALoadGGUFModelWithName:
                 sys.path.insert(0, gguf_node_path)
             
             # Unterdrücke alle Ausgaben während des Imports
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), \
+                    tracing.span("gguf load via ComfyUI-GGUF nodes.py", cat="io", file=unet_name):
                 try:
                     from nodes import UnetLoaderGGUF
                     loader = UnetLoaderGGUF()
@@ -101,7 +139,8 @@ class TALoadGGUFModelWithName:
         # Methode 2: Verwende die registrierte Node (ohne Ausgaben)
         if model is None:
             try:
-                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), \
+                        tracing.span("gguf load via registered UnetLoaderGGUF", cat="io", file=unet_name):
                     from nodes import NODE_CLASS_MAPPINGS
                     
                     if "UnetLoaderGGUF" in NODE_CLASS_MAPPINGS:
@@ -115,7 +154,8 @@ class TALoadGGUFModelWithName:
         # Methode 3: Versuche die GGUF-spezifischen Module zu importieren (ohne Ausgaben)
         if model is None:
             try:
-                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()), \
+                        tracing.span("gguf load via gguf_sd_loader", cat="io", file=unet_name):
                     sys.path.insert(0, gguf_node_path)
                     
                     from gguf import GGUFReader
@@ -142,6 +182,8 @@ class TALoadGGUFModelWithName:
             )
             raise RuntimeError(error_msg)
         
+        metrics.record_model_load("TALoadGGUFModelWithName", unet_path, time.perf_counter() - started)
+        
         # Extrahiere nur den Dateinamen ohne Pfad und Erweiterung
         model_name_only = os.path.splitext(os.path.basename(unet_name))[0]
         
@@ -0,0 +1,179 @@
+"""
+TA Logging - Gemeinsamer, gepufferter Logger für alle TA Nodes
+Teil des ComfyUI-TA-Nodes-Pack
+
+Jede Node holt sich mit get_logger("Vision") einen Logger "ta_nodes.vision".
+Ausgaben laufen über eine Queue an einen Hintergrund-Thread - der Node-Thread
+wartet nie auf die Konsole. Wiederholte Meldungen werden gedrosselt.
+
+Umgebungsvariablen:
+    TA_NODES_LOG_LEVEL=WARNING                      Level für alle TA Nodes
+    TA_NODES_LOG_LEVELS=vision=DEBUG,loadonrun=INFO Level pro Node (überschreibt das obige)
+    TA_NODES_LOG_FORMAT=text                        text oder json (eine JSON-Zeile pro Meldung)
+    TA_NODES_LOG_RATE=5                             gleiche Meldung max. N mal pro Zeitfenster (0 = aus)
+    TA_NODES_LOG_RATE_WINDOW=60                     Zeitfenster in Sekunden
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+
+ROOT_LOGGER = "ta_nodes"
+
+_prefixes = {}
+_configured = False
+_configure_lock = threading.Lock()
+_listener = None
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _parse_level(value, default=logging.WARNING):
+    value = (value or "").strip().upper()
+    if value.isdigit():
+        return int(value)
+    # getLevelName liefert für bekannte Namen die Zahl, sonst "Level X"
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else default
+
+
+def fields(**values):
+    """Strukturierte Felder für einen Log-Aufruf: log.info("Loaded", extra=fields(model=name))"""
+    return {"fields": values}
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lässt dieselbe Meldung (Logger + Format-String) höchstens `limit` mal
+    pro Zeitfenster durch; die Anzahl unterdrückter Meldungen wird an der
+    nächsten durchgelassenen Meldung vermerkt
+    """
+
+    def __init__(self, limit, window):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._seen.get(key, (now, 0, 0))
+            if now - started > self.window:
+                started, count = now, 0
+            if count >= self.limit:
+                self._seen[key] = (started, count, suppressed + 1)
+                return False
+            self._seen[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """[TA-Vision] Nachricht key=value ... - wie die bisherigen print() Ausgaben"""
+
+    def format(self, record):
+        line = f"[TA-{_prefixes.get(record.name, record.name)}] {record.getMessage()}"
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            line += f" (+{suppressed} similar suppressed)"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Meldung - für Log-Shipping auf Servern"""
+
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "node": _prefixes.get(record.name, record.name),
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+def _configure():
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(_parse_level(os.environ.get("TA_NODES_LOG_LEVEL"), logging.WARNING))
+        # Nicht zusätzlich über den Root-Logger von ComfyUI ausgeben
+        root.propagate = False
+
+        for entry in os.environ.get("TA_NODES_LOG_LEVELS", "").split(","):
+            tag, _, level = entry.partition("=")
+            if tag.strip() and level.strip():
+                logging.getLogger(f"{ROOT_LOGGER}.{tag.strip().lower()}").setLevel(_parse_level(level))
+
+        if os.environ.get("TA_NODES_LOG_FORMAT", "text").lower() == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = TextFormatter()
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(
+            _env_int("TA_NODES_LOG_RATE", 5), _env_int("TA_NODES_LOG_RATE_WINDOW", 60)
+        ))
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        # Gepufferte Meldungen beim Beenden noch ausgeben
+        atexit.register(_listener.stop)
+        _configured = True
+
+
+def get_logger(tag):
+    """
+    Logger für eine Node bzw. ein Modul - tag erscheint als [TA-<tag>] Präfix
+    und (klein geschrieben) als Name für TA_NODES_LOG_LEVELS
+    """
+    _configure()
+    name = f"{ROOT_LOGGER}.{tag.lower()}"
+    _prefixes[name] = tag
+    return logging.getLogger(name)
+
+
+def set_level(tag, level):
+    """Ändert das Level einer Node zur Laufzeit (tag=None: alle TA Nodes)"""
+    _configure()
+    name = ROOT_LOGGER if tag is None else f"{ROOT_LOGGER}.{tag.lower()}"
+    logging.getLogger(name).setLevel(_parse_level(level) if isinstance(level, str) else level)
@@ -0,0 +1,300 @@
+"""
+TA Metrics - Performance-Zähler der TA Nodes im Prometheus Text-Format
+Teil des ComfyUI-TA-Nodes-Pack
+
+Die Nodes zählen Lade-/Entladevorgänge, Latenzen, Cache-Treffer usw. in
+Counter/Gauge/Histogram. ComfyUI liefert sie unter GET /ta_nodes/metrics aus
+(Route am PromptServer) - zum Scrapen zusammen mit den GPU-Metriken.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from .ta_logging import get_logger
+
+log = get_logger("Metrics")
+
+METRICS_ROUTE = "/ta_nodes/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Sekunden - von HTTP-Requests bis zum Laden großer Modelle
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def add_callback(self, callback):
+        """
+        callback() liefert beim Scrapen zusätzliche (labels_dict, value) Paare -
+        für Werte, die woanders gezählt werden (z.B. functools.lru_cache)
+        """
+        self._callbacks.append(callback)
+
+    def _samples(self):
+        with self._lock:
+            samples = list(self._values.items())
+        for callback in self._callbacks:
+            try:
+                for labels, value in callback():
+                    samples.append((self._key(labels), value))
+            except Exception as e:
+                log.debug("Metric callback for %s failed: %s", self.name, e)
+        return samples
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def remove(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self, **match):
+        """Entfernt alle Serien, deren Labels zu match passen (ohne match: alle)"""
+        indexes = [(self.labelnames.index(name), str(value)) for name, value in match.items()]
+        with self._lock:
+            for key in list(self._values):
+                if all(key[i] == value for i, value in indexes):
+                    del self._values[key]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in samples:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(labels + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ---------------------------------------------------------------------------
+# Metriken der TA Nodes
+# ---------------------------------------------------------------------------
+
+LM_LOADS = counter("ta_lm_model_loads_total", "LM Studio model loads", ["node", "result"])
+LM_LOAD_SECONDS = histogram("ta_lm_model_load_seconds", "Duration of 'lms load'", ["node"])
+LM_UNLOADS = counter("ta_lm_model_unloads_total", "LM Studio model unloads", ["node", "result"])
+LM_UNLOAD_SECONDS = histogram("ta_lm_model_unload_seconds", "Duration of 'lms unload'", ["node"])
+LM_TIME_TO_READY = histogram(
+    "ta_lm_time_to_ready_seconds", "From load start until the model answers / is verified", ["node"]
+)
+
+VISION_REQUESTS = counter("ta_vision_requests_total", "Vision requests to LM Studio", ["model", "result"])
+VISION_SECONDS = histogram("ta_vision_request_seconds", "Vision request latency incl. image encoding", ["model"])
+VISION_TOKENS_PER_SECOND = histogram(
+    "ta_vision_tokens_per_second", "Completion tokens per second of vision requests", ["model"], RATE_BUCKETS
+)
+VISION_COMPLETION_TOKENS = counter("ta_vision_completion_tokens_total", "Generated completion tokens", ["model"])
+VISION_PACKED_REQUESTS = counter(
+    "ta_vision_packed_requests_total", "Vision requests carrying several images", ["model", "result"]
+)
+VISION_DEDUPED_FRAMES = counter(
+    "ta_vision_deduplicated_frames_total", "Batch frames that reused the caption of a near-identical frame", ["model"]
+)
+
+CACHE_REQUESTS = counter("ta_cache_requests_total", "Cache lookups of the TA nodes", ["cache", "result"])
+
+LOADER_SECONDS = histogram(
+    "ta_loader_seconds", "Wall time of the TALoad*WithName nodes", ["node"],
+    LATENCY_BUCKETS + (600,)
+)
+LOADER_BYTES = counter("ta_loader_bytes_read_total", "Model bytes read by the TALoad*WithName nodes", ["node"])
+
+RESIDENT_MODELS = gauge("ta_resident_models", "Models currently resident, per backend", ["backend", "model"])
+
+
+def record_model_load(node, path, seconds, bytes_read=None):
+    """
+    Wall time und gelesene Bytes einer Loader-Node - ohne bytes_read wird die
+    Dateigröße verwendet (bei übersprungenem CLIP/VAE eine obere Schranke)
+    """
+    LOADER_SECONDS.observe(seconds, node=node)
+    if bytes_read is None:
+        try:
+            bytes_read = os.path.getsize(path)
+        except OSError:
+            return
+    LOADER_BYTES.inc(bytes_read, node=node)
+
+
+def _comfy_resident_models():
+    # Nur auswerten, wenn ComfyUI model_management bereits geladen hat - nie importieren
+    model_management = sys.modules.get("comfy.model_management")
+    if model_management is None:
+        return []
+    counts = {}
+    for loaded in getattr(model_management, "current_loaded_models", []):
+        model = getattr(getattr(loaded, "model", None), "model", None)
+        name = type(model).__name__ if model is not None else "unknown"
+        counts[name] = counts.get(name, 0) + 1
+    return [({"backend": "comfy", "model": name}, count) for name, count in counts.items()]
+
+
+RESIDENT_MODELS.add_callback(_comfy_resident_models)
+
+
+def set_lmstudio_resident(model, loaded=True):
+    """Merkt sich in-process, welche LM Studio Modelle die TA Nodes geladen haben"""
+    if loaded:
+        RESIDENT_MODELS.set(1, backend="lmstudio", model=model)
+    else:
+        RESIDENT_MODELS.remove(backend="lmstudio", model=model)
+
+
+def clear_lmstudio_resident():
+    RESIDENT_MODELS.clear(backend="lmstudio")
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+def register_route():
+    """
+    Hängt GET /ta_nodes/metrics an den laufenden PromptServer
+    Außerhalb von ComfyUI (z.B. in Benchmarks) passiert nichts
+    """
+    server = sys.modules.get("server")
+    prompt_server = getattr(getattr(server, "PromptServer", None), "instance", None)
+    if prompt_server is None:
+        return False
+
+    from aiohttp import web
+
+    @prompt_server.routes.get(METRICS_ROUTE)
+    async def ta_metrics(request):
+        return web.Response(body=render_metrics().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    return True
@@ -0,0 +1,361 @@
+"""
+TA Model Inspector - Liest nur die Header von safetensors- und GGUF-Dateien
+Teil des ComfyUI-TA-Nodes-Pack
+
+Liefert Architektur, Parameteranzahl, Tensor-Dtypes bzw. GGUF-Quantisierung,
+ohne die (oft mehrere GB großen) Gewichte zu lesen.
+Ergebnisse werden pro Pfad und mtime gecached.
+"""
+
+import json
+import os
+import struct
+import threading
+
+from . import ta_metrics as metrics
+from . import ta_tracing as tracing
+from .ta_profiling import profile_node
+
+
+# GGML Tensor-Typen -> (Name, Blockgröße, Bytes pro Block)
+GGML_TYPES = {
+    0: ("F32", 1, 4), 1: ("F16", 1, 2), 2: ("Q4_0", 32, 18), 3: ("Q4_1", 32, 20),
+    6: ("Q5_0", 32, 22), 7: ("Q5_1", 32, 24), 8: ("Q8_0", 32, 34), 9: ("Q8_1", 32, 36),
+    10: ("Q2_K", 256, 84), 11: ("Q3_K", 256, 110), 12: ("Q4_K", 256, 144),
+    13: ("Q5_K", 256, 176), 14: ("Q6_K", 256, 210), 15: ("Q8_K", 256, 292),
+    16: ("IQ2_XXS", 256, 66), 17: ("IQ2_XS", 256, 74), 18: ("IQ3_XXS", 256, 98),
+    19: ("IQ1_S", 256, 50), 20: ("IQ4_NL", 32, 18), 21: ("IQ3_S", 256, 110),
+    22: ("IQ2_S", 256, 82), 23: ("IQ4_XS", 256, 136), 24: ("I8", 1, 1),
+    25: ("I16", 1, 2), 26: ("I32", 1, 4), 27: ("I64", 1, 8), 28: ("F64", 1, 8),
+    29: ("IQ1_M", 256, 56), 30: ("BF16", 1, 2),
+}
+
+# GGUF Metadaten-Werttypen -> struct Format (Strings und Arrays separat)
+GGUF_VALUE_FORMATS = {
+    0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i",
+    6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d",
+}
+GGUF_TYPE_STRING = 8
+GGUF_TYPE_ARRAY = 9
+
+# Arrays (z.B. Tokenizer-Vokabulare) werden nur bis zu dieser Länge übernommen
+MAX_METADATA_ARRAY = 64
+
+# Schlüssel-Marker -> Architektur (erste Übereinstimmung gewinnt)
+ARCHITECTURE_MARKERS = [
+    ("double_blocks.", "flux"),
+    ("joint_blocks.", "sd3"),
+    ("conditioner.embedders.1", "sdxl"),
+    ("add_embedding.linear_1", "sdxl"),
+    ("label_emb.0.0.weight", "sdxl"),
+    ("transformer_blocks.0.attn.add_q_proj", "hidream/auraflow"),
+    ("blocks.0.cross_attn", "wan"),
+    ("cond_stage_model.transformer", "sd1"),
+    ("input_blocks.", "sd1/sd2 unet"),
+]
+
+MAX_SAFETENSORS_HEADER = 100 * 1024 * 1024
+# GGML_MAX_DIMS ist 4 - etwas Spielraum für neuere Versionen
+MAX_GGUF_DIMS = 8
+
+
+class ModelHeaderError(ValueError):
+    """Header ist beschädigt oder kein unterstütztes Format"""
+
+
+def _remaining(f):
+    return os.fstat(f.fileno()).st_size - f.tell()
+
+
+def _read_exact(f, size):
+    # Längen aus dem Header gegen die Dateigröße prüfen - ein kaputter Header
+    # soll keinen MemoryError/OverflowError auslösen, sondern ModelHeaderError
+    if size < 0 or size > _remaining(f):
+        raise ModelHeaderError(f"Header field length {size} exceeds the file size")
+    data = f.read(size)
+    if len(data) != size:
+        raise ModelHeaderError("Unexpected end of file while reading header")
+    return data
+
+
+def _guess_architecture(keys, metadata):
+    arch = metadata.get("modelspec.architecture") if metadata else None
+    if arch:
+        return arch
+    for marker, name in ARCHITECTURE_MARKERS:
+        for key in keys:
+            if marker in key:
+                return name
+    return "unknown"
+
+
+def _inspect_safetensors(path):
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", _read_exact(f, 8))
+        if header_len > MAX_SAFETENSORS_HEADER:
+            raise ModelHeaderError(f"Implausible safetensors header size: {header_len}")
+        header = json.loads(_read_exact(f, header_len))
+
+    metadata = header.pop("__metadata__", {}) or {}
+    dtypes = {}
+    parameters = 0
+    data_bytes = 0
+
+    for name, info in header.items():
+        count = 1
+        for dim in info["shape"]:
+            count *= dim
+        parameters += count
+        dtypes[info["dtype"]] = dtypes.get(info["dtype"], 0) + count
+        start, end = info["data_offsets"]
+        data_bytes += end - start
+
+    keys = header.keys()
+    return {
+        "format": "safetensors",
+        "architecture": _guess_architecture(keys, metadata),
+        "parameters": parameters,
+        "tensor_count": len(header),
+        "dtypes": dtypes,
+        "dtype": max(dtypes, key=dtypes.get) if dtypes else "unknown",
+        "data_bytes": data_bytes,
+        "has_clip": any(k.startswith(("cond_stage_model.", "conditioner.", "text_encoders.")) for k in keys),
+        "has_vae": any(k.startswith("first_stage_model.") for k in keys),
+        "metadata": metadata,
+    }
+
+
+def _read_gguf_string(f):
+    (length,) = struct.unpack("<Q", _read_exact(f, 8))
+    return _read_exact(f, length).decode("utf-8", errors="replace")
+
+
+def _skip(f, size):
+    if size > _remaining(f):
+        raise ModelHeaderError(f"Header field length {size} exceeds the file size")
+    f.seek(size, os.SEEK_CUR)
+
+
+def _read_gguf_value(f, value_type):
+    if value_type == GGUF_TYPE_STRING:
+        return _read_gguf_string(f)
+
+    if value_type == GGUF_TYPE_ARRAY:
+        item_type, count = struct.unpack("<IQ", _read_exact(f, 12))
+        if count <= MAX_METADATA_ARRAY:
+            return [_read_gguf_value(f, item_type) for _ in range(count)]
+
+        # Große Arrays (z.B. Tokenizer-Vokabular) nur überspringen
+        if item_type in GGUF_VALUE_FORMATS:
+            _skip(f, count * struct.calcsize(GGUF_VALUE_FORMATS[item_type]))
+        elif item_type == GGUF_TYPE_STRING:
+            for _ in range(count):
+                (length,) = struct.unpack("<Q", _read_exact(f, 8))
+                _skip(f, length)
+        else:
+            for _ in range(count):
+                _read_gguf_value(f, item_type)
+        return f"<array of {count}>"
+
+    fmt = GGUF_VALUE_FORMATS.get(value_type)
+    if fmt is None:
+        raise ModelHeaderError(f"Unknown GGUF metadata type: {value_type}")
+    return struct.unpack(fmt, _read_exact(f, struct.calcsize(fmt)))[0]
+
+
+def _inspect_gguf(path):
+    with open(path, "rb") as f:
+        if _read_exact(f, 4) != b"GGUF":
+            raise ModelHeaderError("Not a GGUF file (bad magic)")
+
+        (version,) = struct.unpack("<I", _read_exact(f, 4))
+        if version < 2:
+            raise ModelHeaderError(f"Unsupported GGUF version: {version}")
+        tensor_count, kv_count = struct.unpack("<QQ", _read_exact(f, 16))
+
+        metadata = {}
+        for _ in range(kv_count):
+            key = _read_gguf_string(f)
+            (value_type,) = struct.unpack("<I", _read_exact(f, 4))
+            metadata[key] = _read_gguf_value(f, value_type)
+
+        quant_types = {}
+        parameters = 0
+        data_bytes = 0
+        for _ in range(tensor_count):
+            _read_gguf_string(f)
+            (n_dims,) = struct.unpack("<I", _read_exact(f, 4))
+            if n_dims > MAX_GGUF_DIMS:
+                raise ModelHeaderError(f"Implausible tensor rank: {n_dims}")
+            dims = struct.unpack(f"<{n_dims}Q", _read_exact(f, 8 * n_dims))
+            tensor_type, _offset = struct.unpack("<IQ", _read_exact(f, 12))
+
+            count = 1
+            for dim in dims:
+                count *= dim
+            parameters += count
+
+            type_name, block_size, type_size = GGML_TYPES.get(tensor_type, (f"TYPE_{tensor_type}", 1, 0))
+            quant_types[type_name] = quant_types.get(type_name, 0) + count
+            data_bytes += count // block_size * type_size
+
+    return {
+        "format": "gguf",
+        "gguf_version": version,
+        "architecture": metadata.get("general.architecture", "unknown"),
+        "parameters": parameters,
+        "tensor_count": tensor_count,
+        "dtypes": quant_types,
+        "dtype": max(quant_types, key=quant_types.get) if quant_types else "unknown",
+        "data_bytes": data_bytes,
+        "metadata": metadata,
+    }
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def inspect_model(path):
+    """
+    Liest nur den Header einer .safetensors oder .gguf Datei
+    Gecached nach (Pfad, Größe, mtime) - wirft ModelHeaderError bei ungültigen Dateien
+    """
+    st = os.stat(path)
+    signature = (st.st_size, st.st_mtime_ns)
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == signature:
+            metrics.CACHE_REQUESTS.inc(cache="model_header", result="hit")
+            return cached[1]
+    metrics.CACHE_REQUESTS.inc(cache="model_header", result="miss")
+
+    lower = path.lower()
+    try:
+        if lower.endswith(".gguf"):
+            with tracing.span("read gguf header", cat="io", file=os.path.basename(path)):
+                info = _inspect_gguf(path)
+        elif lower.endswith(".safetensors") or lower.endswith(".sft"):
+            with tracing.span("read safetensors header", cat="io", file=os.path.basename(path)):
+                info = _inspect_safetensors(path)
+        else:
+            raise ModelHeaderError(f"Unsupported model format: {os.path.basename(path)}")
+    except ModelHeaderError:
+        raise
+    except (struct.error, ValueError, KeyError, TypeError, AttributeError, MemoryError, OverflowError) as e:
+        # ValueError deckt auch UnicodeDecodeError und json.JSONDecodeError ab
+        raise ModelHeaderError(f"Corrupted header in {os.path.basename(path)}: {e}")
+
+    info["file_bytes"] = st.st_size
+
+    with _cache_lock:
+        _cache[path] = (signature, info)
+    return info
+
+
+def check_model_header(path):
+    """
+    Schnelle Header-Prüfung für die Loader (VALIDATE_INPUTS)
+    Gibt None zurück wenn alles passt oder das Format nicht prüfbar ist, sonst eine Fehlermeldung
+    """
+    if not path or not path.lower().endswith((".safetensors", ".sft", ".gguf")):
+        return None
+    try:
+        inspect_model(path)
+    except ModelHeaderError as e:
+        return str(e)
+    except OSError:
+        return None
+    return None
+
+
+def format_parameters(count):
+    if count >= 1e9:
+        return f"{count / 1e9:.2f}B"
+    if count >= 1e6:
+        return f"{count / 1e6:.1f}M"
+    return str(count)
+
+
+class TAInspectModel:
+    """
+    Zeigt Architektur, Parameteranzahl und Dtypes eines Modells,
+    ohne die Gewichte zu laden (nur Header)
+    """
+
+    # "unet" ist in aktuellem ComfyUI nur ein Alias für diffusion_models
+    _folders = ["checkpoints", "diffusion_models", "unet_gguf"]
+
+    @classmethod
+    def get_model_files(cls):
+        import folder_paths
+        files = []
+        seen = set()
+        for folder in cls._folders:
+            try:
+                names = folder_paths.get_filename_list(folder)
+            except Exception:
+                continue
+            for name in names:
+                if not name.lower().endswith((".safetensors", ".sft", ".gguf")):
+                    continue
+                # Ordner können dieselben Verzeichnisse teilen (z.B. unet_gguf von ComfyUI-GGUF)
+                path = folder_paths.get_full_path(folder, name) or f"{folder}/{name}"
+                if path in seen:
+                    continue
+                seen.add(path)
+                files.append(f"{folder}/{name}")
+        return files
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        files = cls.get_model_files()
+
+        return {
+            "required": {
+                "model_file": (files if files else ["No model files found"],),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT", "STRING")
+    RETURN_NAMES = ("info", "architecture", "parameters", "dtype")
+    FUNCTION = "inspect"
+    CATEGORY = "TA Nodes/loaders"
+
+    @classmethod
+    def IS_CHANGED(cls, model_file):
+        import folder_paths
+        folder, _, name = model_file.partition("/")
+        path = folder_paths.get_full_path(folder, name)
+        return os.path.getmtime(path) if path else model_file
+
+    @profile_node
+    def inspect(self, model_file):
+        import folder_paths
+        folder, _, name = model_file.partition("/")
+        path = folder_paths.get_full_path(folder, name)
+        if not path:
+            raise FileNotFoundError(f"Could not find {model_file}")
+
+        info = inspect_model(path)
+
+        summary = dict(info)
+        summary["parameters_readable"] = format_parameters(info["parameters"])
+        summary["size_gb"] = round(info["file_bytes"] / 1024 ** 3, 2)
+
+        return (
+            json.dumps(summary, indent=2, default=str),
+            info["architecture"],
+            info["parameters"],
+            info["dtype"],
+        )
+
+
+NODE_CLASS_MAPPINGS = {
+    "TAInspectModel": TAInspectModel
+}
+
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "TAInspectModel": "TA Inspect Model (Header Only)"
+}
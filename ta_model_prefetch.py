@@ -0,0 +1,170 @@
+"""
+TA Model Prefetch - Liest Modelldateien im Hintergrund in den OS Page-Cache
+Teil des ComfyUI-TA-Nodes-Pack
+
+Die TA Loader starten den Prefetch bereits beim Queuen des Prompts
+(VALIDATE_INPUTS), damit das eigentliche comfy.sd Laden eine "heiße" Datei vorfindet.
+
+Umgebungsvariablen:
+    TA_PREFETCH=0               Prefetch komplett deaktivieren
+    TA_PREFETCH_MAX_MBPS=200    Lesedurchsatz begrenzen (0 = unbegrenzt)
+    TA_PREFETCH_WARM_SECONDS=60 So lange gilt eine vorgeladene Datei als "heiß" (0 = immer neu lesen)
+
+Wechselt man zwischen mehreren großen Modellen, verdrängt der Kernel die
+älteren wieder aus dem Page-Cache - eine fertige Datei wird daher nur kurz
+übersprungen (mehrere Queues desselben Prompts), danach erneut vorgeladen.
+"""
+
+import os
+import threading
+import time
+
+from . import ta_tracing as tracing
+from .ta_logging import get_logger
+
+log = get_logger("Prefetch")
+
+
+PREFETCH_ENABLED = os.environ.get("TA_PREFETCH", "1") != "0"
+CHUNK_SIZE = 16 * 1024 * 1024
+
+try:
+    PREFETCH_MAX_MBPS = float(os.environ.get("TA_PREFETCH_MAX_MBPS", "0"))
+except ValueError:
+    PREFETCH_MAX_MBPS = 0.0
+
+try:
+    WARM_SECONDS = float(os.environ.get("TA_PREFETCH_WARM_SECONDS", "60"))
+except ValueError:
+    WARM_SECONDS = 60.0
+
+
+class PrefetchJob:
+    """
+    Ein Hintergrund-Lesevorgang für eine einzelne Datei
+    Nutzt posix_fadvise(WILLNEED) als Readahead-Hinweis wo verfügbar
+    """
+
+    def __init__(self, path, signature=None, max_mbps=0.0):
+        self.path = path
+        self.signature = signature
+        self.max_mbps = max_mbps
+        self.bytes_read = 0
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.finished_at = None
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f"TA-Prefetch:{os.path.basename(path)}",
+            daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _throttle(self, started):
+        # Schlafe so lange, dass der Durchsatz max_mbps nicht übersteigt
+        if self.max_mbps <= 0:
+            return
+        expected = self.bytes_read / (self.max_mbps * 1024 * 1024)
+        delay = expected - (time.monotonic() - started)
+        if delay > 0:
+            self.cancelled.wait(delay)
+
+    def _run(self):
+        started = time.monotonic()
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        has_fadvise = hasattr(os, "posix_fadvise")
+        trace_span = tracing.span("prefetch", cat="io", file=os.path.basename(self.path))
+
+        try:
+            with trace_span, open(self.path, "rb", buffering=0) as f:
+                fd = f.fileno()
+                if has_fadvise:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+                while not self.cancelled.is_set():
+                    # Readahead für den nächsten Block anstoßen, aktuellen Block lesen
+                    if has_fadvise:
+                        os.posix_fadvise(fd, self.bytes_read + CHUNK_SIZE, CHUNK_SIZE, os.POSIX_FADV_WILLNEED)
+
+                    n = f.readinto(view)
+                    if not n:
+                        break
+                    self.bytes_read += n
+                    self._throttle(started)
+                trace_span.set(bytes_read=self.bytes_read, cancelled=self.cancelled.is_set())
+        except OSError as e:
+            log.warning("Could not prefetch %s: %s", self.path, e)
+        finally:
+            self.finished_at = time.monotonic()
+            self.finished.set()
+
+    @property
+    def completed(self):
+        return self.finished.is_set() and not self.cancelled.is_set()
+
+
+_jobs = {}
+# path -> (Signatur, Zeitpunkt des abgeschlossenen Prefetch)
+_warm_files = {}
+_lock = threading.Lock()
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def prefetch_file(path, max_mbps=None):
+    """
+    Startet den Prefetch für path im Hintergrund (nicht-blockierend)
+    Bereits laufende und vor weniger als WARM_SECONDS vollständig vorgeladene
+    Dateien werden übersprungen
+    """
+    if not PREFETCH_ENABLED or not path:
+        return None
+
+    try:
+        signature = _file_signature(path)
+    except OSError:
+        return None
+
+    with _lock:
+        job = _jobs.get(path)
+        if job is not None:
+            if not job.finished.is_set():
+                return job
+            if job.completed:
+                _warm_files[path] = (job.signature, job.finished_at)
+            del _jobs[path]
+
+        warm = _warm_files.pop(path, None)
+        if warm is not None and warm[0] == signature and time.monotonic() - warm[1] < WARM_SECONDS:
+            _warm_files[path] = warm
+            return None
+
+        job = PrefetchJob(path, signature, PREFETCH_MAX_MBPS if max_mbps is None else max_mbps)
+        _jobs[path] = job
+        job.start()
+        return job
+
+
+def cancel_prefetch(path=None):
+    """
+    Bricht den Prefetch für path ab (oder alle, wenn path None ist)
+    Wird von den Loadern aufgerufen, sobald das eigentliche Laden beginnt
+    """
+    with _lock:
+        if path is None:
+            jobs = list(_jobs.values())
+        else:
+            jobs = [_jobs[path]] if path in _jobs else []
+
+    for job in jobs:
+        if not job.finished.is_set():
+            job.cancel()
@@ -0,0 +1,376 @@
+"""
+TA Profiling - Opt-in Profiling der Node-Funktionen
+Teil des ComfyUI-TA-Nodes-Pack
+
+Jede FUNCTION der TA Nodes ist mit @profile_node markiert. Ist Profiling aus,
+steht in der Klasse die unveränderte Methode - kein Wrapper, kein Overhead.
+Ist Profiling oder Tracing (ta_tracing) an, läuft jeder Aufruf durch einen
+Wrapper, der einen Node-Span öffnet. Bei Profiling schreibt jeder Aufruf eine
+Datei in das Profil-Verzeichnis:
+
+    cprofile  <Node>.<function>.<zeit>-<n>.prof       (pstats: python -m pstats, snakeviz)
+    sample    <Node>.<function>.<zeit>-<n>.collapsed  (flamegraph.pl, speedscope)
+
+Der Sampler liest periodisch den Stack des Node-Threads - geringerer Overhead
+als cProfile, dafür nur statistisch.
+
+Umgebungsvariablen:
+    TA_NODES_PROFILE=cprofile|sample     aktiviert Profiling (aus, wenn leer)
+    TA_NODES_PROFILE_DIR=<pfad>          Zielverzeichnis (Default: <tmp>/ta_nodes_profiles)
+    TA_NODES_PROFILE_NODES=A,B           nur diese Node-Klassen (Default: alle)
+    TA_NODES_PROFILE_INTERVAL=0.005      Sampling-Intervall in Sekunden
+
+Zur Laufzeit: enable_profiling()/disable_profiling() oder über ComfyUI
+GET/POST /ta_nodes/profiling  {"mode": "sample", "nodes": ["TALMStudioLoadOnRun"]}
+Das Zielverzeichnis ist über die Route nicht änderbar - nur per TA_NODES_PROFILE_DIR.
+"""
+
+import functools
+import inspect
+import itertools
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from . import ta_tracing as tracing
+from .ta_logging import get_logger, fields
+
+log = get_logger("Profiling")
+
+MODES = ("cprofile", "sample")
+PROFILING_ROUTE = "/ta_nodes/profiling"
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+def _parse_mode(value):
+    value = (value or "").strip().lower()
+    if value in ("", "0", "off", "false", "none"):
+        return None
+    if value in ("1", "on", "true"):
+        return "cprofile"
+    if value not in MODES:
+        log.warning("Unknown TA_NODES_PROFILE mode '%s' - use one of %s", value, ", ".join(MODES))
+        return None
+    return value
+
+
+_settings = {
+    "mode": _parse_mode(os.environ.get("TA_NODES_PROFILE")),
+    "directory": os.environ.get("TA_NODES_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "ta_nodes_profiles"),
+    "nodes": {n.strip() for n in os.environ.get("TA_NODES_PROFILE_NODES", "").split(",") if n.strip()},
+    "interval": _env_float("TA_NODES_PROFILE_INTERVAL", 0.005),
+}
+
+# (Klasse, Methodenname, Original-Funktion) aller markierten Node-Funktionen
+_registered = []
+_sequence = itertools.count(1)
+# cProfile kann pro Prozess nur einmal gleichzeitig laufen
+_cprofile_lock = threading.Lock()
+
+
+def _output_path(node, function, extension):
+    os.makedirs(_settings["directory"], exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(_settings["directory"], f"{node}.{function}.{stamp}-{next(_sequence)}.{extension}")
+
+
+def _run_cprofile(node, function, func, args, kwargs):
+    import cProfile
+
+    if not _cprofile_lock.acquire(blocking=False):
+        log.debug("Another node is being profiled - running %s.%s unprofiled", node, function)
+        return func(*args, **kwargs)
+    profiler = cProfile.Profile()
+    try:
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+: ein anderer Profiler (Debugger, sys.monitoring) ist aktiv
+            log.debug("cProfile unavailable: %s", e)
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            path = _output_path(node, function, "prof")
+            profiler.dump_stats(path)
+            log.info("Profile written", extra=fields(node=node, function=function, path=path))
+    finally:
+        _cprofile_lock.release()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """
+    Sammelt in einem Hintergrund-Thread die Stacks eines Threads, ab der
+    profilierten Funktion abwärts, als "a;b;c anzahl" (collapsed stacks)
+    """
+
+    def __init__(self, thread_id, root_frame, interval):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="TA-Profiler", daemon=True)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None and frame is not self.root_frame:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        if frame is None or not labels:
+            return
+        key = ";".join(reversed(labels))
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _run_sampled(node, function, func, args, kwargs):
+    sampler = _StackSampler(threading.get_ident(), sys._getframe(), _settings["interval"])
+    sampler.start()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        path = _output_path(node, function, "collapsed")
+        sampler.write(path)
+        log.info("Profile written", extra=fields(node=node, function=function, path=path,
+                                                 samples=sampler.samples))
+
+
+async def _run_cprofile_async(node, function, func, args, kwargs):
+    import cProfile
+
+    if not _cprofile_lock.acquire(blocking=False):
+        log.debug("Another node is being profiled - running %s.%s unprofiled", node, function)
+        return await func(*args, **kwargs)
+    # Läuft über alle awaits hinweg - andere Tasks auf dem Event-Loop erscheinen mit im Profil
+    profiler = cProfile.Profile()
+    try:
+        try:
+            profiler.enable()
+        except ValueError as e:
+            log.debug("cProfile unavailable: %s", e)
+            return await func(*args, **kwargs)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            path = _output_path(node, function, "prof")
+            profiler.dump_stats(path)
+            log.info("Profile written", extra=fields(node=node, function=function, path=path))
+    finally:
+        _cprofile_lock.release()
+
+
+async def _run_sampled_async(node, function, func, args, kwargs):
+    # Der Frame dieser Coroutine bleibt über awaits derselbe - Samples anderer Tasks fallen weg
+    sampler = _StackSampler(threading.get_ident(), sys._getframe(), _settings["interval"])
+    sampler.start()
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        sampler.stop()
+        path = _output_path(node, function, "collapsed")
+        sampler.write(path)
+        log.info("Profile written", extra=fields(node=node, function=function, path=path,
+                                                 samples=sampler.samples))
+
+
+def _make_async_wrapper(node, function, func):
+    # ComfyUI erkennt async Nodes an inspect.iscoroutinefunction - der Wrapper muss selbst async sein
+    @functools.wraps(func)
+    async def profiled(*args, **kwargs):
+        mode = _settings["mode"] if _wanted(node) else None
+        with tracing.span(node, cat="node", function=function):
+            if mode == "sample":
+                return await _run_sampled_async(node, function, func, args, kwargs)
+            if mode == "cprofile":
+                return await _run_cprofile_async(node, function, func, args, kwargs)
+            return await func(*args, **kwargs)
+
+    profiled.__wrapped_node_function__ = func
+    return profiled
+
+
+def _make_wrapper(node, function, func):
+    if inspect.iscoroutinefunction(func):
+        return _make_async_wrapper(node, function, func)
+
+    @functools.wraps(func)
+    def profiled(*args, **kwargs):
+        # Modus kann sich zur Laufzeit ändern - disable_profiling() entfernt den Wrapper wieder
+        mode = _settings["mode"] if _wanted(node) else None
+        with tracing.span(node, cat="node", function=function):
+            if mode == "sample":
+                return _run_sampled(node, function, func, args, kwargs)
+            if mode == "cprofile":
+                return _run_cprofile(node, function, func, args, kwargs)
+            return func(*args, **kwargs)
+
+    profiled.__wrapped_node_function__ = func
+    return profiled
+
+
+def _wanted(node):
+    return not _settings["nodes"] or node in _settings["nodes"]
+
+
+def _install(owner, name, func):
+    if (_settings["mode"] and _wanted(owner.__name__)) or tracing.is_enabled():
+        setattr(owner, name, _make_wrapper(owner.__name__, name, func))
+    else:
+        setattr(owner, name, func)
+
+
+class profile_node:
+    """
+    Decorator für die FUNCTION einer Node-Klasse
+
+    Ersetzt sich beim Erzeugen der Klasse (__set_name__) durch die Original-
+    Funktion oder - bei aktivem Profiling - durch den profilierenden Wrapper
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __set_name__(self, owner, name):
+        _registered.append((owner, name, self.func))
+        _install(owner, name, self.func)
+
+    def __get__(self, instance, owner=None):
+        # Nur erreichbar, wenn der Decorator außerhalb einer Klasse benutzt wird
+        return self.func.__get__(instance, owner)
+
+
+def _reinstall():
+    for owner, name, func in _registered:
+        _install(owner, name, func)
+
+
+tracing.add_listener(_reinstall)
+
+
+def enable_profiling(mode="cprofile", directory=None, nodes=None, interval=None):
+    """Aktiviert Profiling zur Laufzeit für alle (oder die genannten) Node-Klassen"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode '{mode}' - use one of {', '.join(MODES)}")
+    _settings["mode"] = mode
+    if directory:
+        _settings["directory"] = directory
+    if nodes is not None:
+        _settings["nodes"] = set(nodes)
+    if interval:
+        _settings["interval"] = float(interval)
+    _reinstall()
+    log.info("Profiling enabled", extra=fields(mode=mode, directory=_settings["directory"]))
+
+
+def disable_profiling():
+    _settings["mode"] = None
+    _reinstall()
+    log.info("Profiling disabled")
+
+
+def profiling_status():
+    return {
+        "mode": _settings["mode"],
+        "directory": _settings["directory"],
+        "nodes": sorted(_settings["nodes"]),
+        "interval": _settings["interval"],
+        "functions": [f"{owner.__name__}.{name}" for owner, name, _func in _registered],
+    }
+
+
+def parse_update_request(body):
+    """
+    Prüft den POST-Body der Route - gibt (mode, nodes, interval) zurück, ValueError bei ungültigen Werten
+    directory wird abgelehnt: sonst könnte jeder Client überall Dateien anlegen
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    unknown = set(body) - {"mode", "nodes", "interval"}
+    if "directory" in unknown:
+        raise ValueError("The profile directory can only be set with TA_NODES_PROFILE_DIR")
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    mode = body.get("mode")
+    if mode is not None and not isinstance(mode, str):
+        raise ValueError("'mode' must be a string or null")
+
+    nodes = body.get("nodes")
+    if nodes is not None and (not isinstance(nodes, list) or not all(isinstance(n, str) for n in nodes)):
+        raise ValueError("'nodes' must be a list of node class names")
+
+    interval = body.get("interval")
+    if interval is not None:
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) \
+                or not math.isfinite(interval) or interval <= 0:
+            raise ValueError("'interval' must be a positive number of seconds")
+        interval = float(interval)
+    return mode, nodes, interval
+
+
+def register_route():
+    """
+    GET liefert den Status, POST {"mode": "cprofile"|"sample"|null, ...} schaltet um
+    Nur wenn der PromptServer schon läuft (also in ComfyUI)
+    """
+    server = sys.modules.get("server")
+    prompt_server = getattr(getattr(server, "PromptServer", None), "instance", None)
+    if prompt_server is None:
+        return False
+
+    from aiohttp import web
+
+    @prompt_server.routes.get(PROFILING_ROUTE)
+    async def ta_profiling_status(request):
+        return web.json_response(profiling_status())
+
+    @prompt_server.routes.post(PROFILING_ROUTE)
+    async def ta_profiling_update(request):
+        try:
+            mode, nodes, interval = parse_update_request(await request.json())
+            if mode:
+                enable_profiling(mode, nodes=nodes, interval=interval)
+            else:
+                disable_profiling()
+        except ValueError as e:
+            # Auch ungültiges JSON (json.JSONDecodeError ist ein ValueError)
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(profiling_status())
+
+    return True
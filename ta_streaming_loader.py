@@ -0,0 +1,217 @@
+"""
+TA Streaming Loader - Lädt safetensors Tensor für Tensor mit begrenztem Speicher-Peak
+Teil des ComfyUI-TA-Nodes-Pack
+
+Jeder Tensor wird einzeln gelesen, bei Bedarf sofort in den Ziel-Dtype
+gecastet (z.B. fp8) und dann platziert. Der volle fp16/bf16 State Dict
+liegt so nie komplett im RAM - nur das gecastete Ergebnis plus ein Tensor.
+
+Gecastet werden nur die Gewichte von Linear/Conv Layern - wie bei
+ComfyUIs weight_dtype. Embeddings, pos_embed & Co. behalten ihren Dtype.
+"""
+
+import json
+import os
+import re
+import struct
+import time
+
+import torch
+
+from . import ta_tracing as tracing
+
+
+SAFETENSORS_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+if hasattr(torch, "float8_e4m3fn"):
+    SAFETENSORS_DTYPES["F8_E4M3"] = torch.float8_e4m3fn
+    SAFETENSORS_DTYPES["F8_E5M2"] = torch.float8_e5m2
+
+MB = 1024 * 1024
+
+# Embedding-Tabellen enden ebenfalls auf ".weight", werden von ComfyUI aber nicht gecastet
+EMBEDDING_MODULE = re.compile(
+    r"(embedding|embeddings|embed_tokens|pos_embed|wte|wpe)$", re.IGNORECASE
+)
+
+
+class PeakMemoryExceeded(RuntimeError):
+    """Der konfigurierte Speicher-Peak würde (oder wurde) überschritten"""
+
+
+def _dtype_size(dtype):
+    return torch.empty((), dtype=dtype).element_size()
+
+
+def _rss_bytes():
+    # Linux: aktuelle RSS aus /proc, sonst psutil falls vorhanden
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def reset_peak_rss():
+    """Setzt VmHWM zurück (Linux >= 4.0), damit read_peak_rss den Peak dieses Ladevorgangs liefert"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def is_layer_weight(name, shape):
+    """
+    ".weight" eines Linear (2D) oder Conv (3-5D) Layers
+    Biases, Norms, Embedding-Tabellen und freie Parameter (pos_embed, ...) nicht
+    """
+    if not name.endswith(".weight") or len(shape) < 2:
+        return False
+    module = name[:-len(".weight")].rsplit(".", 1)[-1]
+    return not EMBEDDING_MODULE.search(module)
+
+
+def should_cast(name, dtype, shape, weight_dtype):
+    """Nur float-Gewichte von Linear/Conv Layern werden gecastet"""
+    return (
+        weight_dtype is not None
+        and dtype.is_floating_point
+        and dtype != weight_dtype
+        and is_layer_weight(name, shape)
+    )
+
+
+def read_safetensors_header(path):
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+    header.pop("__metadata__", None)
+    return header, 8 + header_len
+
+
+def estimate_peak_bytes(header, weight_dtype):
+    """
+    Schätzt den Peak: gecasteter State Dict + ebenso großes Modell + größter Einzeltensor
+    """
+    cast_bytes = 0
+    largest = 0
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        numel = 1
+        for dim in info["shape"]:
+            numel *= dim
+        src_bytes = numel * _dtype_size(dtype)
+        largest = max(largest, src_bytes)
+        if should_cast(name, dtype, info["shape"], weight_dtype):
+            cast_bytes += numel * _dtype_size(weight_dtype)
+        else:
+            cast_bytes += src_bytes
+    return cast_bytes, 2 * cast_bytes + largest
+
+
+def _read_into(f, buffer, name):
+    """Füllt buffer vollständig - ungepufferte Reads dürfen kürzer ausfallen"""
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        count = f.readinto(view[filled:])
+        if not count:
+            raise OSError(f"Unexpected end of file in tensor {name} "
+                          f"({filled} of {len(buffer)} bytes read)")
+        filled += count
+
+
+def stream_load_state_dict(path, weight_dtype=None, device="cpu", peak_limit_mb=0):
+    """
+    Liest eine .safetensors Datei Tensor für Tensor, castet und platziert sofort
+    Gibt (state_dict, stats) zurück - stats enthält den beobachteten Peak
+    """
+    with tracing.span("read safetensors header", cat="io"):
+        header, data_start = read_safetensors_header(path)
+    state_dict_bytes, estimated_peak = estimate_peak_bytes(header, weight_dtype)
+    limit = peak_limit_mb * MB
+
+    if limit and estimated_peak > limit:
+        raise PeakMemoryExceeded(
+            f"Estimated peak {estimated_peak / MB:.0f} MB exceeds the limit of {peak_limit_mb} MB "
+            f"(state dict {state_dict_bytes / MB:.0f} MB after casting)"
+        )
+
+    rss_start = _rss_bytes()
+    observed_peak = 0
+    bytes_read = 0
+    casted = 0
+    start_time = time.perf_counter()
+
+    # In Datei-Reihenfolge lesen - sequentielle I/O
+    entries = sorted(header.items(), key=lambda item: item[1]["data_offsets"][0])
+    state_dict = {}
+
+    with open(path, "rb", buffering=0) as f:
+        for name, info in entries:
+            dtype = SAFETENSORS_DTYPES[info["dtype"]]
+            shape = info["shape"]
+            begin, end = info["data_offsets"]
+
+            if end == begin:
+                tensor = torch.empty(shape, dtype=dtype)
+            else:
+                buffer = bytearray(end - begin)
+                with tracing.span("read tensor", cat="io", tensor=name, bytes=end - begin):
+                    f.seek(data_start + begin)
+                    _read_into(f, buffer, name)
+                # Der Tensor hält die einzige Referenz auf den Puffer
+                tensor = torch.frombuffer(buffer, dtype=dtype).reshape(shape)
+                del buffer
+                bytes_read += end - begin
+
+            if should_cast(name, dtype, shape, weight_dtype):
+                with tracing.span("cast tensor", cat="compute", tensor=name):
+                    tensor = tensor.to(weight_dtype)
+                casted += 1
+            if device != "cpu":
+                tensor = tensor.to(device)
+
+            state_dict[name] = tensor
+
+            if rss_start is not None:
+                current = _rss_bytes() - rss_start
+                observed_peak = max(observed_peak, current)
+                if limit and current > limit:
+                    state_dict.clear()
+                    raise PeakMemoryExceeded(
+                        f"Peak memory limit of {peak_limit_mb} MB exceeded while streaming "
+                        f"({current / MB:.0f} MB after {name})"
+                    )
+
+    stats = {
+        "tensors": len(entries),
+        "casted": casted,
+        "bytes_read": bytes_read,
+        "state_dict_bytes": state_dict_bytes,
+        "estimated_peak_bytes": estimated_peak,
+        "observed_peak_bytes": observed_peak if rss_start is not None else None,
+        "seconds": time.perf_counter() - start_time,
+    }
+    return state_dict, stats
@@ -0,0 +1,239 @@
+"""
+TA Tracing - Zeitleiste der TA Nodes im Chrome Trace-Event Format
+Teil des ComfyUI-TA-Nodes-Pack
+
+Mit TA_NODES_TRACE=<datei.json> schreibt jede Node verschachtelte Spans
+(Node-Aufruf, 'lms' Aufrufe, Wartezeiten, HTTP-Requests, PNG-Encoding,
+Checkpoint-Lesen) in eine Trace-Datei. Öffnen mit https://ui.perfetto.dev
+oder chrome://tracing.
+
+Jeder Thread bekommt seine eigene Spur (native Thread-ID + Thread-Name) -
+Hintergrundarbeit wie Prefetch oder 'lms ls' erscheint dadurch getrennt
+von der Node-Ausführung. Spans aus asyncio Tasks (async Nodes, Batch-
+Requests) werden als Async-Events pro Task geschrieben.
+
+Die Datei wird fortlaufend im JSON-Array-Format geschrieben; Perfetto und
+Chrome lesen sie auch ohne schließende Klammer, z.B. während ComfyUI läuft.
+Ohne TA_NODES_TRACE liefert span() einen leeren Kontext-Manager.
+Zur Laufzeit: start_trace(pfad) / stop_trace().
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+_file = None
+_lock = threading.Lock()
+_named_threads = set()
+_pid = os.getpid()
+# Wird beim Start/Stop aufgerufen - ta_profiling setzt damit die Node-Wrapper neu
+_listeners = []
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _write(event):
+    line = json.dumps(event, default=str, ensure_ascii=False)
+    with _lock:
+        if _file is None:
+            return
+        _file.write(line + ",\n")
+
+
+def _ensure_thread_name(tid):
+    if tid in _named_threads:
+        return
+    _named_threads.add(tid)
+    _write({"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid,
+            "args": {"name": threading.current_thread().name}})
+
+
+def add_listener(callback):
+    _listeners.append(callback)
+
+
+def _notify():
+    for callback in _listeners:
+        callback()
+
+
+def start_trace(path):
+    """Startet das Schreiben einer Trace-Datei (überschreibt eine vorhandene)"""
+    global _file
+    stop_trace()
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with _lock:
+        _file = open(path, "w", encoding="utf-8", buffering=1)
+        _file.write("[\n")
+        _named_threads.clear()
+    _write({"name": "process_name", "ph": "M", "pid": _pid, "tid": 0, "args": {"name": "ComfyUI TA Nodes"}})
+    _notify()
+
+
+def stop_trace():
+    global _file
+    with _lock:
+        if _file is None:
+            return
+        # Letztes Element ohne Komma, damit die Datei auch strikt gültiges JSON ist
+        _file.write(json.dumps({"name": "trace_end", "ph": "i", "s": "g", "pid": _pid, "tid": 0,
+                                "ts": _now_us()}) + "\n]\n")
+        _file.close()
+        _file = None
+    _notify()
+
+
+def is_enabled():
+    return _file is not None
+
+
+def _current_task():
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "start")
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        tid = threading.get_native_id()
+        _ensure_thread_name(tid)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        end = _now_us()
+        task = _current_task()
+        if task is None:
+            event = {"name": self.name, "cat": self.cat, "ph": "X", "ts": self.start,
+                     "dur": end - self.start, "pid": _pid, "tid": tid}
+            if self.args:
+                event["args"] = self.args
+            _write(event)
+        else:
+            # Parallele Tasks auf demselben Event-Loop-Thread überlappen sich -
+            # als Async-Events bekommt jeder Task seine eigene Spur
+            task_id = hex(id(task))
+            _write({"name": self.name, "cat": self.cat, "ph": "b", "id": task_id, "ts": self.start,
+                    "pid": _pid, "tid": tid, "args": self.args})
+            _write({"name": self.name, "cat": self.cat, "ph": "e", "id": task_id, "ts": end,
+                    "pid": _pid, "tid": tid})
+        return False
+
+    def set(self, **args):
+        """Ergänzt Argumente, die erst im Span bekannt werden (z.B. HTTP Status)"""
+        self.args.update(args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name, cat="ta", **args):
+    """
+    Kontext-Manager für einen Span auf der Spur des aktuellen Threads
+        with span("lms load", cat="subprocess", model=path) as s:
+            ...
+            s.set(returncode=result.returncode)
+    """
+    if _file is None:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def instant(name, cat="ta", **args):
+    """Einzelnes Ereignis ohne Dauer (z.B. Cache-Treffer, Abbruch)"""
+    if _file is None:
+        return
+    tid = threading.get_native_id()
+    _ensure_thread_name(tid)
+    _write({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": _now_us(), "pid": _pid, "tid": tid,
+            "args": args})
+
+
+def run_command(command, **kwargs):
+    """subprocess.run als Span "lms load" usw. - gleiche Argumente und Rückgabe"""
+    import subprocess
+
+    with span(" ".join(command[:2]), cat="subprocess", command=" ".join(command)) as s:
+        result = subprocess.run(command, **kwargs)
+        s.set(returncode=result.returncode)
+    return result
+
+
+async def run_command_async(command, timeout=None, check=False):
+    """
+    Wie run_command, aber als asyncio Subprozess - der Event-Loop bleibt frei
+    Liefert subprocess.CompletedProcess (Text), wirft TimeoutExpired / CalledProcessError
+    """
+    import asyncio
+    import subprocess
+
+    with span(" ".join(command[:2]), cat="subprocess", command=" ".join(command)) as s:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, timeout)
+        s.set(returncode=process.returncode)
+
+    result = subprocess.CompletedProcess(
+        command, process.returncode,
+        stdout.decode("utf-8", errors="replace"), stderr.decode("utf-8", errors="replace")
+    )
+    if check:
+        result.check_returncode()
+    return result
+
+
+def sleep(seconds, reason="sleep"):
+    """time.sleep als Span - feste Wartezeiten sollen in der Zeitleiste auffallen"""
+    with span(reason, cat="sleep", seconds=seconds):
+        time.sleep(seconds)
+
+
+async def sleep_async(seconds, reason="sleep"):
+    import asyncio
+
+    with span(reason, cat="sleep", seconds=seconds):
+        await asyncio.sleep(seconds)
+
+
+atexit.register(stop_trace)
+
+if os.environ.get("TA_NODES_TRACE"):
+    start_trace(os.environ["TA_NODES_TRACE"])
@@ -0,0 +1,51 @@
+"""
+Gemeinsame Fixtures der Tests - laufen ohne ComfyUI, torch und LM Studio
+
+Das Pack wird als Paket "ta_nodes_pack" registriert, ohne __init__.py
+auszuführen - die Module lassen sich so einzeln importieren.
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+import pytest
+
+PACK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACK_MODULE = "ta_nodes_pack"
+
+if PACK_DIR not in sys.path:
+    sys.path.insert(0, PACK_DIR)
+
+
+def _register_pack():
+    if PACK_MODULE in sys.modules:
+        return
+    spec = importlib.util.spec_from_file_location(
+        PACK_MODULE, os.path.join(PACK_DIR, "__init__.py"),
+        submodule_search_locations=[PACK_DIR]
+    )
+    sys.modules[PACK_MODULE] = importlib.util.module_from_spec(spec)
+
+
+def load_module(name):
+    """Importiert ein Modul des Packs, z.B. load_module("ta_model_inspector")"""
+    _register_pack()
+    return importlib.import_module(f"{PACK_MODULE}.{name}")
+
+
+@pytest.fixture(scope="session")
+def simulator(tmp_path_factory):
+    """LM Studio Simulator mit 'lms' Shim vorne in PATH"""
+    import LMSTUDIO_SIMULATOR as sim
+
+    server = sim.start_simulator(config={"ttft_seconds": 0.01, "token_seconds": 0.0, "image_seconds": 0.0,
+                                         "load_seconds": 0.01, "unload_seconds": 0.0})
+    shim_dir = str(tmp_path_factory.mktemp("lms_shim"))
+    sim.write_lms_shim(shim_dir, server.url)
+    old_path = os.environ["PATH"]
+    os.environ["PATH"] = shim_dir + os.pathsep + old_path
+    yield server
+    os.environ["PATH"] = old_path
+    server.shutdown()
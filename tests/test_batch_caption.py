@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from conftest import load_module
+
+batch = load_module("ta_lmstudio_batch_caption")
+
+MODEL = "lmstudio-community/llava-v1.5-7b"
+
+
+def write_jsonl(path, lines):
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return str(path)
+
+
+def test_read_done(tmp_path):
+    output = write_jsonl(tmp_path / "captions.jsonl", [
+        json.dumps({"file": str(tmp_path / "a.png"), "caption": "a cat"}),
+        json.dumps({"file": str(tmp_path / "b.png"), "error": "Error 500"}),
+        json.dumps({"file": str(tmp_path / "c.png"), "caption": "  "}),
+        json.dumps({"file": str(tmp_path / "e.png"), "caption": "a dog", "error": "late"}),
+        json.dumps(["not", "a", "record"]),
+        # Abgeschnittene letzte Zeile nach Abbruch
+        '{"file": "' + str(tmp_path / "d.png").replace("\\", "\\\\") + '", "capt',
+    ])
+    assert batch.read_done(output) == {batch.file_key(tmp_path / "a.png")}
+    assert batch.read_done(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_read_done_relative_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output = write_jsonl(tmp_path / "captions.jsonl", [json.dumps({"file": "images/a.png", "caption": "x"})])
+    assert batch.file_key(tmp_path / "images" / "a.png") in batch.read_done(output)
+
+
+def test_node_flags():
+    assert batch.TALMStudioBatchCaption.OUTPUT_NODE is True
+    changed = batch.TALMStudioBatchCaption.IS_CHANGED(source="x")
+    assert changed != changed
+
+
+def test_caption_directory_resumes(simulator, tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    import LMSTUDIO_SIMULATOR as sim
+
+    images = tmp_path / "images"
+    images.mkdir()
+    for i in range(3):
+        Image.new("RGB", (64, 48), (i * 80, 0, 0)).save(images / f"{i}.png")
+    assert sim.run_lms(simulator.state, ["load", MODEL])[0] == 0
+
+    node = batch.TALMStudioBatchCaption()
+    monkeypatch.chdir(tmp_path)
+
+    def run(source, resume=True):
+        return asyncio.run(node.caption_directory(
+            source, "", "Describe.", "llava-v1.5-7b", 0.7, 50, simulator.url, 2, 2, 32, False, resume
+        ))
+
+    output, captioned, skipped, failed = run(str(images))
+    assert (captioned, skipped, failed) == (3, 0, 0)
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert {r["file"] for r in records} == {batch.file_key(images / f"{i}.png") for i in range(3)}
+    assert all(r["caption"] for r in records)
+
+    # Gleiche Dateien über einen relativen Pfad - alle schon beschriftet
+    (images / "3.png").write_bytes((images / "0.png").read_bytes())
+    output, captioned, skipped, failed = run("images")
+    assert os.path.abspath(output) == os.path.join(str(images), batch.DEFAULT_OUTPUT_NAME)
+    assert (captioned, skipped, failed) == (1, 3, 0)
+
+    assert run(str(images), resume=False)[1:] == (4, 0, 0)
+    simulator.state.loaded.clear()
+
+
+def test_empty_caption_is_requested_again(simulator, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    import LMSTUDIO_SIMULATOR as sim
+
+    images = tmp_path / "images"
+    images.mkdir()
+    for name in ("a.png", "b.png"):
+        Image.new("RGB", (32, 32)).save(images / name)
+    output = write_jsonl(tmp_path / "captions.jsonl", [
+        json.dumps({"file": str(images / "a.png"), "caption": "a black square"}),
+        json.dumps({"file": str(images / "b.png"), "caption": ""}),
+    ])
+    assert sim.run_lms(simulator.state, ["load", MODEL])[0] == 0
+    requests_before = simulator.state.counters.get("chat_requests", 0)
+    try:
+        result = asyncio.run(batch.TALMStudioBatchCaption().caption_directory(
+            str(images), output, "Describe.", "llava-v1.5-7b", 0.7, 50, simulator.url, 2, 2, 32, False, True
+        ))
+    finally:
+        simulator.state.loaded.clear()
+    assert result[1:] == (1, 1, 0)
+    assert simulator.state.counters.get("chat_requests", 0) == requests_before + 1
+    assert batch.read_done(output) == {batch.file_key(images / "a.png"), batch.file_key(images / "b.png")}
@@ -0,0 +1,145 @@
+import contextlib
+import json
+import struct
+import sys
+import types
+
+import pytest
+
+from conftest import load_module
+
+checkpoint = load_module("ta_load_checkpoint_model_with_name")
+
+TENSORS = {
+    "model.diffusion_model.input_blocks.0.0.weight": 16,
+    "cond_stage_model.transformer.text_model.embeddings.token_embedding.weight": 8,
+    "conditioner.embedders.0.transformer.weight": 8,
+    "first_stage_model.decoder.conv_in.weight": 4,
+}
+
+
+def write_checkpoint(path):
+    header = {"__metadata__": {"format": "pt"}}
+    offset = 0
+    for name, count in TENSORS.items():
+        header[name] = {"dtype": "F32", "shape": [count], "data_offsets": [offset, offset + 4 * count]}
+        offset += 4 * count
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * offset)
+    return str(path)
+
+
+class FakeComfySD(types.ModuleType):
+    def __init__(self):
+        super().__init__("comfy.sd")
+        self.calls = []
+
+    def load_state_dict_guess_config(self, sd, output_vae=True, output_clip=True, embedding_directory=None,
+                                     metadata=None):
+        self.calls.append(("state_dict", sorted(sd), output_clip, output_vae, metadata))
+        return ("model", "clip" if output_clip else None, "vae" if output_vae else None)
+
+    def load_checkpoint_guess_config(self, ckpt_path, output_vae=True, output_clip=True, embedding_directory=None):
+        self.calls.append(("path", ckpt_path, output_clip, output_vae))
+        return ("model", "clip" if output_clip else None, "vae" if output_vae else None)
+
+
+@pytest.fixture
+def comfy_env(tmp_path, monkeypatch):
+    """Ersetzt comfy.sd und folder_paths - ckpt_name ist der Dateiname in tmp_path"""
+    sd = FakeComfySD()
+    comfy = types.ModuleType("comfy")
+    comfy.sd = sd
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.get_full_path = lambda folder, name: str(tmp_path / name)
+    folder_paths.get_folder_paths = lambda folder: []
+    monkeypatch.setitem(sys.modules, "comfy", comfy)
+    monkeypatch.setitem(sys.modules, "comfy.sd", sd)
+    monkeypatch.setitem(sys.modules, "folder_paths", folder_paths)
+    return sd
+
+
+@pytest.fixture
+def fake_safetensors(monkeypatch):
+    """safe_open über den echten Header - merkt sich, welche Tensoren gelesen werden"""
+    read = []
+
+    class Tensor:
+        def __init__(self, count):
+            self.count = count
+
+        def numel(self):
+            return self.count
+
+        def element_size(self):
+            return 4
+
+    class SafeOpen:
+        def __init__(self, path, framework, device="cpu"):
+            with open(path, "rb") as f:
+                (length,) = struct.unpack("<Q", f.read(8))
+                self.header = json.loads(f.read(length))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def metadata(self):
+            return self.header.get("__metadata__")
+
+        def keys(self):
+            return [key for key in self.header if key != "__metadata__"]
+
+        def get_tensor(self, key):
+            read.append(key)
+            return Tensor(self.header[key]["shape"][0])
+
+    safetensors = types.ModuleType("safetensors")
+    safetensors.safe_open = SafeOpen
+    torch = types.ModuleType("torch")
+    torch.inference_mode = contextlib.nullcontext
+    monkeypatch.setitem(sys.modules, "safetensors", safetensors)
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    return read
+
+
+def test_skipped_components_are_never_read(tmp_path, comfy_env, fake_safetensors):
+    write_checkpoint(tmp_path / "model.safetensors")
+    model, clip, vae, name = checkpoint.TALoadCheckpointModelWithName().load_checkpoint(
+        "model.safetensors", load_clip=False, load_vae=False
+    )
+    assert fake_safetensors == ["model.diffusion_model.input_blocks.0.0.weight"]
+    assert comfy_env.calls == [("state_dict", ["model.diffusion_model.input_blocks.0.0.weight"], False, False,
+                                {"format": "pt"})]
+    assert (clip, vae, name) == (None, None, "model")
+
+
+def test_skip_vae_only_reads_clip(tmp_path, comfy_env, fake_safetensors):
+    write_checkpoint(tmp_path / "model.safetensors")
+    checkpoint.TALoadCheckpointModelWithName().load_checkpoint("model.safetensors", load_clip=True, load_vae=False)
+    assert not any(key.startswith("first_stage_model.") for key in fake_safetensors)
+    assert len(fake_safetensors) == 3
+
+
+def test_full_load_and_other_formats_use_comfy(tmp_path, comfy_env, fake_safetensors):
+    write_checkpoint(tmp_path / "model.safetensors")
+    node = checkpoint.TALoadCheckpointModelWithName()
+    node.load_checkpoint("model.safetensors")
+    node.load_checkpoint("model.ckpt", load_clip=False)
+    assert fake_safetensors == []
+    assert [call[0] for call in comfy_env.calls] == ["path", "path"]
+
+
+def test_read_state_dict_with_safetensors(tmp_path):
+    pytest.importorskip("torch")
+    pytest.importorskip("safetensors")
+    path = write_checkpoint(tmp_path / "model.safetensors")
+    sd, metadata, bytes_read = checkpoint.read_state_dict(path, checkpoint.skipped_prefixes(False, False))
+    assert list(sd) == ["model.diffusion_model.input_blocks.0.0.weight"]
+    assert metadata == {"format": "pt"}
+    assert bytes_read == 64
@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import load_module
+
+clear_prompt = load_module("ta_clear_prompt")
+
+
+class FakeDynPrompt:
+    def __init__(self, inputs):
+        self.inputs = inputs
+
+    def get_node(self, unique_id):
+        return {"class_type": "TAClearPrompt", "inputs": self.inputs}
+
+
+LINKED = {"mode": "image2prompt", "image2prompt_output": ["12", 0], "manual_prompt": ["7", 0]}
+UNLINKED = {"mode": "image2prompt", "manual_prompt": "typed text"}
+
+
+@pytest.mark.parametrize("mode, name", [("image2prompt", "image2prompt_output"), ("manual_prompt", "manual_prompt")])
+def test_requests_linked_input(mode, name):
+    node = clear_prompt.TAClearPrompt()
+    assert node.check_lazy_status(mode, dynprompt=FakeDynPrompt(LINKED), unique_id="3") == [name]
+
+
+@pytest.mark.parametrize("mode", ["image2prompt", "manual_prompt"])
+def test_unlinked_input_is_not_requested(mode):
+    node = clear_prompt.TAClearPrompt()
+    dynprompt = FakeDynPrompt({"mode": mode})
+    assert node.check_lazy_status(mode, dynprompt=dynprompt, unique_id="3") == []
+    assert node.select_prompt(mode, manual_prompt=None, image2prompt_output=None) == ("",)
+
+
+def test_evaluated_input_is_not_requested_again():
+    node = clear_prompt.TAClearPrompt()
+    dynprompt = FakeDynPrompt(LINKED)
+    assert node.check_lazy_status("image2prompt", image2prompt_output="a cat",
+                                  dynprompt=dynprompt, unique_id="3") == []
+    assert node.check_lazy_status("manual_prompt", manual_prompt="typed text",
+                                  dynprompt=FakeDynPrompt(UNLINKED), unique_id="3") == []
+
+
+def test_without_dynprompt_inputs_are_requested():
+    node = clear_prompt.TAClearPrompt()
+    assert node.check_lazy_status("image2prompt") == ["image2prompt_output"]
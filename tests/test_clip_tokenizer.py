@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import load_module
+
+tokenizer = load_module("ta_clip_tokenizer")
+
+
+@pytest.fixture(autouse=True)
+def fake_tokens(monkeypatch):
+    # "w5" zählt als 5 Tokens, ein angehängtes Komma als eines mehr
+    monkeypatch.setattr(tokenizer, "count_word_tokens", lambda word: int(word[1:].rstrip(",")) + word.count(","))
+
+
+def words(*counts):
+    return " ".join(f"w{count}" for count in counts)
+
+
+def advance(packer, text):
+    packer.add(text)
+    return packer.chunks, packer.used
+
+
+def test_short_word_moves_to_next_chunk():
+    packer = tokenizer.TokenPacker(max_chunks=3)
+    assert advance(packer, words(70, 8)) == (2, 8)
+
+
+def test_exactly_full_chunk_stays():
+    packer = tokenizer.TokenPacker(max_chunks=3)
+    assert advance(packer, words(70, 5)) == (1, 75)
+
+
+def test_long_word_is_split_across_the_boundary():
+    packer = tokenizer.TokenPacker(max_chunks=3)
+    # 9 Tokens: 5 füllen den ersten Chunk, 4 landen im zweiten
+    assert advance(packer, words(70, 9)) == (2, 4)
+
+
+def test_long_word_spanning_several_chunks():
+    packer = tokenizer.TokenPacker(max_chunks=4)
+    assert advance(packer, words(10, 200)) == (3, 60)
+
+
+def test_fits_does_not_change_state():
+    packer = tokenizer.TokenPacker(max_chunks=1)
+    packer.add(words(70))
+    assert packer.fits(words(5))
+    assert not packer.fits(words(9))
+    assert (packer.chunks, packer.used) == (1, 70)
+
+
+def test_pack_tags_keeps_room_for_reserved():
+    # Jedes Keyword "w20," zählt 21 Tokens, reserviert sind 30
+    packed = tokenizer.pack_tags(["w20"] * 10, ["w30"], 77)
+    assert packed == ["w20"] * 2
+
+
+def test_pack_tags_fills_window_without_reserved():
+    # "w24, w24, w25" = 25 + 25 + 25 Tokens - hinter dem letzten Keyword steht kein Komma
+    assert tokenizer.pack_tags(["w24", "w24", "w25", "w1"], [], 77) == ["w24", "w24", "w25"]
+
+
+def test_pack_tags_counts_separator_before_reserved():
+    # "w24, w24, w24," + "w1" = 76 Tokens - das dritte Keyword passt nicht mehr
+    assert tokenizer.pack_tags(["w24", "w24", "w24"], ["w1"], 77) == ["w24", "w24"]
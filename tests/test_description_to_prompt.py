@@ -0,0 +1,39 @@
+from conftest import load_module
+
+prompt = load_module("ta_description_to_prompt")
+
+TEXT = "A woman in a red silk dress is standing on the beach. The image shows the waves."
+
+
+def test_default_uses_combined_stop_words():
+    stop_words = prompt.load_stop_words(prompt.COMBINED_LANGUAGE)
+    assert {"the", "with", "der", "mit"} <= stop_words
+    assert prompt.description_to_prompt(TEXT, add_quality_tags=False) == (
+        "woman, red, silk, dress, standing, beach, image, shows, waves"
+    )
+
+
+def test_combined_table_is_not_detected_as_language():
+    assert prompt.COMBINED_LANGUAGE not in prompt.available_languages()
+
+
+def test_detect_language():
+    assert prompt.detect_language(TEXT) == "en"
+    assert prompt.detect_language("Eine Frau mit einem roten Kleid steht auf dem Strand") == "de"
+    assert prompt.detect_language("xyz qwerty") == prompt.DEFAULT_LANGUAGE
+
+
+def test_detect_language_tie_prefers_default(monkeypatch):
+    tables = {"de": frozenset({"hallo"}), "en": frozenset({"hello"})}
+    monkeypatch.setattr(prompt, "available_languages", lambda: ("de", "en"))
+    monkeypatch.setattr(prompt, "load_stop_words", lambda language: tables[language])
+    assert prompt.detect_language("hallo hello") == prompt.DEFAULT_LANGUAGE
+
+
+def test_ranked_extraction_uses_word_tables():
+    tables = prompt.load_word_tables()
+    assert {"image", "shows"} <= tables["filler"]
+    assert {"red", "silk"} <= tables["modifier"]
+    keywords = prompt.extract_ranked_keywords(TEXT, 10, prompt.load_stop_words(prompt.COMBINED_LANGUAGE))
+    assert keywords[0] == "red silk dress"
+    assert "image" not in keywords
@@ -0,0 +1,33 @@
+from conftest import load_module
+
+loader = load_module("ta_load_diffusion_model_with_name")
+
+MB = 1024 * 1024
+
+
+def test_estimate_default_peak_adds_fp8_copy():
+    info = {"data_bytes": 2 * 1000, "parameters": 1000, "dtype": "BF16"}
+    assert loader.estimate_default_peak(info, "default") == 2000
+    assert loader.estimate_default_peak(info, "fp8_e4m3fn") == 3000
+
+
+def test_estimate_default_peak_fp8_file_needs_no_copy():
+    info = {"data_bytes": 1000, "parameters": 1000, "dtype": "F8_E4M3"}
+    assert loader.estimate_default_peak(info, "fp8_e4m3fn") == 1000
+
+
+def test_choose_load_mode(monkeypatch):
+    info = {"data_bytes": 20 * 1024 * MB, "parameters": 10 * 1024 * MB, "dtype": "F16"}
+    monkeypatch.setattr(loader, "inspect_model", lambda path: info)
+    node = loader.TALoadDiffusionModelWithName()
+    assert node.choose_load_mode("m.safetensors", "fp8_e4m3fn", 24 * 1024) == "streaming"
+    assert node.choose_load_mode("m.safetensors", "fp8_e4m3fn", 32 * 1024) == "default"
+    assert node.choose_load_mode("m.safetensors", "default", 24 * 1024) == "default"
+
+
+def test_choose_load_mode_without_header(monkeypatch):
+    def broken(path):
+        raise loader.ModelHeaderError("bad")
+
+    monkeypatch.setattr(loader, "inspect_model", broken)
+    assert loader.TALoadDiffusionModelWithName().choose_load_mode("m.safetensors", "fp8_e4m3fn", 1) == "default"
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from conftest import load_module
+
+dedupe = load_module("ta_frame_dedupe")
+
+
+class Batch:
+    """Ersatz für den IMAGE Tensor - group_near_duplicates braucht nur shape"""
+
+    def __init__(self, thumbs):
+        self.thumbs = np.asarray(thumbs, dtype=np.float32)
+        self.shape = (len(self.thumbs), 8, 8, 3)
+
+
+@pytest.fixture
+def fake_thumbnails(monkeypatch):
+    monkeypatch.setattr(dedupe, "thumbnails", lambda images: images.thumbs)
+
+
+def test_groups_against_representative(fake_thumbnails):
+    # Langsame Drift: jeder Schritt < Schwellwert, Abstand zum Repräsentanten wächst
+    batch = Batch([[0.0], [0.04], [0.08], [0.12], [0.5], [0.52]])
+    owner, representatives = dedupe.group_near_duplicates(batch, 0.1)
+    assert representatives == [0, 3, 4]
+    assert owner == [0, 0, 0, 3, 4, 4]
+
+
+def test_disabled_or_single_frame(fake_thumbnails):
+    batch = Batch([[0.0], [0.0], [0.0]])
+    assert dedupe.group_near_duplicates(batch, 0) == ([0, 1, 2], [0, 1, 2])
+    assert dedupe.group_near_duplicates(Batch([[0.0]]), 0.5) == ([0], [0])
+
+
+def test_identical_frames_collapse(fake_thumbnails):
+    batch = Batch([[0.2, 0.3]] * 4)
+    assert dedupe.group_near_duplicates(batch, 0.01) == ([0, 0, 0, 0], [0])
+
+
+def test_thumbnails_with_torch():
+    torch = pytest.importorskip("torch")
+    images = torch.zeros(3, 64, 64, 3)
+    images[2] = 1.0
+    thumbs = dedupe.thumbnails(images)
+    assert thumbs.shape == (3, dedupe.THUMBNAIL_SIZE ** 2)
+    assert dedupe.group_near_duplicates(images, 0.1) == ([0, 0, 2], [0, 2])
@@ -0,0 +1,57 @@
+"""
+Regressionstest zu BENCH_IMPORT_TIME.py: das Registrieren des Packs darf keine
+schweren Abhängigkeiten laden und kein 'lms' starten (die Zeitgrenze prüft nur das Skript)
+"""
+
+import os
+import subprocess
+import sys
+
+from conftest import PACK_DIR, PACK_MODULE
+
+import BENCH_IMPORT_TIME as bench
+
+HEAVY_MODULES = ("torch", "numpy", "PIL", "requests", "aiohttp", "comfy", "safetensors", "transformers")
+
+# Nach dem Import kurz warten - ein Hintergrund-Thread hätte 'lms' bis dahin gestartet
+CHECK_SNIPPET = bench.IMPORT_SNIPPET + """
+import threading, time
+time.sleep(0.5)
+print("THREADS", ",".join(t.name for t in threading.enumerate()))
+"""
+
+
+def write_stubs(directory):
+    # ComfyUI-Module, die das Pack erst bei der Ausführung importieren darf
+    (directory / "folder_paths.py").write_text(
+        "base_path = ''\ndef get_filename_list(folder):\n    return []\n", encoding="utf-8")
+    (directory / "server.py").write_text(
+        "class PromptServer:\n    instance = None\n", encoding="utf-8")
+    marker = directory / "lms_called"
+    lms = directory / "lms"
+    lms.write_text(f"#!/bin/sh\ntouch {marker}\n", encoding="utf-8")
+    lms.chmod(0o755)
+    return marker
+
+
+def test_pack_import_stays_lightweight(tmp_path):
+    marker = write_stubs(tmp_path)
+    env = dict(os.environ, PATH=str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK_SNIPPET, PACK_DIR, PACK_MODULE, str(tmp_path)],
+        capture_output=True, text=True, env=env, cwd=str(tmp_path), timeout=60
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    imported = {name for name, _self, _cumulative, _depth in bench.parse_importtime(result.stderr)}
+    assert PACK_MODULE in imported
+    heavy = sorted(name for name in imported
+                   if any(name == module or name.startswith(module + ".") for module in HEAVY_MODULES))
+    assert heavy == []
+    assert "folder_paths" not in imported
+
+    node_count = next(int(line.split()[1]) for line in result.stdout.splitlines() if line.startswith("NODES "))
+    assert node_count > 0
+    threads = next(line for line in result.stdout.splitlines() if line.startswith("THREADS "))
+    assert "TA-LMS" not in threads
+    assert not marker.exists()
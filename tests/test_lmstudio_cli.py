@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+from conftest import PACK_DIR
+
+IMPORT_PACK = """
+import sys
+sys.path.insert(0, {pack_dir!r})
+import BATCH_CAPTION
+BATCH_CAPTION._import_pack()
+model_list = sys.modules["ta_nodes_pack.ta_lmstudio_cli"]._model_list
+print(model_list._worker is None and model_list._fetched_at is None)
+"""
+
+
+def test_pack_import_does_not_run_lms(tmp_path):
+    # Ohne lms im PATH würde ein Abruf beim Import "lms CLI not found" loggen
+    env = dict(os.environ, PATH=str(tmp_path))
+    result = subprocess.run([sys.executable, "-c", IMPORT_PACK.format(pack_dir=PACK_DIR)],
+                            capture_output=True, text=True, env=env, cwd=str(tmp_path), timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "True"
+    assert "lms CLI not found" not in result.stderr + result.stdout
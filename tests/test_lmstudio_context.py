@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import load_module
+
+context = load_module("ta_lmstudio_context")
+
+PS_TEXT = """LOADED MODELS
+
+Identifier: gemma-3-27b-it-qat
+  • Path: lmstudio-community/gemma-3-27b-it-qat-GGUF/gemma-3-27b-it-qat-Q4_0.gguf
+  • Context Length: 8192
+Identifier: qwen2-vl-7b-instruct
+  • Path: lmstudio-community/qwen2-vl-7b-instruct
+  • Context Length: n/a
+"""
+
+
+def test_estimate_context_length():
+    bucket, needed = context.estimate_context_length("qwen2-vl-7b-instruct", "sys", "a" * 300, 500, images=1)
+    # 64 + 1 + 100 + 37² Patches + 500, plus 15 %
+    assert needed == 2340
+    assert bucket == 4096
+    assert context.estimate_context_length("llava-v1.5-7b", max_tokens=100)[0] == 2048
+    # Feste Encoder, Fallback und obere Grenze
+    assert context.image_tokens("google/gemma-3-27b") == 256
+    assert context.image_tokens("unknown-model") == context.DEFAULT_IMAGE_TOKENS
+    assert context.estimate_context_length("x", max_tokens=10 ** 6)[0] == context.CONTEXT_BUCKETS[-1]
+
+
+def test_parse_loaded_models_text():
+    models = context.parse_loaded_models(PS_TEXT)
+    assert [m["identifier"] for m in models] == ["gemma-3-27b-it-qat", "qwen2-vl-7b-instruct"]
+    assert models[0]["path"].endswith("Q4_0.gguf")
+    assert models[0]["context_length"] == 8192
+    assert models[1]["context_length"] is None
+
+
+def test_parse_loaded_models_json():
+    output = json.dumps([
+        {"identifier": "llava", "path": "lmstudio-community/llava-v1.5-7b", "modelKey": "llava-v1.5-7b",
+         "contextLength": 4096},
+        {"modelKey": "pixtral-12b"},
+        "ignored",
+    ])
+    models = context.parse_loaded_models(output)
+    assert models[0] == {"identifier": "llava", "path": "lmstudio-community/llava-v1.5-7b",
+                         "model_key": "llava-v1.5-7b", "context_length": 4096}
+    assert models[1]["path"] == "pixtral-12b" and models[1]["context_length"] is None
+    assert len(models) == 2
+
+
+@pytest.mark.parametrize("wanted, expected", [
+    ("lmstudio-community/gemma-3-27b-it-qat-GGUF", True),
+    ("lmstudio-community/gemma-3-27b-it-qat-GGUF/gemma-3-27b-it-qat-Q4_0.gguf", True),
+    ("/lmstudio-community/gemma-3-27b-it-qat-GGUF/", True),
+    ("gemma-3-27b-it-qat", True),
+    ("gemma-3-27b", False),
+    ("google/gemma-3-27b", False),
+    ("lmstudio-community/gemma-3-27b-it", False),
+    ("", False),
+])
+def test_matches_whole_keys_only(wanted, expected):
+    loaded = context.parse_loaded_models(PS_TEXT)[0]
+    assert context._matches(wanted, loaded) is expected
+
+
+def test_resolve_context_length(simulator):
+    import LMSTUDIO_SIMULATOR as sim
+
+    state = simulator.state
+    state.loaded.clear()
+
+    def resolve(model, **kwargs):
+        return asyncio.run(context.resolve_context_length(model, "auto", 4096, **kwargs))
+
+    assert asyncio.run(context.resolve_context_length("google/gemma-3-27b", "manual", 12345)) == (12345, False)
+    # Nicht geladen -> Bucket
+    assert resolve("google/gemma-3-27b", max_tokens=500) == (2048, False)
+
+    assert sim.run_lms(state, ["load", "google/gemma-3-27b", "--context-length", "8192"])[0] == 0
+    assert resolve("google/gemma-3-27b", max_tokens=500) == (8192, True)
+    # Geladener Kontext zu klein -> neu laden mit größerem Bucket
+    assert resolve("google/gemma-3-27b", max_tokens=9000) == (16384, False)
+    # "google/gemma-3" ist ein anderes Modell, kein Präfix-Treffer
+    assert resolve("google/gemma-3", max_tokens=500) == (2048, False)
+    state.loaded.clear()
+
+
+def test_unknown_loaded_context_reloads(monkeypatch):
+    async def unknown(model_path):
+        return 0
+
+    monkeypatch.setattr(context, "loaded_context_length", unknown)
+    assert asyncio.run(context.resolve_context_length("m", "auto", 4096, max_tokens=500)) == (2048, False)
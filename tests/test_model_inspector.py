@@ -0,0 +1,121 @@
+import json
+import struct
+
+import pytest
+
+from conftest import load_module
+
+inspector = load_module("ta_model_inspector")
+
+
+def _gguf_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def write_gguf(path, tensors=(("w", (4, 8), 1),), metadata=(("general.architecture", "flux"),), raw_tail=b""):
+    body = b"GGUF" + struct.pack("<IQQ", 3, len(tensors), len(metadata))
+    for key, value in metadata:
+        body += _gguf_string(key) + struct.pack("<I", 8) + _gguf_string(value)
+    for name, dims, tensor_type in tensors:
+        body += _gguf_string(name) + struct.pack("<I", len(dims)) + struct.pack(f"<{len(dims)}Q", *dims)
+        body += struct.pack("<IQ", tensor_type, 0)
+    path.write_bytes(body + raw_tail)
+    return str(path)
+
+
+def write_safetensors(path, header):
+    data = json.dumps(header).encode("utf-8")
+    path.write_bytes(struct.pack("<Q", len(data)) + data + b"\0" * 64)
+    return str(path)
+
+
+def test_safetensors_header(tmp_path):
+    path = write_safetensors(tmp_path / "m.safetensors", {
+        "__metadata__": {"format": "pt"},
+        "model.diffusion_model.double_blocks.0.w": {"dtype": "BF16", "shape": [4, 4], "data_offsets": [0, 32]},
+        "model.diffusion_model.bias": {"dtype": "F32", "shape": [4], "data_offsets": [32, 48]},
+    })
+    info = inspector.inspect_model(path)
+    assert info["format"] == "safetensors"
+    assert info["architecture"] == "flux"
+    assert info["parameters"] == 20
+    assert info["dtype"] == "BF16"
+    assert info["data_bytes"] == 48
+    assert inspector.check_model_header(path) is None
+
+
+def test_gguf_header(tmp_path):
+    path = write_gguf(tmp_path / "m.gguf", tensors=(("a", (32, 8), 8), ("b", (32,), 0)))
+    info = inspector.inspect_model(path)
+    assert info["format"] == "gguf"
+    assert info["architecture"] == "flux"
+    assert info["parameters"] == 288
+    assert info["dtype"] == "Q8_0"
+    assert info["data_bytes"] == 8 * 34 + 32 * 4
+
+
+def test_truncated_safetensors(tmp_path):
+    path = tmp_path / "m.safetensors"
+    path.write_bytes(struct.pack("<Q", 1000) + b"{}")
+    assert "exceeds the file size" in inspector.check_model_header(str(path))
+
+
+def test_invalid_json_header(tmp_path):
+    path = tmp_path / "m.safetensors"
+    path.write_bytes(struct.pack("<Q", 4) + b"nope")
+    assert "Corrupted header" in inspector.check_model_header(str(path))
+
+
+@pytest.mark.parametrize("tail", [
+    # Riesige String-Länge im Metadaten-Block
+    _gguf_string("key") + struct.pack("<IQ", 8, 2 ** 62),
+    # Riesiges Array mit Skalar-Typ
+    _gguf_string("key") + struct.pack("<IIQ", 9, 4, 2 ** 60),
+])
+def test_gguf_huge_lengths(tmp_path, tail):
+    path = tmp_path / "m.gguf"
+    path.write_bytes(b"GGUF" + struct.pack("<IQQ", 3, 0, 1) + tail)
+    error = inspector.check_model_header(str(path))
+    assert error and "exceeds the file size" in error
+
+
+def test_gguf_huge_rank(tmp_path):
+    path = tmp_path / "m.gguf"
+    path.write_bytes(b"GGUF" + struct.pack("<IQQ", 3, 1, 0) + _gguf_string("t") + struct.pack("<I", 2 ** 31))
+    assert "Implausible tensor rank" in inspector.check_model_header(str(path))
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "m.gguf"
+    path.write_bytes(b"NOPE" + b"\0" * 32)
+    assert "bad magic" in inspector.check_model_header(str(path))
+
+
+def test_cache_invalidated_by_mtime(tmp_path):
+    import os
+
+    path = write_gguf(tmp_path / "m.gguf")
+    first = inspector.inspect_model(path)
+    assert inspector.inspect_model(path) is first
+    write_gguf(tmp_path / "m.gguf", metadata=(("general.architecture", "sd3"),))
+    os.utime(path, ns=(1, 1))
+    assert inspector.inspect_model(path)["architecture"] == "sd3"
+
+
+def test_model_file_list_is_deduplicated(monkeypatch, tmp_path):
+    import sys
+    import types
+
+    directory = tmp_path / "diffusion_models"
+    listing = {"checkpoints": ["a.safetensors"], "diffusion_models": ["b.safetensors", "c.gguf"],
+               "unet_gguf": ["c.gguf"]}
+    folder_paths = types.ModuleType("folder_paths")
+    folder_paths.get_filename_list = lambda folder: listing[folder]
+    folder_paths.get_full_path = lambda folder, name: str(
+        (tmp_path / "checkpoints" if folder == "checkpoints" else directory) / name)
+    monkeypatch.setitem(sys.modules, "folder_paths", folder_paths)
+
+    assert inspector.TAInspectModel.get_model_files() == [
+        "checkpoints/a.safetensors", "diffusion_models/b.safetensors", "diffusion_models/c.gguf",
+    ]
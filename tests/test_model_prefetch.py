@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import load_module
+
+prefetch = load_module("ta_model_prefetch")
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(prefetch, "PREFETCH_ENABLED", True)
+    monkeypatch.setattr(prefetch, "_jobs", {})
+    monkeypatch.setattr(prefetch, "_warm_files", {})
+    path = tmp_path / "model.safetensors"
+    path.write_bytes(b"\0" * (3 * 1024 * 1024))
+    return str(path)
+
+
+def run(path):
+    job = prefetch.prefetch_file(path)
+    if job is not None:
+        assert job.finished.wait(10)
+    return job
+
+
+def test_second_prefetch_reads_again(model_file, monkeypatch):
+    # Nach Ablauf des Fensters kann die Datei längst aus dem Page-Cache verdrängt sein
+    monkeypatch.setattr(prefetch, "WARM_SECONDS", 0)
+    first = run(model_file)
+    second = run(model_file)
+    assert first is not None and second is not None and second is not first
+    assert second.bytes_read == 3 * 1024 * 1024
+
+
+def test_recent_prefetch_is_skipped(model_file, monkeypatch):
+    monkeypatch.setattr(prefetch, "WARM_SECONDS", 3600)
+    assert run(model_file) is not None
+    assert prefetch.prefetch_file(model_file) is None
+
+
+def test_running_prefetch_is_reused(model_file, monkeypatch):
+    # 1 MB/s: der Job läuft noch, wenn der zweite Aufruf kommt
+    job = prefetch.prefetch_file(model_file, max_mbps=1)
+    try:
+        assert prefetch.prefetch_file(model_file) is job
+    finally:
+        prefetch.cancel_prefetch(model_file)
+        job.finished.wait(10)
@@ -0,0 +1,58 @@
+import asyncio
+import sys
+import types
+
+import pytest
+
+from conftest import load_module
+
+profiling = load_module("ta_profiling")
+
+
+def test_parse_update_request():
+    assert profiling.parse_update_request({"mode": "sample", "nodes": ["A"], "interval": 0.01}) == (
+        "sample", ["A"], 0.01
+    )
+    assert profiling.parse_update_request({"mode": None}) == (None, None, None)
+
+
+@pytest.mark.parametrize("body", [
+    {"mode": "cprofile", "directory": "/etc"},
+    {"mode": "sample", "interval": "x"},
+    {"mode": "sample", "interval": -1},
+    {"mode": "sample", "interval": True},
+    {"mode": "sample", "nodes": "TALMStudioLoadOnRun"},
+    {"mode": "sample", "nodes": [1]},
+    {"mode": 1},
+    {"mode": "sample", "unexpected": 1},
+    ["sample"],
+])
+def test_parse_update_request_rejects(body):
+    with pytest.raises(ValueError):
+        profiling.parse_update_request(body)
+
+
+def test_route_returns_400(monkeypatch):
+    web = pytest.importorskip("aiohttp.web")
+    from aiohttp.test_utils import TestClient, TestServer
+
+    routes = web.RouteTableDef()
+    server = types.ModuleType("server")
+    server.PromptServer = types.SimpleNamespace(instance=types.SimpleNamespace(routes=routes))
+    monkeypatch.setitem(sys.modules, "server", server)
+    monkeypatch.setattr(profiling, "_settings", dict(profiling._settings, mode=None))
+    assert profiling.register_route()
+
+    async def post(data):
+        app = web.Application()
+        app.add_routes(routes)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post(profiling.PROFILING_ROUTE, data=data,
+                                         headers={"Content-Type": "application/json"})
+            return response.status, await response.json()
+
+    status, body = asyncio.run(post('{"mode": "cprofile", "directory": "/tmp/x"}'))
+    assert status == 400 and "TA_NODES_PROFILE_DIR" in body["error"]
+    assert asyncio.run(post('{"mode": "sample", "interval": "x"}'))[0] == 400
+    assert asyncio.run(post("not json"))[0] == 400
+    assert profiling._settings["mode"] is None
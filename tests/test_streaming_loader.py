@@ -0,0 +1,59 @@
+import json
+import struct
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from conftest import load_module
+
+streaming = load_module("ta_streaming_loader")
+
+
+def write_safetensors(path, tensors):
+    header = {}
+    offset = 0
+    for name, (dtype, shape, size) in tensors.items():
+        header[name] = {"dtype": dtype, "shape": shape, "data_offsets": [offset, offset + size]}
+        offset += size
+    header_bytes = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * offset)
+    return path
+
+
+@pytest.mark.parametrize("name, shape, expected", [
+    ("blocks.0.attn.qkv.weight", [192, 64], True),
+    ("input_blocks.0.0.weight", [320, 4, 3, 3], True),
+    ("blocks.0.attn.qkv.bias", [192], False),
+    ("blocks.0.norm1.weight", [64], False),
+    ("pos_embed", [1, 256, 64], False),
+    ("text_model.embeddings.token_embedding.weight", [49408, 768], False),
+    ("model.embed_tokens.weight", [32000, 4096], False),
+    ("x_embedder.proj.weight", [64, 16, 2, 2], True),
+])
+def test_only_layer_weights_are_cast(name, shape, expected):
+    assert streaming.should_cast(name, torch.float16, shape, torch.bfloat16) is expected
+
+
+def test_stream_load_keeps_embeddings(tmp_path):
+    path = write_safetensors(tmp_path / "m.safetensors", {
+        "linear.weight": ("F32", [4, 4], 64),
+        "pos_embed": ("F32", [1, 4, 4], 64),
+        "linear.bias": ("F32", [4], 16),
+    })
+    sd, stats = streaming.stream_load_state_dict(str(path), weight_dtype=torch.float16)
+    assert sd["linear.weight"].dtype == torch.float16
+    assert sd["pos_embed"].dtype == torch.float32
+    assert sd["linear.bias"].dtype == torch.float32
+    assert stats["casted"] == 1
+
+
+def test_short_read_raises(tmp_path):
+    path = write_safetensors(tmp_path / "m.safetensors", {"linear.weight": ("F32", [4, 4], 64)})
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 10)
+    with pytest.raises(OSError, match="Unexpected end of file"):
+        streaming.stream_load_state_dict(str(path))
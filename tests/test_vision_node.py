@@ -0,0 +1,175 @@
+import asyncio
+import base64
+import io
+import json
+
+import numpy as np
+import pytest
+
+from conftest import load_module
+
+vision = load_module("ta_ebu_lmstudio_vision_node")
+
+BatchRequest = vision.TAEbuLMStudioVisionBatchRequest
+parse_packed = BatchRequest.parse_packed_response
+
+
+def test_parse_packed_response_text():
+    assert parse_packed(json.dumps({"captions": [" a cat ", "a dog"]}), 2) == ["a cat", "a dog"]
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps({"captions": ["only one"]}),
+    json.dumps({"captions": ["a", 2]}),
+    json.dumps({"captions": "a, b"}),
+    json.dumps(["a", "b"]),
+    "not json",
+    "Error 400: bad request",
+])
+def test_parse_packed_response_rejects(text):
+    assert parse_packed(text, 2) is None
+
+
+def test_parse_packed_response_tags():
+    text = json.dumps({"captions": [{"tags": [{"tag": "cat", "weight": 1.3}]}, ["dog", "grass"]]})
+    assert parse_packed(text, 2, "tags") == ["(cat:1.3)", "dog, grass"]
+    assert parse_packed(json.dumps({"captions": ["cat", "dog"]}), 2, "tags") is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Error 400: {"error": {"message": "Model \'x\' supports at most 1 image(s) per request."}}', True),
+    ("Error 400: Only one image is supported per message", True),
+    ("Error 400: This model does not support multiple images", True),
+    ("Error 400: Context length exceeded", False),
+    ("Error 400: Model 'x' does not support images.", False),
+    ("Error 500: at most 1 image", False),
+])
+def test_rejects_multiple_images(text, expected):
+    assert vision.rejects_multiple_images(text) is expected
+
+
+def _png_base64(image):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8)).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _caption_batch(simulator, monkeypatch, model, frames=4):
+    pytest.importorskip("PIL")
+    import LMSTUDIO_SIMULATOR as sim
+
+    path = next(p for p in simulator.state.models if p.endswith(model))
+    assert sim.run_lms(simulator.state, ["load", path])[0] == 0
+    node = BatchRequest()
+    # Ohne torch: die Frames werden direkt als PNG kodiert
+    monkeypatch.setattr(node, "tensor_to_base64", _png_base64)
+    try:
+        captions, _ratio = asyncio.run(node.generate_prompts(
+            np.zeros((frames, 8, 8, 3)), "Describe.", model, 0.7, 30, simulator.url, 2,
+            images_per_request=2,
+        ))
+    finally:
+        simulator.state.loaded.clear()
+    return captions
+
+
+def test_multi_image_rejection_marks_model(simulator, monkeypatch):
+    monkeypatch.setattr(BatchRequest, "_single_image_models", set())
+    monkeypatch.setitem(simulator.state.config, "max_images_per_request", 1)
+    rejected = simulator.state.counters.get("chat_rejected_multi_image", 0)
+    captions = _caption_batch(simulator, monkeypatch, "llava-v1.5-7b")
+    assert simulator.state.counters["chat_rejected_multi_image"] > rejected
+    assert len(captions) == 4 and not any(vision.is_error(c) for c in captions)
+    assert BatchRequest._single_image_models == {"llava-v1.5-7b"}
+
+
+def test_other_400_falls_back_for_the_pack_only(simulator, monkeypatch):
+    monkeypatch.setattr(BatchRequest, "_single_image_models", set())
+    captions = _caption_batch(simulator, monkeypatch, "mistral-7b-instruct-v0.3")
+    # Text-Modell: jeder Request scheitert, aber das Modell wird nicht als Single-Image markiert
+    assert all(vision.is_error(c) for c in captions)
+    assert BatchRequest._single_image_models == set()
+
+
+def test_format_tags():
+    tags = [
+        {"tag": "red dress", "weight": 1.3},
+        {"tag": "woman", "weight": 1.02},
+        {"tag": "Woman"},
+        {"tag": "beach (sunset): wide", "weight": 1.0},
+        {"tag": "glow", "weight": 9},
+        {"tag": "fog", "weight": 0.1},
+        {"tag": "grain", "weight": "heavy"},
+        {"tag": "   "},
+        {"weight": 1.2},
+        "film",
+        3,
+    ]
+    assert vision.format_tags(tags) == (
+        "(red dress:1.3), woman, beach sunset wide, (glow:1.5), (fog:0.5), grain, film"
+    )
+
+
+def test_format_tags_limit():
+    tags = [f"tag{i}" for i in range(vision.MAX_TAGS + 10)]
+    assert len(vision.format_tags(tags).split(", ")) == vision.MAX_TAGS
+
+
+def test_parse_tags_response():
+    assert vision.parse_tags_response(json.dumps({"tags": [{"tag": "cat", "weight": 1.2}, {"tag": "sofa"}]})) == (
+        "(cat:1.2), sofa"
+    )
+    assert vision.parse_tags_response({"tags": ["cat", "sofa"]}) == "cat, sofa"
+    assert vision.parse_tags_response(["cat"]) == "cat"
+
+
+def test_parse_tags_response_fallbacks():
+    # Kein JSON: an Kommas und Zeilen teilen
+    assert vision.parse_tags_response("cat, sofa\nwindow light") == "cat, sofa, window light"
+    # JSON ohne Tag-Liste: Text unverändert
+    assert vision.parse_tags_response('{"caption": "a cat"}') == '{"caption": "a cat"}'
+    assert vision.parse_tags_response({"caption": "a cat"}) == '{"caption": "a cat"}'
+
+
+def test_format_output_keeps_errors():
+    node = vision.TAEbuLMStudioVisionRequest()
+    assert node.format_output("Error 404: not loaded", "tags") == "Error 404: not loaded"
+    assert node.format_output('{"tags": ["cat"]}', "tags") == "cat"
+    assert node.format_output('{"tags": ["cat"]}', "text") == '{"tags": ["cat"]}'
+
+
+async def _request(node, payload, url):
+    async with node.client_session() as session:
+        return await node.request_completion(session, payload, url, 0.0)
+
+
+@pytest.mark.parametrize("timeout", ["total", "sock_read"])
+def test_timeout_is_not_reported_as_connection_error(simulator, monkeypatch, timeout):
+    import aiohttp
+    import LMSTUDIO_SIMULATOR as sim
+
+    monkeypatch.setattr(vision, "REQUEST_TIMEOUT", 0.3)
+    if timeout == "sock_read":
+        # Lese-Timeout -> aiohttp.ServerTimeoutError (auch ein ClientConnectionError)
+        monkeypatch.setattr(vision.TAEbuLMStudioVisionRequest, "client_session", staticmethod(
+            lambda: aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(sock_read=0.3))))
+    monkeypatch.setitem(simulator.state.config, "ttft_seconds", 1.5)
+    assert sim.run_lms(simulator.state, ["load", "lmstudio-community/llava-v1.5-7b"])[0] == 0
+    node = vision.TAEbuLMStudioVisionRequest()
+    payload = {"model": "llava-v1.5-7b", "messages": [{"role": "user", "content": "Hi"}], "max_tokens": 5}
+    try:
+        text = asyncio.run(_request(node, payload, simulator.url))
+    finally:
+        simulator.state.loaded.clear()
+    assert text.startswith("[TA-Vision] Error: Timeout nach 0.3s")
+    assert "Connection Error" not in text
+
+
+def test_connection_error(monkeypatch):
+    node = vision.TAEbuLMStudioVisionRequest()
+    payload = {"model": "m", "messages": []}
+    # Port 9 (discard) ist lokal praktisch nie offen
+    text = asyncio.run(_request(node, payload, "http://127.0.0.1:9"))
+    assert text.startswith("[TA-Vision] Connection Error")